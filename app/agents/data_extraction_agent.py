@@ -1,8 +1,22 @@
+import heapq
 import json
 import logging
+import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 
+from app.config import (
+    EXTRACTION_MAX_WORKERS,
+    EXTRACTION_CONTEXT_FRACTION,
+    FAST_PATH_MIN_CONFIDENCE,
+    LLM_JSON_NUM_CTX,
+)
 from app.llm.llm_client import call_llm_json
+from app.agents.fast_path_extractor import fast_extract, hinted_fields, record_run
+from app.observability.tracing import annotate, propagate, traced
 
 logger = logging.getLogger("DataExtractionAgent")
 
@@ -29,27 +43,52 @@ KEYWORDS = [
 ]
 
 
-MAX_CHARS = 1000  
+# --------------------------------------------------
+# Text cleaning (precompiled; each pass skipped when it cannot match)
+# --------------------------------------------------
+# Python's re scans patterns with a literal prefix ("  ", "\n\n\n") much
+# faster than character classes or alternations, so rules are written that
+# way where the result is the same, and rules for rare junk (tabs, NULs,
+# ruler lines, non-ASCII) only run when a cheap substring check finds it.
+SPACES = re.compile(r"  +")
+SPACES_TABS_NULS = re.compile(r"[ \t\x00]{2,}|[\t\x00]")
+BLANK_LINES = re.compile(r"\n\n\n+")
+RULER = re.compile(r"[|_][|_]+")
+NON_PRINTABLE = re.compile(r"[^\x20-\x7E\n]")  # non-ASCII except newline
+PAGE_NUMBER = re.compile(r"Page \d+ of \d+", re.I | re.A)
+CONFIDENTIAL = re.compile(r"Confidential.*", re.I | re.A)
+LONG_NUMBER = re.compile(r"\b\d{10,}\b", re.A)
 
-import re
 
 def preprocess_text(text: str) -> str:
     """
     Aggressively clean noisy user/OCR input before LLM extraction
     """
 
-    # Normalize whitespace
-    text = text.replace("\x00", " ")
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    # Normalize whitespace (NULs and tab runs become one space)
+    if "\t" in text or "\x00" in text:
+        text = SPACES_TABS_NULS.sub(" ", text)
+    else:
+        text = SPACES.sub(" ", text)
+    text = BLANK_LINES.sub("\n\n", text)
 
     # Remove common OCR junk
-    text = re.sub(r"[|_]{2,}", " ", text)
-    text = re.sub(r"[^\x20-\x7E\n]", " ", text)  # non-ASCII except newline
+    if "||" in text or "__" in text or "|_" in text or "_|" in text:
+        text = RULER.sub(" ", text)
+    if not (text.isascii() and text.replace("\n", "").isprintable()):
+        text = NON_PRINTABLE.sub(" ", text)
+
+    # Text is ASCII from here on (hence re.A)
+    lowered = text.lower()
 
     # Remove page headers / footers
-    text = re.sub(r"Page \d+ of \d+", "", text, flags=re.I)
-    text = re.sub(r"Confidential.*", "", text, flags=re.I)
+    if "page " in lowered:
+        text, removed = PAGE_NUMBER.subn("", text)
+        if removed:
+            # Removal can join "Confid" + "ential" across a page marker
+            lowered = text.lower()
+    if "confidential" in lowered:
+        text = CONFIDENTIAL.sub("", text)
 
     # Normalize currency
     # text = re.sub(r"(INR|Rs\.?|₹)", " INR ", text, flags=re.I)
@@ -59,22 +98,34 @@ def preprocess_text(text: str) -> str:
     # text = re.sub(r"(\d)[,](\d)", r"\1\2", text)  # 1,000 → 1000
 
     # Kill long IDs (Aadhaar, account numbers)
-    text = re.sub(r"\b\d{10,}\b", "[LONG_NUMBER]", text)
+    text = LONG_NUMBER.sub("[LONG_NUMBER]", text)
 
     return text.strip()
 
 
+# One literal pattern per keyword: scanning the whole text once per
+# keyword is faster than per-line checks or a combined alternation
+KEYWORD_PATTERNS = [re.compile(re.escape(k)) for k in KEYWORDS]
+
+
 def compress_to_signal(text: str, max_lines: int = 40) -> str:
     lines = [l.strip() for l in text.splitlines() if len(l.strip()) > 5]
 
-    scored = []
-    for l in lines:
-        score = sum(1 for k in KEYWORDS if k in l.lower())
-        if score > 0:
-            scored.append((score, l))
+    # Lines hold no line breaks, so the lowered join splits back 1:1
+    lowered = "\n".join(lines).lower()
+    starts = list(accumulate((len(l) + 1 for l in lowered.split("\n")), initial=0))
+
+    # Bit i of found[line] set ⇔ KEYWORDS[i] occurs in that line
+    found = {}
+    for bit, pattern in enumerate(KEYWORD_PATTERNS):
+        for m in pattern.finditer(lowered):
+            line = bisect_right(starts, m.start()) - 1
+            found[line] = found.get(line, 0) | (1 << bit)
+
+    scored = [(bin(mask).count("1"), lines[i]) for i, mask in found.items()]
 
-    scored.sort(reverse=True)
-    selected = [l for _, l in scored[:max_lines]]
+    # Same result as a full descending sort, truncated
+    selected = [l for _, l in heapq.nlargest(max_lines, scored)]
 
     # Fallback if nothing matched
     if not selected:
@@ -85,8 +136,45 @@ def compress_to_signal(text: str, max_lines: int = 40) -> str:
 # --------------------------------------------------
 # Utilities
 # --------------------------------------------------
-def chunk_text(text: str, size: int = MAX_CHARS) -> List[str]:
-    return [text[i:i + size] for i in range(0, len(text), size)]
+# Upper bound on BPE tokens: at most 6 letters or 3 digits per token,
+# every other visible character its own token
+TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def chunk_text(text: str, fields: List[str] = None, budget: int = None) -> List[str]:
+    """
+    Pack whole lines greedily into as few chunks as fit the context window.
+
+    Each chunk's prompt (instruction/schema preamble + chunk) stays within
+    `budget` tokens, by default EXTRACTION_CONTEXT_FRACTION of
+    LLM_JSON_NUM_CTX. Lines are never split; a single line longer than the
+    budget becomes its own chunk.
+    """
+    if budget is None:
+        budget = int(LLM_JSON_NUM_CTX * EXTRACTION_CONTEXT_FRACTION)
+
+    available = max(1, budget - estimate_tokens(build_extraction_prompt("", fields)))
+
+    chunks, current, used = [], [], 0
+    for line in text.splitlines():
+        # +1 for the newline joining it to the previous line
+        cost = estimate_tokens(line) + 1
+
+        if current and used + cost > available:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+
+        current.append(line)
+        used += cost
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
 
 
 def safe_number(v):
@@ -96,16 +184,17 @@ def safe_number(v):
         return None
 
 
-def merge_results(results: List[dict]) -> dict:
+def merge_results(results: List[dict], fields: List[str] = None) -> dict:
     """
     First non-null value wins
     """
-    merged = {k: None for k in SCHEMA}
+    fields = list(SCHEMA) if fields is None else fields
+    merged = {k: None for k in fields}
 
     for r in results:
         if not isinstance(r, dict):
             continue
-        for k in SCHEMA:
+        for k in fields:
             if merged[k] is None and r.get(k) is not None:
                 merged[k] = r.get(k)
 
@@ -113,36 +202,12 @@ def merge_results(results: List[dict]) -> dict:
 
 
 # --------------------------------------------------
-# MAIN AGENT
+# Chunk extraction (bounded parallelism)
 # --------------------------------------------------
-def data_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    texts: List[str] = []
-
-    if state.get("user_input"):
-        texts.append(state["user_input"])
-
-    for d in state.get("documents", []):
-        if d.get("raw_text"):
-            texts.append(d["raw_text"])
-
-    full_text = "\n\n".join(texts).strip()
-
+def build_extraction_prompt(chunk: str, fields: List[str] = None) -> str:
+    schema = SCHEMA if fields is None else {k: SCHEMA[k] for k in fields}
 
-
-    if not full_text:
-        state["extracted_data"] = {k: {"value": None} for k in SCHEMA}
-        return state
-
-    clean_text = preprocess_text(full_text)
-    signal_text = compress_to_signal(clean_text)
-    # print(signal_text)
-
-    chunks = chunk_text(signal_text)
-    # print(chunks)
-    partial_results = []
-
-    for i, chunk in enumerate(chunks):
-        prompt = f"""
+    return f"""
 You are a strict information extraction system.
 
 Return EXACTLY one valid JSON object.
@@ -154,7 +219,7 @@ Rules:
 - Missing values must be null
 
 Schema:
-{json.dumps(SCHEMA, indent=2)}
+{json.dumps(schema, indent=2)}
 
 Input:
 \"\"\"
@@ -162,17 +227,141 @@ Input:
 \"\"\"
 """.strip()
 
-        try:
-            result = call_llm_json(prompt)
-            partial_results.append(result)
-        except Exception as e:
-            logger.error(f"Extraction failed on chunk {i}", exc_info=True)
-            partial_results.append({})   # 🔑 never stall pipeline
 
-    merged = merge_results(partial_results)
+def extract_chunk(i: int, chunk: str, fields: List[str] = None) -> dict:
+    try:
+        return call_llm_json(build_extraction_prompt(chunk, fields), agent="extraction")
+    except Exception:
+        logger.error(f"Extraction failed on chunk {i}", exc_info=True)
+        return {}   # 🔑 never stall pipeline
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Shared pool, so EXTRACTION_MAX_WORKERS bounds in-flight LLM calls
+    across all concurrent sessions, not per application.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=EXTRACTION_MAX_WORKERS,
+                    thread_name_prefix="extraction",
+                )
+
+    return _executor
+
+
+def extract_chunks(chunks: List[str], fields: List[str] = None) -> List[dict]:
+    """
+    Extract all chunks concurrently; results keep chunk order.
+    """
+    if len(chunks) <= 1:
+        return [extract_chunk(i, c, fields) for i, c in enumerate(chunks)]
+
+    # Chunk LLM spans join the caller's trace
+    return list(get_executor().map(
+        propagate(extract_chunk), range(len(chunks)), chunks, [fields] * len(chunks)
+    ))
+
+
+# --------------------------------------------------
+# Spreadsheet fields (schema-mapped during ingestion)
+# --------------------------------------------------
+def tabular_fields(documents: List[dict]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fields aggregated from uploaded workbooks; first document wins.
+    """
+    found = {}
+
+    for d in documents:
+        structured = d.get("structured") or {}
+        for k, r in (structured.get("fields") or {}).items():
+            if k in SCHEMA and k not in found and r.get("value") is not None:
+                found[k] = {
+                    **r,
+                    "provenance": {"file_name": d.get("file_name"), **r.get("provenance", {})},
+                }
+
+    return found
+
+
+# --------------------------------------------------
+# MAIN AGENT
+# --------------------------------------------------
+@traced("data_extraction")
+def data_extraction_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    texts: List[str] = []
+
+    if state.get("user_input"):
+        texts.append(state["user_input"])
+
+    for d in state.get("documents", []):
+        if d.get("raw_text"):
+            texts.append(d["raw_text"])
+
+    full_text = "\n\n".join(texts).strip()
+
+    # Spreadsheet values need neither regexes nor the LLM
+    tabular = tabular_fields(state.get("documents") or [])
+
+    if not full_text and not tabular:
+        state["extracted_data"] = {k: {"value": None} for k in SCHEMA}
+        return state
+
+    clean_text = preprocess_text(full_text)
+
+    # Fast path: confident regex hits need no LLM call
+    fast = {
+        k: r for k, r in fast_extract(clean_text).items()
+        if r["confidence"] >= FAST_PATH_MIN_CONFIDENCE and k not in tabular
+    }
+
+    # Ask the LLM only for the rest, and only if the text hints at them
+    llm_fields = hinted_fields(
+        clean_text, [k for k in SCHEMA if k not in fast and k not in tabular]
+    )
+    merged = {}
+
+    if llm_fields:
+        signal_text = compress_to_signal(clean_text)
+        # print(signal_text)
+
+        chunks = chunk_text(signal_text, llm_fields)
+        # print(chunks)
+        # Merged by chunk order, so first-non-null precedence stays deterministic
+        partial_results = extract_chunks(chunks, llm_fields)
+
+        merged = merge_results(partial_results, llm_fields)
+
+    record_run(len(SCHEMA) - len(tabular), len(fast), llm_called=bool(llm_fields))
+    annotate(
+        tabular_fields=len(tabular),
+        fast_path_fields=len(fast),
+        llm_fields=len(llm_fields),
+        llm_chunks=len(chunks) if llm_fields else 0,
+    )
 
     extracted = {}
     for k in SCHEMA:
+        if k in tabular:
+            extracted[k] = {"source": "tabular", **tabular[k]}
+            continue
+
+        if k in fast:
+            extracted[k] = {
+                "value": fast[k]["value"],
+                "source": "fast_path",
+                "confidence": fast[k]["confidence"],
+            }
+            continue
+
         v = merged.get(k)
         if k in {
             "income",
@@ -183,7 +372,7 @@ Input:
             "liabilities"
         }:
             v = safe_number(v)
-        extracted[k] = {"value": v}
+        extracted[k] = {"value": v, "source": "llm" if k in llm_fields else None}
 
     state["extracted_data"] = extracted
     user_text = state.get("user_input", "")
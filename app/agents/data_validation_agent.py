@@ -1,8 +1,29 @@
 from typing import Dict, Any
 import logging
 
+from app.observability.tracing import traced
+
 logger = logging.getLogger("DataValidationAgent")
 
+VALIDATED_FIELDS = [
+    "income",
+    "family_size",
+    "employment_years",
+    "employment_status",
+    "education_level",
+    "assets",
+    "liabilities",
+]
+
+NUMERIC_FIELDS = {
+    "income",
+    "family_size",
+    "employment_years",
+    "assets",
+    "liabilities",
+}
+
+@traced("data_validation")
 def data_validation_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     extracted = state.get("extracted_data", {})
     validated = {}
@@ -11,14 +32,32 @@ def data_validation_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         v = extracted.get(k, {}).get("value")
         return v if v is not None else None
 
-    validated["income"] = val("income")
-    validated["family_size"] = val("family_size")
-    validated["employment_years"] = val("employment_years")
-    validated["employment_status"] = val("employment_status")
-    validated["education_level"] = val("education_level")
-    validated["assets"] = val("assets")
-    validated["liabilities"] = val("liabilities")
+    for field in VALIDATED_FIELDS:
+        validated[field] = val(field)
 
     state["validated_data"] = validated
     logger.info(f"Validated data (preserving missing): {validated}")
     return state
+
+
+def validate_frame(records):
+    """
+    Chunk-level counterpart of data_validation_agent for structured records.
+
+    Keeps only the validated fields, adds missing columns as nulls and
+    coerces numeric fields (unparseable values become missing).
+    """
+    import pandas as pd
+
+    validated = pd.DataFrame(index=records.index)
+
+    for field in VALIDATED_FIELDS:
+        if field not in records:
+            validated[field] = None
+        elif field in NUMERIC_FIELDS:
+            validated[field] = pd.to_numeric(records[field], errors="coerce")
+        else:
+            col = records[field].astype(object)
+            validated[field] = col.where(col.notna(), None)
+
+    return validated
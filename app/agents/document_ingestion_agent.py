@@ -24,32 +24,461 @@ def check_cancel(state: Dict[str, Any]):
         raise RuntimeError("Agent execution cancelled")
 
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import streamlit as st
 import fitz
 import pandas as pd
 from PIL import Image
 import pytesseract
 import io
+import hashlib
+import json
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import (
+    ENABLE_OCR,
+    INGESTION_CACHE_MAX_ENTRIES,
+    INGESTION_CACHE_MAX_MB,
+    INGESTION_MAX_WORKERS,
+    PDF_TEXT_MIN_CHARS,
+    PDF_OCR_DPI,
+    PDF_OCR_CACHE_MAX_ENTRIES,
+    TABULAR_BLOCK_ROWS,
+    TABULAR_PREVIEW_ROWS,
+)
+from app.agents import ingestion_workers
+from app.observability.tracing import annotate, traced
+from app.storage.documents import link_application, lookup_parsed, store_document
+
+
+# --------------------------------------------------
+# Ingestion cache (process-level, shared across sessions)
+# --------------------------------------------------
+class IngestionCache:
+    """
+    LRU of parsed documents keyed by (content hash, MIME type, extension),
+    bounded by entry count and approximate size of the stored text/tables.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data: bytes, mime_type: str, name: str) -> tuple:
+        ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+        return hashlib.sha256(data).hexdigest(), mime_type or "", ext
+
+    @staticmethod
+    def _size(doc: Dict[str, Any]) -> int:
+        size = len(doc.get("raw_text") or "")
+        for key in ("tables", "structured"):
+            if doc.get(key):
+                size += len(json.dumps(doc[key], default=str))
+        return size
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key: tuple, doc: Dict[str, Any]):
+        size = self._size(doc)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (dict(doc), size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+ingestion_cache = IngestionCache(
+    max_entries=INGESTION_CACHE_MAX_ENTRIES,
+    max_bytes=INGESTION_CACHE_MAX_MB * 1024 * 1024,
+)
+
+# OCR text of rasterized PDF pages, keyed by page hash
+ocr_page_cache = IngestionCache(
+    max_entries=PDF_OCR_CACHE_MAX_ENTRIES,
+    max_bytes=INGESTION_CACHE_MAX_MB * 1024 * 1024,
+)
+
+# Bump when parsed output changes (ingestion_workers, tabular_extractor,
+# assemble); parses stored by another version are parsed again
+PARSER_VERSION = "2"
+
+# Stored with every parse in the document store: version plus the settings
+# that change parsed output
+PARSER_FINGERPRINT = hashlib.sha256(json.dumps({
+    "version": PARSER_VERSION,
+    "enable_ocr": ENABLE_OCR,
+    "pdf_text_min_chars": PDF_TEXT_MIN_CHARS,
+    "pdf_ocr_dpi": PDF_OCR_DPI,
+    "tabular_block_rows": TABULAR_BLOCK_ROWS,
+    "tabular_preview_rows": TABULAR_PREVIEW_ROWS,
+}, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class BytesUpload(io.BytesIO):
+    """
+    In-memory stand-in for a Streamlit UploadedFile (name, type, size,
+    read / getvalue), for callers that are not Streamlit: benchmarks,
+    load tests, services.
+    """
+
+    def __init__(self, data: bytes, name: str, mime_type: str):
+        super().__init__(data)
+        self.name = name
+        self.type = mime_type
+        self.size = len(data)
+
+
+def read_upload(f) -> bytes:
+    """
+    Upload bytes, independent of the file's read position.
+    """
+    if hasattr(f, "getvalue"):
+        return f.getvalue()
+
+    f.seek(0)
+    return f.read()
+
+
+# --------------------------------------------------
+# Parallel ingestion (file- and page-level fan-out)
+# --------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_max_workers = INGESTION_MAX_WORKERS
+
+
+def set_max_workers(workers: int):
+    """
+    Override INGESTION_MAX_WORKERS at runtime (e.g. one per job worker
+    process); the pool is rebuilt on next use.
+    """
+    global _max_workers
+
+    _reset_pool()
+    _max_workers = max(1, workers)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Shared worker pool. Uses spawn: forking a multi-threaded Streamlit
+    process is unsafe.
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=_max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    return _pool
 
-def document_ingestion_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    docs = []
-    for f in state.get("uploaded_files", []):
-        text, tables = None, None
 
-        if f.type == "application/pdf":
-            pdf = fitz.open(stream=f.read(), filetype="pdf")
-            text = "\n".join(p.get_text() for p in pdf)
+def _reset_pool():
+    global _pool
 
-        elif f.type.startswith("image"):
-            image = Image.open(io.BytesIO(f.read()))
-            text = pytesseract.image_to_string(image)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
 
-        elif f.name.endswith(".xlsx"):
-            df = pd.read_excel(f)
-            tables = df.to_dict(orient="records")
 
-        docs.append({"raw_text": text, "tables": tables})
+def _split(n: int, parts: int) -> List[tuple]:
+    """
+    Split range(n) into at most `parts` contiguous, ordered ranges.
+    """
+    parts = max(1, min(parts, n))
+    size, extra = divmod(n, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def plan_parts(data: bytes, mime_type: str, name: str, workers: int):
+    """
+    Break one upload into independent tasks.
+
+    PDFs are scanned here: pages with a usable text layer are done, and only
+    image-only pages whose OCR is not cached become (page-level) tasks.
+
+    Returns:
+        kind (str | None): pdf | image | excel | None (unsupported)
+        parts (list): (worker function, args) in page order
+        pages (list | None): per-page records for PDFs
+    """
+    if mime_type == "application/pdf":
+        pages = ingestion_workers.scan_pdf(data, PDF_TEXT_MIN_CHARS, PDF_OCR_DPI)
+        parts = []
+        scheduled = set()
+
+        for p in pages:
+            if p["path"] != "ocr":
+                continue
+
+            page_pdf = p.pop("page_pdf")
+            cached = ocr_page_cache.get((p["hash"],))
+
+            if cached is not None:
+                p.update(text=cached["raw_text"], path="ocr_cached")
+            elif not ENABLE_OCR:
+                p["path"] = "ocr_disabled"
+            elif p["hash"] in scheduled:
+                # Same page image earlier in this file: reuse its OCR
+                p.update(text=None, path="ocr_cached")
+            else:
+                scheduled.add(p["hash"])
+                parts.append((ingestion_workers.pdf_page_ocr, (page_pdf, PDF_OCR_DPI)))
+
+        return "pdf", parts, pages
+
+    if mime_type and mime_type.startswith("image"):
+        n = ingestion_workers.image_frame_count(data)
+        return "image", [
+            (ingestion_workers.image_frames_text, (data, a, b))
+            for a, b in _split(n, workers)
+        ], None
+
+    if name.lower().endswith(".xlsx"):
+        return "excel", [(
+            ingestion_workers.excel_tables, (data, TABULAR_BLOCK_ROWS, TABULAR_PREVIEW_ROWS)
+        )], None
+
+    return None, [], None
+
+
+def assemble(kind: str, results: list, pages: list = None) -> Dict[str, Any]:
+    if kind == "pdf":
+        ocr_results = iter(results)
+        ocr_text = {}
+        for p in pages:
+            if p["path"] == "ocr":
+                p["text"], ocr_seconds = next(ocr_results)
+                p["seconds"] += ocr_seconds
+                ocr_text[p["hash"]] = p["text"]
+                ocr_page_cache.put((p["hash"],), {"raw_text": p["text"]})
+
+        for p in pages:
+            if p["text"] is None:
+                p["text"] = ocr_text[p["hash"]]
+
+        return {
+            "raw_text": "\n".join(p["text"] for p in pages),
+            "tables": None,
+            "pages": [
+                {
+                    "page": p["page"],
+                    "path": p["path"],
+                    "chars": len(p["text"].strip()),
+                    "seconds": round(p["seconds"], 4),
+                }
+                for p in pages
+            ],
+        }
+
+    if kind == "image":
+        return {
+            "raw_text": "\n".join(t for part in results for t in part),
+            "tables": None,
+        }
+
+    if kind == "excel":
+        workbook = results[0]
+        return {
+            "raw_text": None,
+            "tables": workbook["preview"] or None,
+            "structured": {"fields": workbook["fields"], "sheets": workbook["sheets"]},
+        }
+
+    return {"raw_text": None, "tables": None}
+
+
+def ingest_bytes(data: bytes, mime_type: str, name: str) -> Dict[str, Any]:
+    """
+    Parse a single upload in-process.
+    """
+    kind, parts, pages = plan_parts(data, mime_type, name, workers=1)
+    return assemble(kind, [fn(*args) for fn, args in parts], pages)
+
+
+def ingest_many(items: List[tuple], workers: int = None) -> list:
+    """
+    Parse many uploads, fanning out over files and page ranges.
+
+    Args:
+        items: (data, mime_type, name) per upload
+        workers: parallelism; defaults to INGESTION_MAX_WORKERS / set_max_workers
+
+    Returns:
+        one entry per item, in order: the parsed document dict, or the
+        exception raised while parsing that file
+    """
+    workers = _max_workers if workers is None else workers
+    plans = []
+    for data, mime_type, name in items:
+        try:
+            plans.append(plan_parts(data, mime_type, name, workers))
+        except Exception as e:
+            plans.append(e)
+
+    n_tasks = sum(len(p[1]) for p in plans if not isinstance(p, Exception))
+
+    # Not worth the IPC for a single task
+    if workers <= 1 or n_tasks <= 1:
+        results = []
+        for plan in plans:
+            if isinstance(plan, Exception):
+                results.append(plan)
+                continue
+            kind, parts, pages = plan
+            try:
+                results.append(assemble(kind, [fn(*args) for fn, args in parts], pages))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    pool = get_pool()
+    futures = [
+        plan if isinstance(plan, Exception)
+        else (plan[0], [pool.submit(fn, *args) for fn, args in plan[1]], plan[2])
+        for plan in plans
+    ]
+
+    results = []
+    for entry in futures:
+        if isinstance(entry, Exception):
+            results.append(entry)
+            continue
+        kind, parts, pages = entry
+        try:
+            results.append(assemble(kind, [f.result() for f in parts], pages))
+        except BrokenProcessPool as e:
+            _reset_pool()
+            results.append(e)
+        except Exception as e:
+            results.append(e)
+
+    return results
+
+
+def describe_upload(f, data: bytes) -> Dict[str, Any]:
+    return {
+        "file_name": f.name,
+        "file_type": infer_document_type(f.name),
+        "mime_type": f.type,
+        "size_kb": round(len(data) / 1024, 2),
+    }
+
+
+@traced("document_ingestion")
+def document_ingestion_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    files = state.get("uploaded_files") or []
+    docs = [None] * len(files)
+    keys = [None] * len(files)
+    pending = []
+    store_hits = 0
+
+    for i, f in enumerate(files):
+        data = read_upload(f)
+        key = keys[i] = IngestionCache.key(data, f.type, f.name)
+
+        # Only new or changed uploads are parsed / OCR'd: memory first,
+        # then the document store (other processes, earlier runs)
+        cached = ingestion_cache.get(key)
+        if cached is None:
+            cached = lookup_parsed(key, PARSER_FINGERPRINT)
+            if cached is not None:
+                store_hits += 1
+                ingestion_cache.put(key, cached)
+
+        if cached is not None:
+            docs[i] = {**describe_upload(f, data), **cached}
+        else:
+            pending.append((i, f, data, key))
+
+    annotate(
+        files=len(files),
+        cache_hits=len(files) - len(pending),
+        store_hits=store_hits,
+        cache_misses=len(pending),
+    )
+
+    results = ingest_many([(data, f.type, f.name) for _, f, data, _ in pending])
+
+    for (i, f, data, key), result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to process file: {f.name}", exc_info=result)
+            docs[i] = {
+                **describe_upload(f, data),
+                "file_type": "error",
+                "raw_text": None,
+                "tables": None,
+                "error": str(result),
+            }
+            continue
+
+        ingestion_cache.put(key, result)
+        store_document(key, data, result, PARSER_FINGERPRINT)
+        docs[i] = {**describe_upload(f, data), **result}
+
+    # Stored documents and the chat text are listed under the application for
+    # audits and re-processing; the decision is later saved under the same id.
+    # Nothing is kept without documents (a resubmission drops the old list).
+    resubmitted = bool(state.get("application_id"))
+    application_id = state["application_id"] = state.get("application_id") or uuid.uuid4().hex
+    refs = [
+        {"sha256": key[0], "mime_type": key[1], "ext": key[2], "file_name": f.name}
+        for f, key, doc in zip(files, keys, docs)
+        if not doc.get("error")
+    ]
+    if refs or resubmitted:
+        link_application(application_id, refs, state.get("user_input") or "")
 
     state["documents"] = docs
     return state
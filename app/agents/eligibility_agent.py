@@ -1,5 +1,7 @@
 from app.models.eligibility_model import predict_eligibility
+from app.observability.tracing import traced
 
+@traced("eligibility")
 def eligibility_agent(state):
     readiness = state["eligibility_readiness"]
     v = state["validated_data"]
@@ -73,3 +75,44 @@ def eligibility_agent(state):
     }
 
     return state
+
+
+def eligibility_batch(validated, ready):
+    """
+    Chunk-level counterpart of eligibility_agent.
+
+    Args:
+        validated: DataFrame of validated fields (see validate_frame)
+        ready: boolean mask from eligibility_readiness_batch
+
+    Returns:
+        DataFrame with decision, probability, reason and the rule flags.
+        Rows that are not ready get MANUAL_REVIEW without a probability.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from app.models.eligibility_model import predict_eligibility_batch
+
+    n = len(validated)
+    ready = np.asarray(ready, dtype=bool)
+    idx = np.flatnonzero(ready)
+
+    result = pd.DataFrame({
+        "decision": np.full(n, "MANUAL_REVIEW", dtype=object),
+        "probability": np.full(n, np.nan),
+        "reason": np.full(n, "Missing critical information", dtype=object),
+    }, index=validated.index)
+
+    decisions, probabilities, rules = predict_eligibility_batch(validated.iloc[idx])
+
+    result.iloc[idx, result.columns.get_loc("decision")] = decisions
+    result.iloc[idx, result.columns.get_loc("probability")] = np.round(probabilities, 3)
+    result.iloc[idx, result.columns.get_loc("reason")] = "ML-based eligibility assessment"
+
+    for name, flags in rules.items():
+        col = np.zeros(n, dtype=bool)
+        col[idx] = flags
+        result[name] = col
+
+    return result
@@ -1,9 +1,13 @@
+from app.observability.tracing import traced
+
 REQUIRED_FIELDS = [
     "income",
     "employment_status",
     "family_size",
 ]
 
+
+@traced("eligibility_readiness")
 def eligibility_readiness_agent(state):
     validated = state.get("validated_data", {})
     missing = [f for f in REQUIRED_FIELDS if validated.get(f) is None]
@@ -13,3 +17,27 @@ def eligibility_readiness_agent(state):
         "missing_fields": missing,
     }
     return state
+
+
+def eligibility_readiness_batch(validated):
+    """
+    Chunk-level readiness check.
+
+    Returns:
+        ready (pd.Series[bool])
+        missing_fields (pd.Series[str]): comma-separated missing fields
+    """
+    import pandas as pd
+
+    missing = pd.DataFrame(
+        {f: validated[f].isna() for f in REQUIRED_FIELDS},
+        index=validated.index,
+    )
+
+    ready = ~missing.any(axis=1)
+
+    missing_fields = pd.Series("", index=validated.index, dtype=object)
+    for f in REQUIRED_FIELDS:
+        missing_fields = missing_fields.where(~missing[f], missing_fields + f + ",")
+
+    return ready, missing_fields.str.rstrip(",")
@@ -1,3 +1,7 @@
+from app.observability.tracing import traced
+
+
+@traced("enablement")
 def enablement_agent(state):
     v = state["validated_data"]
     decision = state["eligibility"]["decision"]
@@ -23,3 +27,31 @@ def enablement_agent(state):
 
     state["enablement"] = enablement
     return state
+
+
+def enablement_batch(validated, decisions):
+    """
+    Chunk-level counterpart of enablement_agent.
+
+    Returns a DataFrame with the training / job_matching / career_counseling
+    flags and the reasons joined with "; ".
+    """
+    import numpy as np
+    import pandas as pd
+
+    declined = np.isin(np.asarray(decisions, dtype=object), ["SOFT_DECLINE", "REJECT"])
+
+    job_matching = declined & (validated["employment_status"] != "employed").to_numpy()
+    training = declined & validated["education_level"].isin(["unknown", "high_school"]).to_numpy()
+
+    reasons = pd.Series("", index=validated.index, dtype=object)
+    reasons = reasons.where(~job_matching, reasons + "Unstable or no employment; ")
+    reasons = reasons.where(~training, reasons + "Low education level; ")
+    reasons = reasons.where(~declined, reasons + "Needs long-term economic support; ")
+
+    return pd.DataFrame({
+        "training": training,
+        "job_matching": job_matching,
+        "career_counseling": declined,
+        "enablement_reasons": reasons.str.rstrip("; "),
+    }, index=validated.index)
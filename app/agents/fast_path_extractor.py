@@ -0,0 +1,299 @@
+"""
+Deterministic, pattern-based extractor for the extraction SCHEMA fields.
+
+Handles the common chat-typed shapes ("salary 6000, employed, 2 dependents")
+without an LLM round-trip. Every value comes with a confidence; the
+extraction agent only asks the LLM for fields that were not filled with
+enough confidence and that the text actually hints at.
+"""
+
+import re
+import threading
+from typing import Dict, Any, List
+
+# --------------------------------------------------
+# Shared patterns
+# --------------------------------------------------
+WORD_NUMBERS = {
+    "no": 0, "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+CURRENCY = r"(?P<cur>aed|inr|usd|eur|gbp|rs\.?|dhs?|\$|€|£|₹)?\s*"
+NUMBER = r"(?P<num>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?![\d,.]?\d)\s*(?P<mult>k\b|thousand\b|m\b|million\b)?"
+# "5000 AED", "3k dirhams"
+TRAILING_CURRENCY = r"(?:\s*(?P<cur_after>aed|inr|usd|eur|gbp|dhs?|dirhams?|rupees?|dollars?|euros?|pounds?)\b)?"
+COUNT = r"(?P<count>\d{1,2}|" + "|".join(WORD_NUMBERS) + r")"
+
+# Amounts must not be counts of something else ("2 dependents", "5 years",
+# "4 credit cards", "2 cars")
+NOT_A_COUNT = (
+    r"(?!\s*(?:(?:credit\s+|debit\s+)?cards?|dependents?|children|kids|sons?|daughters?"
+    r"|years?|yrs?|months?|weeks?|days?|times?|members?|people|persons?|friends?|relatives?"
+    r"|banks?|accounts?|cars?|vehicles?|houses?|homes?|apartments?|flats?|properties|plots?"
+    r"|loans?|debts?|installments?|instalments?|items?)\b)"
+)
+
+# Without a currency or a multiplier, a bare number this small after an
+# amount keyword is more likely a count than money; leave it to the LLM
+MIN_BARE_AMOUNT = 100
+
+# Keyword, a short non-numeric gap, then the amount
+GAP = r"[^\d\n]{0,20}?"
+
+MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+ANNUAL = re.compile(r"\b(?:annual(?:ly)?|yearly|per\s+(?:year|annum)|a\s+year|p\.?a\.?)\b", re.I)
+
+
+def _amount(m) -> float:
+    value = float(m.group("num").replace(",", ""))
+    mult = (m.group("mult") or "").lower()
+    return value * MULTIPLIERS.get(mult, 1)
+
+
+def _looks_like_year(m) -> bool:
+    raw = m.group("num")
+    return not m.group("mult") and raw.isdigit() and 1900 <= int(raw) <= 2100
+
+
+def _looks_like_count(m) -> bool:
+    """
+    Small bare number: no currency marker, no multiplier ("debts: 4").
+    Zero reads the same either way.
+    """
+    has_currency = m.group("cur") or m.group("cur_after")
+    return not has_currency and not m.group("mult") and 0 < _amount(m) < MIN_BARE_AMOUNT
+
+
+# --------------------------------------------------
+# Field patterns
+# --------------------------------------------------
+INCOME = re.compile(
+    r"\b(?:monthly\s+)?(?:salary|income|earn(?:s|ing|ings)?|wages?|pay)\b" + GAP + CURRENCY + NUMBER + NOT_A_COUNT
+    + TRAILING_CURRENCY,
+    re.I,
+)
+
+ASSETS = re.compile(
+    r"\b(?:total\s+)?(?:assets?|savings?)\b" + GAP + CURRENCY + NUMBER + NOT_A_COUNT + TRAILING_CURRENCY,
+    re.I,
+)
+
+LIABILITIES = re.compile(
+    r"\b(?:total\s+)?(?:liabilit(?:y|ies)|debts?|loans?|owe)\b" + GAP + CURRENCY + NUMBER + NOT_A_COUNT
+    + TRAILING_CURRENCY,
+    re.I,
+)
+
+NO_LIABILITIES = re.compile(r"\bno\s+(?:liabilit(?:y|ies)|debts?|loans?)\b", re.I)
+
+DEPENDENTS = [
+    (re.compile(r"\b" + COUNT + r"\s+(?:dependents?|children|kids)\b", re.I), 0.95),
+    (re.compile(r"\b(?:dependents?|children|kids)\s*[:=\-]?\s*" + COUNT + r"\b", re.I), 0.9),
+    (re.compile(r"\bfamily\s+of\s+" + COUNT + r"\b", re.I), 0.7),
+]
+
+AGE = [
+    (re.compile(r"\bage(?:d)?\s*[:=\-]?\s*(?P<num>\d{1,3})\b", re.I), 0.95),
+    (re.compile(r"\b(?P<num>\d{1,3})\s*(?:years?|yrs?)[\s-]*old\b", re.I), 0.95),
+    (re.compile(r"\b(?P<num>\d{1,3})\s*(?:y/o|yo)\b", re.I), 0.9),
+]
+
+EXPERIENCE = [
+    (re.compile(
+        r"\b(?P<num>\d{1,2}(?:\.\d+)?)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:work(?:ing)?\s+|professional\s+)?(?:experience|exp\b)",
+        re.I,
+    ), 0.9),
+    (re.compile(r"\b(?:experience|exp)\s*[:=\-]?\s*(?P<num>\d{1,2}(?:\.\d+)?)\s*(?:years?|yrs?)\b", re.I), 0.9),
+    (re.compile(r"\b(?:working|employed)\s+(?:for\s+)?(?P<num>\d{1,2}(?:\.\d+)?)\s*(?:years?|yrs?)\b", re.I), 0.8),
+]
+
+# Alternation order matters: "self-employed" and "not employed" must win
+# over the bare "employed" that they contain
+EMPLOYMENT_STATUS = re.compile(
+    r"(?P<self_employed>\bself[\s-]?employed\b|\bfreelanc\w*|\bown\s+(?:a\s+)?business\b|\bbusiness\s+owner\b)"
+    r"|(?P<unemployed>\bunemployed\b|\bjobless\b|\bnot\s+(?:currently\s+)?(?:working|employed)\b"
+    r"|\bno\s+job\b|\bout\s+of\s+work\b|\blost\s+(?:my|his|her|the)\s+job\b)"
+    r"|(?P<retired>\bretired\b|\bpensioner\b)"
+    r"|(?P<student>\bstudent\b|\bstudying\b)"
+    r"|(?P<employed>\bemployed\b|\bemployee\b|\bfull[\s-]?time\b|\bpart[\s-]?time\b|\bworking\s+(?:as|at|for)\b)",
+    re.I,
+)
+
+EMPLOYMENT_LABELS = {
+    "self_employed": "self-employed",
+    "unemployed": "unemployed",
+    "retired": "retired",
+    "student": "student",
+    "employed": "employed",
+}
+
+# Highest level first: a resume listing several keeps the highest
+EDUCATION = [
+    ("phd", re.compile(r"\bph\.?\s?d\b|\bdoctorate\b", re.I)),
+    ("masters", re.compile(r"\bmaster'?s?\b|\bm\.?sc\b|\bmba\b", re.I)),
+    ("bachelor", re.compile(r"\bbachelor'?s?\b|\bb\.?sc\b|\bb\.?tech\b|\bundergraduate\s+degree\b", re.I)),
+    ("high_school", re.compile(r"\bhigh[\s-]?school\b|\bsecondary\s+school\b", re.I)),
+]
+
+# Words suggesting a field is present at all; if none appear, the LLM
+# cannot find the field either and is not asked for it
+FIELD_HINTS = {
+    "income": re.compile(r"salar|income|earn|wage|\bpay", re.I),
+    "family_size": re.compile(r"dependent|child|kid|family|\bsons?\b|daughter|wife|husband|spouse", re.I),
+    "employment_years": re.compile(r"experience|\bexp\b|years?|yrs|since", re.I),
+    "employment_status": re.compile(r"employ|work|\bjob|retire|student|business|freelanc|pension", re.I),
+    "education_level": re.compile(r"degree|bachelor|master|ph\.?\s?d|school|universit|college|diploma|educat|graduat", re.I),
+    "age": re.compile(r"\bage|\bold\b|born|\bdob\b|birth", re.I),
+    "assets": re.compile(r"asset|saving|property|deposit|investment|balance", re.I),
+    "liabilities": re.compile(r"liabilit|debt|loan|mortgage|\bowe|credit\s+card", re.I),
+}
+
+
+# --------------------------------------------------
+# Field extractors
+# --------------------------------------------------
+def _pick(candidates: List[tuple]) -> Dict[str, Any]:
+    """
+    Highest-confidence candidate; disagreement between candidates lowers it.
+    """
+    if not candidates:
+        return None
+
+    value, confidence = max(candidates, key=lambda c: c[1])
+    if len({c[0] for c in candidates}) > 1:
+        confidence = min(confidence, 0.6)
+
+    return {"value": value, "confidence": confidence}
+
+
+def _amount_field(pattern, text: str, monthly: bool = False):
+    candidates = []
+
+    for m in pattern.finditer(text):
+        value = _amount(m)
+        confidence = 0.5 if _looks_like_year(m) or _looks_like_count(m) else 0.95
+
+        window = text[max(0, m.start() - 20):m.end() + 20]
+        if monthly and ANNUAL.search(window):
+            value, confidence = value / 12, min(confidence, 0.8)
+
+        candidates.append((value, confidence))
+
+    return _pick(candidates)
+
+
+def _count_field(patterns, text: str):
+    candidates = []
+
+    for pattern, confidence in patterns:
+        for m in pattern.finditer(text):
+            raw = m.group("count").lower()
+            candidates.append((float(WORD_NUMBERS.get(raw, raw)), confidence))
+
+    return _pick(candidates)
+
+
+def _number_field(patterns, text: str, low: float, high: float):
+    candidates = []
+
+    for pattern, confidence in patterns:
+        for m in pattern.finditer(text):
+            value = float(m.group("num"))
+            if low <= value <= high:
+                candidates.append((value, confidence))
+
+    return _pick(candidates)
+
+
+def _employment_status(text: str):
+    found = {
+        m.lastgroup
+        for m in EMPLOYMENT_STATUS.finditer(text)
+    }
+    if not found:
+        return None
+
+    if len(found) == 1:
+        return {"value": EMPLOYMENT_LABELS[found.pop()], "confidence": 0.9}
+
+    # Conflicting statements: report the most specific, let the LLM decide
+    for group in EMPLOYMENT_LABELS:
+        if group in found:
+            return {"value": EMPLOYMENT_LABELS[group], "confidence": 0.5}
+
+
+def _education_level(text: str):
+    for level, pattern in EDUCATION:
+        if pattern.search(text):
+            return {"value": level, "confidence": 0.85}
+    return None
+
+
+# --------------------------------------------------
+# Public API
+# --------------------------------------------------
+def fast_extract(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Extract SCHEMA fields with regular expressions.
+
+    Returns:
+        {field: {"value": ..., "confidence": 0..1}} for the fields found
+    """
+    results = {
+        "income": _amount_field(INCOME, text, monthly=True),
+        "family_size": _count_field(DEPENDENTS, text),
+        "employment_years": _number_field(EXPERIENCE, text, 0, 70),
+        "employment_status": _employment_status(text),
+        "education_level": _education_level(text),
+        "age": _number_field(AGE, text, 14, 120),
+        "assets": _amount_field(ASSETS, text),
+        "liabilities": _amount_field(LIABILITIES, text),
+    }
+
+    if results["liabilities"] is None and NO_LIABILITIES.search(text):
+        results["liabilities"] = {"value": 0.0, "confidence": 0.85}
+
+    return {k: v for k, v in results.items() if v is not None}
+
+
+def hinted_fields(text: str, fields) -> List[str]:
+    """
+    Fields whose hint words occur in the text.
+    """
+    return [f for f in fields if FIELD_HINTS[f].search(text)]
+
+
+# --------------------------------------------------
+# Hit-rate counters
+# --------------------------------------------------
+_stats_lock = threading.Lock()
+_stats = {
+    "runs": 0,
+    "runs_without_llm": 0,
+    "fields_requested": 0,
+    "fields_from_fast_path": 0,
+}
+
+
+def record_run(fields_requested: int, fields_from_fast_path: int, llm_called: bool):
+    with _stats_lock:
+        _stats["runs"] += 1
+        _stats["runs_without_llm"] += 0 if llm_called else 1
+        _stats["fields_requested"] += fields_requested
+        _stats["fields_from_fast_path"] += fields_from_fast_path
+
+
+def fast_path_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats["run_hit_rate"] = (
+        round(stats["runs_without_llm"] / stats["runs"], 3) if stats["runs"] else None
+    )
+    stats["field_hit_rate"] = (
+        round(stats["fields_from_fast_path"] / stats["fields_requested"], 3)
+        if stats["fields_requested"] else None
+    )
+    return stats
@@ -0,0 +1,103 @@
+"""
+Process-pool workers for document ingestion.
+
+Kept free of Streamlit and other heavy imports so pool workers start fast.
+Functions take raw bytes (a whole upload or a single PDF page) and are
+safe to run in a separate process.
+"""
+
+from typing import Dict, Any, List, Tuple
+import hashlib
+import io
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+
+
+# --------------------------------------------------
+# PDF (hybrid: text layer, OCR only for image-only pages)
+# --------------------------------------------------
+def pdf_page_hash(pdf, page, dpi: int) -> str:
+    """
+    Identity of a page's rendering: content stream, embedded images,
+    geometry and DPI. Identical scanned pages share one OCR result.
+    """
+    h = hashlib.sha256()
+    h.update(page.read_contents() or b"")
+    for image in page.get_images(full=True):
+        h.update(pdf.xref_stream_raw(image[0]) or b"")
+    h.update(f"{tuple(page.rect)}|{page.rotation}|{dpi}".encode())
+    return h.hexdigest()
+
+
+def scan_pdf(data: bytes, min_chars: int, dpi: int) -> List[Dict[str, Any]]:
+    """
+    Read the text layer of every page. Pages with fewer than `min_chars`
+    characters are marked for OCR and carry a hash and a one-page PDF
+    (so only that page is shipped to a worker).
+    """
+    pages = []
+
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        for i, page in enumerate(pdf):
+            start = time.perf_counter()
+            text = page.get_text()
+
+            record = {"page": i + 1, "text": text, "path": "text"}
+
+            if len(text.strip()) < min_chars:
+                single = fitz.open()
+                single.insert_pdf(pdf, from_page=i, to_page=i)
+                record.update({
+                    "path": "ocr",
+                    "hash": pdf_page_hash(pdf, page, dpi),
+                    "page_pdf": single.tobytes(),
+                })
+                single.close()
+
+            record["seconds"] = time.perf_counter() - start
+            pages.append(record)
+
+    return pages
+
+
+def pdf_page_ocr(page_pdf: bytes, dpi: int) -> Tuple[str, float]:
+    """
+    Rasterize a one-page PDF at `dpi` (grayscale) and OCR it.
+    """
+    start = time.perf_counter()
+
+    with fitz.open(stream=page_pdf, filetype="pdf") as pdf:
+        pix = pdf[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+    text = pytesseract.image_to_string(image)
+    return text, time.perf_counter() - start
+
+
+# --------------------------------------------------
+# Images (multi-frame TIFF / GIF are OCR'd per frame)
+# --------------------------------------------------
+def image_frame_count(data: bytes) -> int:
+    with Image.open(io.BytesIO(data)) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def image_frames_text(data: bytes, start: int, stop: int) -> List[str]:
+    texts = []
+    with Image.open(io.BytesIO(data)) as image:
+        for i in range(start, stop):
+            image.seek(i)
+            texts.append(pytesseract.image_to_string(image))
+    return texts
+
+
+# --------------------------------------------------
+# Excel
+# --------------------------------------------------
+def excel_tables(data: bytes, block_rows: int, preview_rows: int) -> Dict[str, Any]:
+    from app.agents.tabular_extractor import extract_workbook
+
+    return extract_workbook(data, block_rows=block_rows, preview_rows=preview_rows)
@@ -1,4 +1,10 @@
-from app.llm.llm_client import call_llm
+import logging
+
+from app.llm.llm_client import call_llm, call_llm_stream, LLMError
+from app.models.context_compactor import get_compactor
+from app.observability.tracing import traced
+
+logger = logging.getLogger("LLMReasoningAgent")
 
 
 def dedupe_lines(text, max_lines=20):
@@ -16,26 +22,14 @@ def dedupe_lines(text, max_lines=20):
     return "\n".join(unique)
 
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-import numpy as np
-
 def tfidf_compact(text, max_sentences=10, max_chars=800):
-    sentences = [s.strip() for s in text.splitlines() if len(s.strip()) > 10]
-
-    if len(sentences) <= max_sentences:
-        return "\n".join(sentences)
+    return get_compactor().compact(text, max_sentences=max_sentences, max_chars=max_chars)
 
-    vectorizer = TfidfVectorizer(stop_words="english")
-    X = vectorizer.fit_transform(sentences)
 
-    scores = np.asarray(X.sum(axis=1)).ravel()
-    top_idx = scores.argsort()[::-1][:max_sentences]
+FALLBACK_EXPLANATION = "Explanation unavailable due to LLM service issue."
 
-    selected = [sentences[i] for i in sorted(top_idx)]
-    return "\n".join(selected)[:max_chars]
 
-
-def llm_reasoning_agent(state):
+def build_reasoning_prompt(state) -> str:
     signals = state["eligibility_signals"]
     eligibility = state["eligibility"]
     recommendation = state.get("recommendation", {})
@@ -45,7 +39,7 @@ def llm_reasoning_agent(state):
     context = tfidf_compact(clean)
 
 
-    prompt = f"""
+    return f"""
 You are generating a factual explanation for a government eligibility decision
 for Economic Social Support.
 
@@ -96,5 +90,38 @@ Next Steps:
 Do NOT add new criteria.
 """
 
-    state["llm_explanation"] = call_llm(prompt)
+
+@traced("llm_reasoning")
+def llm_reasoning_agent(state):
+    prompt = build_reasoning_prompt(state)
+
+    try:
+        state["llm_explanation"] = call_llm(prompt, agent="reasoning")
+    except LLMError as e:
+        logger.error(f"LLM explanation failed: {e}")
+        state["llm_explanation"] = FALLBACK_EXPLANATION
+
     return state
+
+
+def llm_reasoning_stream(state):
+    """
+    Generator variant of llm_reasoning_agent for incremental rendering.
+
+    Yields explanation fragments as they are generated and stores the full
+    text in state["llm_explanation"] once the stream ends.
+    """
+    prompt = build_reasoning_prompt(state)
+    parts = []
+
+    try:
+        for token in call_llm_stream(prompt, agent="reasoning"):
+            parts.append(token)
+            yield token
+    except LLMError as e:
+        logger.error(f"LLM explanation failed: {e}")
+        if not parts:
+            parts.append(FALLBACK_EXPLANATION)
+            yield FALLBACK_EXPLANATION
+
+    state["llm_explanation"] = "".join(parts).strip()
@@ -0,0 +1,471 @@
+"""
+Schema-mapped extraction from Excel workbooks, without the LLM.
+
+Sheets are streamed row by row with openpyxl in read-only mode and
+aggregated in fixed-size pandas blocks, so memory stays bounded by the
+block size (plus one running total per month for transaction sheets).
+
+Recognized layouts, per sheet:
+- records:        header columns named like SCHEMA fields (Income, Age, Assets, ...)
+- transactions:   a date column plus credit / amount columns (bank statements);
+                  income is the average monthly credits
+- asset_liability: a type / description column plus an amount column;
+                  amounts are summed per asset / liability label
+- key_value:      no header; rows like "Monthly income | 6,000"
+
+Kept free of Streamlit and LLM imports: runs inside ingestion pool workers.
+"""
+
+import io
+import itertools
+import re
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+# --------------------------------------------------
+# Header / label vocabulary
+# --------------------------------------------------
+# Order matters: the first field a header matches wins
+# ("Employment years" is employment_years, not employment_status)
+FIELD_HEADERS = [
+    ("employment_years", re.compile(r"\b(?:years?\s+(?:of\s+)?(?:experience|employ\w*|service)|experience|employment\s+years|tenure)\b")),
+    ("employment_status", re.compile(r"\b(?:employment(?:\s+status)?|job\s+status|work\s+status)\b")),
+    ("education_level", re.compile(r"\b(?:education(?:\s+level)?|qualification|highest\s+degree|degree)\b")),
+    ("family_size", re.compile(r"\b(?:dependents?|dependants?|family\s+size|household\s+size|children)\b")),
+    ("income", re.compile(r"\b(?:(?:monthly\s+|net\s+|gross\s+)?(?:income|salary|wages?|earnings)|net\s+pay|gross\s+pay)\b")),
+    ("age", re.compile(r"^age\b|\bage\s*\(|\bage\s+in\s+years\b|^applicant\s+age$")),
+    ("assets", re.compile(r"\b(?:total\s+)?(?:assets?|savings)\b")),
+    ("liabilities", re.compile(r"\b(?:total\s+)?(?:liabilit(?:y|ies)|debts?|loans?\s+outstanding|outstanding\s+loans?)\b")),
+]
+
+COLUMN_HEADERS = {
+    "date": re.compile(r"\b(?:date|month|period|posted|value\s+date)\b"),
+    "credit": re.compile(r"\b(?:credits?|deposits?|money\s+in|paid\s+in|cr)\b"),
+    "debit": re.compile(r"\b(?:debits?|withdrawals?|money\s+out|paid\s+out|dr)\b"),
+    "amount": re.compile(r"\b(?:amount|value|sum|aed|usd)\b"),
+    "type": re.compile(r"\b(?:type|category|class|kind)\b"),
+    "description": re.compile(r"\b(?:description|details|narration|particulars|item|name)\b"),
+}
+
+CREDIT_LABEL = r"^\s*(?:cr|credit|deposit|incoming|inflow)"
+LIABILITY_LABEL = r"liabilit|debt|loan|mortgage|credit\s*card|owed|payable|overdraft"
+ASSET_LABEL = r"asset|saving|propert|deposit|investment|cash|vehicle|gold|shares|stock|fund|land|house|apartment"
+
+NUMERIC_FIELDS = {"income", "family_size", "employment_years", "age", "assets", "liabilities"}
+
+# Summed over all rows; every other field takes its first non-empty value
+SUMMED_FIELDS = {"assets", "liabilities"}
+
+HEADER_SCAN_ROWS = 10
+
+# A whole cell holding one amount: "6000", "-1,250.50", "AED 6,000", "6000 aed"
+CURRENCY_MARK = r"(?:aed|usd|eur|gbp|inr|rs\.?|dhs?|\$|€|£|₹)"
+NUMERIC_CELL = re.compile(
+    r"^\s*" + CURRENCY_MARK + r"?\s*(?P<sign>[-+])?\s*" + CURRENCY_MARK + r"?\s*"
+    r"(?P<num>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+)\s*" + CURRENCY_MARK + r"?\s*$",
+    re.I,
+)
+
+CONFIDENCE = {
+    "column": 0.95,
+    "key_value": 0.9,
+    "labelled_sum": 0.9,
+    "average_monthly": 0.85,
+}
+
+
+def normalize_header(value) -> str:
+    return re.sub(r"[^a-z0-9()]+", " ", str(value).lower()).strip()
+
+
+def header_field(header: str) -> Optional[str]:
+    for field, pattern in FIELD_HEADERS:
+        if pattern.search(header):
+            return field
+    return None
+
+
+def header_column(header: str) -> Optional[str]:
+    for column, pattern in COLUMN_HEADERS.items():
+        if pattern.search(header):
+            return column
+    return None
+
+
+def to_number(series: pd.Series) -> pd.Series:
+    """
+    Numbers from cells like 6000, "6,000", "AED 6,000.50". Anything else
+    ("12/2024", "2-3", "n/a") becomes NaN rather than having characters
+    stripped until it parses.
+    """
+    if series.dtype != object:
+        return pd.to_numeric(series, errors="coerce")
+
+    numeric = series.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    parts = series.where(~numeric).astype(str).str.extract(NUMERIC_CELL)
+    text_values = pd.to_numeric(parts["num"].str.replace(",", "", regex=False), errors="coerce")
+    text_values = text_values.where(parts["sign"] != "-", -text_values)
+
+    return pd.to_numeric(series.where(numeric), errors="coerce").fillna(text_values)
+
+
+def to_month(series: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(series, errors="coerce", format="mixed")
+    return dates.dt.to_period("M")
+
+
+def _is_text(value) -> bool:
+    return isinstance(value, str) and value.strip() != ""
+
+
+def find_header(rows: List[tuple]):
+    """
+    Index of the header row among the first rows of a sheet, or None.
+
+    A header row holds only text, and at least two of its cells (or its only
+    cell) name a known field or column.
+    """
+    for i, row in enumerate(rows):
+        cells = [c for c in row if c is not None and str(c).strip() != ""]
+        if not cells or not all(_is_text(c) for c in cells):
+            continue
+
+        known = sum(
+            1 for c in cells
+            if header_field(normalize_header(c)) or header_column(normalize_header(c))
+        )
+        if known and known >= min(2, len(cells)):
+            return i
+
+    return None
+
+
+# --------------------------------------------------
+# Per-sheet aggregation (bounded memory)
+# --------------------------------------------------
+class SheetAggregator:
+    """
+    Running aggregates of one sheet, fed block by block.
+    """
+
+    def __init__(self, sheet: str, header: tuple):
+        self.sheet = sheet
+        self.headers = [
+            str(h).strip() if h is not None else f"column_{i + 1}"
+            for i, h in enumerate(header)
+        ]
+        self.rows = 0
+
+        # SCHEMA field → column position (first matching column wins)
+        self.fields = {}
+        # date / credit / debit / amount / type / description → column position
+        self.columns = {}
+
+        for i, h in enumerate(self.headers):
+            norm = normalize_header(h)
+            field = header_field(norm)
+            if field and field not in self.fields:
+                self.fields[field] = i
+                continue
+            column = header_column(norm)
+            if column and column not in self.columns:
+                self.columns[column] = i
+
+        if "date" in self.columns and ({"credit", "amount"} & set(self.columns)):
+            self.layout = "transactions"
+        elif "amount" in self.columns and (
+            {"type", "description"} & set(self.columns)
+            or re.search(ASSET_LABEL + "|" + LIABILITY_LABEL, sheet, re.I)
+        ):
+            self.layout = "asset_liability"
+        else:
+            self.layout = "records"
+
+        self.first = {}
+        self.sums = {}
+        self.counts = {}
+        self.monthly_credits = {}
+        self.monthly_income = {}
+        self.labelled = {"assets": 0.0, "liabilities": 0.0}
+        self.labelled_rows = {"assets": 0, "liabilities": 0}
+
+    # ---------------- blocks ----------------
+    def add(self, block: List[tuple]):
+        width = len(self.headers)
+        df = pd.DataFrame(
+            [tuple(r[:width]) + (None,) * (width - len(r)) for r in block],
+            columns=range(width),
+        )
+        df = df.dropna(how="all")
+        if df.empty:
+            return
+
+        self.rows += len(df)
+        self._add_fields(df)
+
+        if self.layout == "transactions":
+            self._add_transactions(df)
+        elif self.layout == "asset_liability":
+            self._add_asset_liability(df)
+
+    def _add_fields(self, df: pd.DataFrame):
+        month = None
+        if "date" in self.columns:
+            month = to_month(df[self.columns["date"]])
+
+        for field, col in self.fields.items():
+            if field in NUMERIC_FIELDS:
+                values = to_number(df[col])
+
+                if field in SUMMED_FIELDS:
+                    self.sums[field] = self.sums.get(field, 0.0) + float(values.sum())
+                    self.counts[field] = self.counts.get(field, 0) + int(values.notna().sum())
+                    continue
+
+                if field == "income" and month is not None and month.notna().any():
+                    self._add_monthly(self.monthly_income, month, values)
+                    continue
+            else:
+                values = df[col].where(df[col].map(_is_text))
+
+            if field not in self.first:
+                present = values.dropna()
+                if not present.empty:
+                    self.first[field] = present.iloc[0]
+
+    def _add_monthly(self, target: dict, month: pd.Series, values: pd.Series):
+        totals = values.fillna(0).groupby(month).sum()
+        for period, total in totals.items():
+            target[period] = target.get(period, 0.0) + float(total)
+
+    def _add_transactions(self, df: pd.DataFrame):
+        month = to_month(df[self.columns["date"]])
+
+        if "credit" in self.columns:
+            credits = to_number(df[self.columns["credit"]]).clip(lower=0)
+        else:
+            amount = to_number(df[self.columns["amount"]])
+            if "type" in self.columns:
+                is_credit = df[self.columns["type"]].astype(str).str.contains(
+                    CREDIT_LABEL, case=False, regex=True
+                )
+                credits = amount.abs().where(is_credit, 0.0)
+            else:
+                credits = amount.clip(lower=0)
+
+        dated = month.notna()
+        self._add_monthly(self.monthly_credits, month[dated], credits[dated])
+
+    def _add_asset_liability(self, df: pd.DataFrame):
+        amount = to_number(df[self.columns["amount"]]).abs()
+
+        label_col = self.columns.get("type", self.columns.get("description"))
+        if label_col is not None:
+            labels = df[label_col].astype(str)
+            is_liability = labels.str.contains(LIABILITY_LABEL, case=False, regex=True)
+            is_asset = ~is_liability & labels.str.contains(ASSET_LABEL, case=False, regex=True)
+        elif re.search(LIABILITY_LABEL, self.sheet, re.I):
+            is_liability = pd.Series(True, index=df.index)
+            is_asset = ~is_liability
+        else:
+            is_asset = pd.Series(True, index=df.index)
+            is_liability = ~is_asset
+
+        for field, mask in (("assets", is_asset), ("liabilities", is_liability)):
+            mask = mask & amount.notna()
+            self.labelled[field] += float(amount[mask].sum())
+            self.labelled_rows[field] += int(mask.sum())
+
+    # ---------------- result ----------------
+    def _provenance(self, method: str, columns: List[int], **extra) -> Dict[str, Any]:
+        return {
+            "sheet": self.sheet,
+            "columns": [self.headers[c] for c in columns],
+            "method": method,
+            "rows": self.rows,
+            **extra,
+        }
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """
+        {field: {"value", "confidence", "provenance"}} for the fields found.
+        """
+        found = {}
+
+        for field, col in self.fields.items():
+            if field in SUMMED_FIELDS:
+                if self.counts.get(field):
+                    found[field] = {
+                        "value": round(self.sums[field], 2),
+                        "confidence": CONFIDENCE["column"],
+                        "provenance": self._provenance("column_sum", [col]),
+                    }
+            elif field == "income" and self.monthly_income:
+                found[field] = {
+                    "value": round(sum(self.monthly_income.values()) / len(self.monthly_income), 2),
+                    "confidence": CONFIDENCE["average_monthly"],
+                    "provenance": self._provenance(
+                        "average_monthly", [col, self.columns["date"]],
+                        months=len(self.monthly_income),
+                    ),
+                }
+            elif field in self.first:
+                value = self.first[field]
+                found[field] = {
+                    "value": float(value) if field in NUMERIC_FIELDS else str(value).strip().lower(),
+                    "confidence": CONFIDENCE["column"],
+                    "provenance": self._provenance("first_value", [col]),
+                }
+
+        if "income" not in found and self.monthly_credits:
+            credit_col = self.columns.get("credit", self.columns.get("amount"))
+            found["income"] = {
+                "value": round(sum(self.monthly_credits.values()) / len(self.monthly_credits), 2),
+                "confidence": CONFIDENCE["average_monthly"],
+                "provenance": self._provenance(
+                    "average_monthly_credits", [self.columns["date"], credit_col],
+                    months=len(self.monthly_credits),
+                ),
+            }
+
+        if self.layout == "asset_liability":
+            used = [self.columns["amount"]] + [
+                self.columns[c] for c in ("type", "description") if c in self.columns
+            ][:1]
+            for field in ("assets", "liabilities"):
+                if field not in found and self.labelled_rows[field]:
+                    found[field] = {
+                        "value": round(self.labelled[field], 2),
+                        "confidence": CONFIDENCE["labelled_sum"],
+                        "provenance": self._provenance(
+                            "labelled_sum", used, matched_rows=self.labelled_rows[field],
+                        ),
+                    }
+
+        return found
+
+
+def key_value_fields(sheet: str, rows) -> Dict[str, Dict[str, Any]]:
+    """
+    Fields from label / value rows ("Monthly income | 6,000").
+
+    `rows` is consumed lazily and only until every field has been found.
+    """
+    found = {}
+
+    for r, row in enumerate(rows, start=1):
+        if len(found) == len(FIELD_HEADERS):
+            break
+
+        cells = [c for c in row if c is not None and str(c).strip() != ""]
+        if len(cells) < 2 or not _is_text(cells[0]):
+            continue
+
+        field = header_field(normalize_header(cells[0]))
+        if field is None or field in found:
+            continue
+
+        value = cells[1]
+        if field in NUMERIC_FIELDS:
+            value = to_number(pd.Series([value], dtype=object)).iloc[0]
+            if pd.isna(value):
+                continue
+            value = float(value)
+        elif _is_text(value):
+            value = value.strip().lower()
+        else:
+            continue
+
+        found[field] = {
+            "value": value,
+            "confidence": CONFIDENCE["key_value"],
+            "provenance": {
+                "sheet": sheet,
+                "columns": [str(cells[0]).strip()],
+                "method": "key_value",
+                "rows": r,
+            },
+        }
+
+    return found
+
+
+# --------------------------------------------------
+# Workbook entry point
+# --------------------------------------------------
+def extract_workbook(data: bytes, block_rows: int = 5000, preview_rows: int = 50) -> Dict[str, Any]:
+    """
+    Stream every sheet of an .xlsx workbook and aggregate SCHEMA fields.
+
+    Returns:
+        {
+          "fields": {field: {"value", "confidence", "provenance"}},  # first sheet wins
+          "sheets": [{"sheet", "layout", "rows", "columns"}],
+          "preview": [row dicts],  # at most `preview_rows`, across sheets
+        }
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    fields, sheets, preview = {}, [], []
+
+    try:
+        for ws in workbook.worksheets:
+            rows = ws.iter_rows(values_only=True)
+
+            head = []
+            for row in rows:
+                head.append(row)
+                if len(head) >= HEADER_SCAN_ROWS:
+                    break
+
+            header_at = find_header(head)
+
+            if header_at is None:
+                # Usually a small form, but may be a headerless dump: stream it
+                found = key_value_fields(ws.title, itertools.chain(head, rows))
+                sheets.append({"sheet": ws.title, "layout": "key_value", "rows": None, "columns": []})
+            else:
+                agg = SheetAggregator(ws.title, head[header_at])
+                block = list(head[header_at + 1:])
+
+                for row in rows:
+                    block.append(row)
+                    if len(block) >= block_rows:
+                        preview.extend(_preview(agg, block, preview_rows - len(preview)))
+                        agg.add(block)
+                        block = []
+
+                if block:
+                    preview.extend(_preview(agg, block, preview_rows - len(preview)))
+                    agg.add(block)
+
+                found = agg.result()
+                sheets.append({
+                    "sheet": ws.title,
+                    "layout": agg.layout,
+                    "rows": agg.rows,
+                    "columns": agg.headers,
+                })
+
+            for field, value in found.items():
+                fields.setdefault(field, value)
+    finally:
+        workbook.close()
+
+    return {"fields": fields, "sheets": sheets, "preview": preview}
+
+
+def _preview(agg: SheetAggregator, block: List[tuple], limit: int) -> List[dict]:
+    out = []
+    for row in block:
+        if len(out) >= limit:
+            break
+        if all(c is None for c in row):
+            continue
+        out.append({
+            h: (v.isoformat() if hasattr(v, "isoformat") else v)
+            for h, v in zip(agg.headers, row)
+        })
+    return out
@@ -0,0 +1,246 @@
+"""
+Offline bulk re-scoring of structured application records.
+
+Streams records from CSV / Parquet / JSONL in bounded-size chunks through
+validation, readiness, the eligibility model and enablement, and writes one
+output part per chunk. Progress is checkpointed after every chunk so an
+interrupted run resumes from the last completed chunk.
+
+Usage:
+    python -m app.batch.rescore applications.parquet out/ --chunk-size 50000
+    python -m app.batch.rescore applications.csv out/ --explain --format jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterator
+
+import pandas as pd
+
+from app.agents.data_validation_agent import validate_frame
+from app.agents.eligibility_readiness_agent import eligibility_readiness_batch
+from app.agents.eligibility_agent import eligibility_batch
+from app.agents.enablement_agent import enablement_batch
+
+logger = logging.getLogger("BatchRescore")
+
+DEFAULT_CHUNK_SIZE = 50_000
+CHECKPOINT_FILE = "_checkpoint.json"
+ID_COLUMN = "application_id"
+
+
+# --------------------------------------------------
+# Input readers (bounded memory)
+# --------------------------------------------------
+def iter_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    suffix = path.suffix.lower()
+
+    if suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+    elif suffix in {".jsonl", ".ndjson"}:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+    else:
+        raise ValueError(f"Unsupported input format: {path.suffix}")
+
+
+# --------------------------------------------------
+# Output writers
+# --------------------------------------------------
+def write_part(df: pd.DataFrame, path: Path, fmt: str):
+    tmp = path.with_name(path.name + ".tmp")
+
+    if fmt == "csv":
+        df.to_csv(tmp, index=False)
+    elif fmt == "jsonl":
+        df.to_json(tmp, orient="records", lines=True)
+    elif fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+    os.replace(tmp, path)
+
+
+def load_checkpoint(out_dir: Path) -> Dict[str, Any]:
+    path = out_dir / CHECKPOINT_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_checkpoint(out_dir: Path, checkpoint: Dict[str, Any]):
+    path = out_dir / CHECKPOINT_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(tmp, path)
+
+
+# --------------------------------------------------
+# Optional LLM explanation (per row, slow)
+# --------------------------------------------------
+def explain_rows(validated: pd.DataFrame, scored: pd.DataFrame, context) -> pd.Series:
+    from app.agents.llm_reasoning_agent import llm_reasoning_agent
+
+    explanations = []
+    for i in range(len(validated)):
+        v = {
+            k: (None if pd.isna(x) else x)
+            for k, x in validated.iloc[i].to_dict().items()
+        }
+        s = scored.iloc[i]
+
+        income_pc = (
+            v["income"] / v["family_size"]
+            if v["income"] is not None and v["family_size"] not in (None, 0)
+            else None
+        )
+        net_worth = (
+            v["assets"] - v["liabilities"]
+            if v["assets"] is not None and v["liabilities"] is not None
+            else None
+        )
+
+        eligibility = {"decision": s["decision"], "reason": s["reason"]}
+        if not pd.isna(s["probability"]):
+            eligibility["probability"] = float(s["probability"])
+
+        state = {
+            "validated_data": v,
+            "eligibility": eligibility,
+            "eligibility_signals": {
+                **v,
+                "income_per_capita": income_pc,
+                "net_worth": net_worth,
+                "rule_low_income_pc": bool(s["rule_low_income_pc"]),
+                "rule_unemployed_low_income": bool(s["rule_unemployed_low_income"]),
+                "rule_negative_net_worth_unemployed": bool(s["rule_negative_net_worth_unemployed"]),
+            },
+            "llm_context": context.iloc[i] if context is not None and isinstance(context.iloc[i], str) else "",
+        }
+        explanations.append(llm_reasoning_agent(state)["llm_explanation"])
+
+    return pd.Series(explanations, index=validated.index, dtype=object)
+
+
+# --------------------------------------------------
+# Chunk pipeline
+# --------------------------------------------------
+def score_chunk(records: pd.DataFrame, explain: bool = False) -> pd.DataFrame:
+    """
+    Validation -> readiness -> eligibility -> enablement on a whole chunk.
+    """
+    validated = validate_frame(records)
+    ready, missing_fields = eligibility_readiness_batch(validated)
+    scored = eligibility_batch(validated, ready)
+    enablement = enablement_batch(validated, scored["decision"].to_numpy())
+
+    out = pd.concat([validated, scored, enablement], axis=1)
+    out.insert(0, "readiness", ready.map({True: "ready", False: "insufficient_data"}))
+    out.insert(1, "missing_fields", missing_fields)
+
+    if ID_COLUMN in records:
+        out.insert(0, ID_COLUMN, records[ID_COLUMN])
+
+    if explain:
+        context = records["llm_context"] if "llm_context" in records else None
+        out["llm_explanation"] = explain_rows(validated, scored, context)
+
+    return out
+
+
+def rescore(
+    input_path: Path,
+    out_dir: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    fmt: str = "csv",
+    explain: bool = False,
+    restart: bool = False,
+) -> Dict[str, Any]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # A resumed run must write parts like the ones already written
+    settings = {"input": str(input_path.resolve()), "chunk_size": chunk_size, "format": fmt, "explain": explain}
+
+    checkpoint = {} if restart else load_checkpoint(out_dir)
+    if checkpoint:
+        # Checkpoints from before "explain" was recorded
+        checkpoint.setdefault("explain", explain)
+        if any(checkpoint[k] != v for k, v in settings.items()):
+            raise ValueError(
+                f"{out_dir} holds a checkpoint for {checkpoint['input']} "
+                f"(chunk size {checkpoint['chunk_size']}, format {checkpoint['format']}, "
+                f"explain {checkpoint['explain']}); use --restart or another output dir"
+            )
+        logger.info(f"Resuming after chunk {checkpoint['completed_chunks'] - 1}")
+    else:
+        checkpoint = {**settings, "completed_chunks": 0, "rows": 0}
+
+    start = time.perf_counter()
+    rows_this_run = 0
+
+    for i, records in enumerate(iter_chunks(input_path, chunk_size)):
+        if i < checkpoint["completed_chunks"]:
+            continue
+
+        t0 = time.perf_counter()
+        out = score_chunk(records, explain=explain)
+        write_part(out, out_dir / f"part-{i:05d}.{fmt}", fmt)
+
+        checkpoint["completed_chunks"] = i + 1
+        checkpoint["rows"] += len(out)
+        save_checkpoint(out_dir, checkpoint)
+
+        rows_this_run += len(out)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"chunk {i}: {len(out)} rows in {time.perf_counter() - t0:.2f}s | "
+            f"{rows_this_run / elapsed:,.0f} rows/s overall"
+        )
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows_this_run,
+        "total_rows": checkpoint["rows"],
+        "chunks": checkpoint["completed_chunks"],
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_this_run / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk re-score structured applications")
+    parser.add_argument("input", type=Path, help="CSV, Parquet or JSONL file with one application per row")
+    parser.add_argument("out_dir", type=Path, help="Directory for output parts and the checkpoint")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    parser.add_argument("--explain", action="store_true", help="Generate LLM explanations (slow)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    summary = rescore(
+        args.input,
+        args.out_dir,
+        chunk_size=args.chunk_size,
+        fmt=args.format,
+        explain=args.explain,
+        restart=args.restart,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Durable job queue for bulk application processing (SQLite).
+
+A job holds an application payload (chat text plus paths of its
+documents). Workers claim a job for JOB_VISIBILITY_TIMEOUT seconds and
+keep the claim alive with heartbeats; a job whose worker died becomes
+claimable again once its lease expires. After each pipeline stage the
+worker checkpoints the stage name and state, so a retried job resumes
+from the last completed stage. Failed attempts are retried with
+exponential backoff up to JOB_MAX_ATTEMPTS, then the job is marked
+failed. enqueue refuses work beyond JOB_QUEUE_MAX_PENDING (backpressure).
+
+Usage:
+    python -m app.jobs.queue enqueue applications.jsonl
+    python -m app.jobs.queue stats
+    python -m app.jobs.queue retry-failed
+"""
+
+import argparse
+import json
+import logging
+import mimetypes
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import (
+    JOB_QUEUE_PATH,
+    JOB_VISIBILITY_TIMEOUT,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+    JOB_QUEUE_MAX_PENDING,
+)
+
+logger = logging.getLogger("JobQueue")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Ids per existence query in enqueue_many (SQLite bound-variable limit)
+ID_LOOKUP_CHUNK = 500
+
+
+class QueueFull(Exception):
+    """
+    The queue holds JOB_QUEUE_MAX_PENDING unfinished jobs; retry later.
+    """
+
+
+def dumps(obj) -> str:
+    """
+    JSON for payloads, checkpoints and results (numpy scalars, dates, ...).
+    """
+    return json.dumps(obj, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+
+def document_ref(path, name: str = None, mime_type: str = None) -> Dict[str, str]:
+    """
+    Reference to an uploaded document on disk; the worker reads it when the
+    job reaches ingestion.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Document not found: {path}")
+
+    return {
+        "path": str(path.resolve()),
+        "name": name or path.name,
+        "mime_type": mime_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+    }
+
+
+class Job:
+    __slots__ = ("id", "payload", "attempts", "max_attempts", "stage", "checkpoint", "worker")
+
+    def __init__(self, id, payload, attempts, max_attempts, stage, checkpoint, worker):
+        self.id = id
+        self.payload = json.loads(payload)
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.stage = stage
+        self.checkpoint = json.loads(checkpoint) if checkpoint else None
+        self.worker = worker
+
+
+class JobQueue:
+    def __init__(
+        self,
+        path: Path = JOB_QUEUE_PATH,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF,
+        max_pending: int = JOB_QUEUE_MAX_PENDING,
+    ):
+        self.path = Path(path)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            str(self.path),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id           TEXT PRIMARY KEY,
+                status       TEXT NOT NULL,
+                payload      TEXT NOT NULL,
+                attempts     INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_until  REAL,
+                worker       TEXT,
+                stage        TEXT,
+                checkpoint   TEXT,
+                result       TEXT,
+                error        TEXT,
+                created_at   REAL NOT NULL,
+                updated_at   REAL NOT NULL
+            )
+            """
+        )
+        # Claim scans: queued jobs by due time, running jobs by lease expiry
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status_due ON jobs (status, available_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_until)"
+        )
+
+    # --------------------------------------------------
+    # Producers
+    # --------------------------------------------------
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+
+    def enqueue(self, user_input: str = "", documents: List[Dict[str, str]] = (), job_id: str = None) -> str:
+        """
+        Add one application; returns its job id (also when it already existed).
+        """
+        job_id = job_id or uuid.uuid4().hex
+        self.enqueue_many([{"id": job_id, "user_input": user_input, "documents": list(documents)}])
+        return job_id
+
+    def enqueue_many(self, applications: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Add applications ({"id"?, "user_input", "documents": [document_ref]})
+        in one transaction and return the ids actually added: ids already
+        in the queue (or repeated in the batch) are skipped and do not count
+        against max_pending. Raises QueueFull, adding nothing, if the new
+        jobs do not fit.
+        """
+        now = time.time()
+        rows = {}
+        for a in applications:
+            job_id = a.get("id") or uuid.uuid4().hex
+            if job_id in rows:
+                continue
+            payload = {"user_input": a.get("user_input") or "", "documents": a.get("documents") or []}
+            rows[job_id] = (job_id, QUEUED, dumps(payload), self.max_attempts, now, now, now)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = list(rows)
+                for i in range(0, len(ids), ID_LOOKUP_CHUNK):
+                    chunk = ids[i:i + ID_LOOKUP_CHUNK]
+                    existing = self._conn.execute(
+                        f"SELECT id FROM jobs WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for (job_id,) in existing:
+                        del rows[job_id]
+
+                pending = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+                ).fetchone()[0]
+                if pending + len(rows) > self.max_pending:
+                    raise QueueFull(f"{pending} jobs pending, limit {self.max_pending}")
+
+                self._conn.executemany(
+                    """
+                    INSERT INTO jobs
+                        (id, status, payload, max_attempts, available_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    list(rows.values()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return list(rows)
+
+    # --------------------------------------------------
+    # Workers
+    # --------------------------------------------------
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Lease the job due longest to `worker`: queued jobs are due at
+        available_at, running jobs whose lease expired at lease_until.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Each branch takes its first row from its index
+                row = self._conn.execute(
+                    """
+                    SELECT id FROM (
+                        SELECT * FROM (
+                            SELECT id, available_at AS due FROM jobs
+                            WHERE status = ? AND available_at <= ?
+                            ORDER BY available_at LIMIT 1
+                        )
+                        UNION ALL
+                        SELECT * FROM (
+                            SELECT id, lease_until AS due FROM jobs
+                            WHERE status = ? AND lease_until < ?
+                            ORDER BY lease_until LIMIT 1
+                        )
+                    )
+                    ORDER BY due LIMIT 1
+                    """,
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, worker = ?, lease_until = ?,
+                                    attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, worker, now + self.visibility_timeout, now, row[0]),
+                )
+                job = self._conn.execute(
+                    "SELECT id, payload, attempts, max_attempts, stage, checkpoint, worker FROM jobs WHERE id = ?",
+                    row,
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return Job(*job)
+
+    def _owned_update(self, job: Job, sql: str, params: tuple) -> bool:
+        """
+        Apply an update only while `job` is still leased to its worker
+        (after a lease expiry another worker may own it).
+        """
+        with self._lock:
+            return self._conn.execute(
+                sql + " WHERE id = ? AND worker = ? AND status = ?",
+                params + (job.id, job.worker, RUNNING),
+            ).rowcount == 1
+
+    def heartbeat(self, job: Job) -> bool:
+        now = time.time()
+        return self._owned_update(
+            job, "UPDATE jobs SET lease_until = ?, updated_at = ?",
+            (now + self.visibility_timeout, now),
+        )
+
+    def checkpoint(self, job: Job, stage: str, state: Dict[str, Any]) -> bool:
+        """
+        Record `stage` as completed with the state after it; the lease is
+        extended too.
+        """
+        now = time.time()
+        job.stage, job.checkpoint = stage, state
+        return self._owned_update(
+            job, "UPDATE jobs SET stage = ?, checkpoint = ?, lease_until = ?, updated_at = ?",
+            (stage, dumps(state), now + self.visibility_timeout, now),
+        )
+
+    def complete(self, job: Job, result: Dict[str, Any]) -> bool:
+        # The checkpoint is no longer needed once the result is stored
+        return self._owned_update(
+            job,
+            "UPDATE jobs SET status = ?, result = ?, checkpoint = NULL, lease_until = NULL, "
+            "error = NULL, updated_at = ?",
+            (DONE, dumps(result), time.time()),
+        )
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Schedule a retry with backoff, or mark the job failed after its
+        last attempt. Checkpoints are kept for the retry.
+        """
+        now = time.time()
+        if job.attempts < job.max_attempts:
+            delay = self.retry_backoff * 2 ** (job.attempts - 1)
+            return self._owned_update(
+                job,
+                "UPDATE jobs SET status = ?, available_at = ?, lease_until = NULL, error = ?, updated_at = ?",
+                (QUEUED, now + delay, error, now),
+            )
+
+        return self._owned_update(
+            job, "UPDATE jobs SET status = ?, lease_until = NULL, error = ?, updated_at = ?",
+            (FAILED, error, now),
+        )
+
+    # --------------------------------------------------
+    # Introspection / admin
+    # --------------------------------------------------
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, attempts, stage, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        keys = ("id", "status", "attempts", "stage", "result", "error", "created_at", "updated_at")
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+
+        stats = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        stats.update(dict(rows))
+        return stats
+
+    def retry_failed(self) -> int:
+        """
+        Give failed jobs a fresh set of attempts.
+        """
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, now, now, FAILED),
+            ).rowcount
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def read_applications(path: Path) -> Iterable[Dict[str, Any]]:
+    """
+    JSONL, one application per line:
+        {"application_id": "...", "user_input": "...", "documents": ["scan.pdf", ...]}
+    Document paths are relative to the JSONL file.
+    """
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            a = json.loads(line)
+            yield {
+                "id": a.get("application_id"),
+                "user_input": a.get("user_input") or "",
+                "documents": [document_ref(path.parent / d) for d in a.get("documents") or []],
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Application job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enqueue = sub.add_parser("enqueue", help="Add applications from a JSONL file")
+    enqueue.add_argument("input", type=Path)
+    enqueue.add_argument("--batch-size", type=int, default=500)
+    sub.add_parser("stats", help="Jobs by status")
+    sub.add_parser("retry-failed", help="Requeue failed jobs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    queue = JobQueue()
+
+    if args.command == "enqueue":
+        batch, total = [], 0
+        # A batch larger than the queue could never be accepted
+        batch_size = max(1, min(args.batch_size, queue.max_pending))
+        if batch_size < args.batch_size:
+            logger.info(f"Batch size capped at JOB_QUEUE_MAX_PENDING ({batch_size})")
+
+        def flush():
+            # Backpressure: wait for workers to drain the queue
+            while True:
+                try:
+                    return len(queue.enqueue_many(batch))
+                except QueueFull as e:
+                    logger.info(f"{e}; waiting")
+                    time.sleep(5)
+
+        for application in read_applications(args.input):
+            batch.append(application)
+            if len(batch) >= batch_size:
+                total += flush()
+                batch = []
+        if batch:
+            total += flush()
+
+        logger.info(f"Enqueued {total} applications")
+
+    elif args.command == "retry-failed":
+        logger.info(f"Requeued {queue.retry_failed()} failed jobs")
+
+    print(json.dumps(queue.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Worker processes for the job queue.
+
+Each worker claims a job, runs it stage by stage (ingestion, extraction,
+validation, readiness, decision) and checkpoints the state after every
+stage. A retried job - after an error or a worker crash - restarts at the
+first stage it had not completed, so OCR and LLM extraction are not
+redone. A heartbeat thread keeps the job's lease alive while it runs.
+
+Usage:
+    python -m app.jobs.worker --workers 4
+    python -m app.jobs.worker --workers 4 --drain    # exit when the queue is empty
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from app.config import JOB_POLL_SECONDS, JOB_WORKERS
+from app.jobs.queue import Job, JobQueue
+
+logger = logging.getLogger("JobWorker")
+
+
+class LeaseLost(Exception):
+    """
+    The job's lease expired and another worker may own it; stop quietly.
+    """
+
+
+# --------------------------------------------------
+# Stages
+# --------------------------------------------------
+def ingest(state: Dict[str, Any]) -> Dict[str, Any]:
+    from app.agents.document_ingestion_agent import BytesUpload, document_ingestion_agent
+
+    state["uploaded_files"] = [
+        BytesUpload(Path(d["path"]).read_bytes(), d["name"], d["mime_type"])
+        for d in state.pop("document_refs", [])
+    ]
+    state = document_ingestion_agent(state)
+    # Bytes are not checkpointed; the parsed documents are
+    state.pop("uploaded_files")
+    return state
+
+
+def decide(state: Dict[str, Any]) -> Dict[str, Any]:
+    from app.orchestrator.master_agent import run_application_flow
+
+    state["decision"] = None
+    if state["eligibility_readiness"]["status"] == "ready":
+        result = run_application_flow(state)
+        state["decision"] = {
+            "application_id": result["application_id"],
+            "eligibility": result["eligibility"],
+            "enablement": result["enablement"],
+            "chat_response": result["chat_response"],
+            "llm_explanation": result["llm_explanation"],
+        }
+    return state
+
+
+def build_stages() -> list:
+    from app.agents.data_extraction_agent import data_extraction_agent
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+
+    return [
+        ("ingestion", ingest),
+        ("extraction", data_extraction_agent),
+        ("validation", data_validation_agent),
+        ("readiness", eligibility_readiness_agent),
+        ("decision", decide),
+    ]
+
+
+def job_result(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "extracted_data": state.get("extracted_data"),
+        "validated_data": state.get("validated_data"),
+        "eligibility_readiness": state.get("eligibility_readiness"),
+        "decision": state.get("decision"),
+    }
+
+
+# --------------------------------------------------
+# Running one job
+# --------------------------------------------------
+class Heartbeat:
+    """
+    Extends the job's lease every third of the visibility timeout.
+    """
+
+    def __init__(self, queue: JobQueue, job: Job):
+        self.queue = queue
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.id}", daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self.queue.visibility_timeout / 3)
+        while not self._stop.wait(interval):
+            if not self.queue.heartbeat(self.job):
+                # Lease lost; the next checkpoint notices and stops the job
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(queue: JobQueue, job: Job, stages: list) -> Dict[str, Any]:
+    if job.checkpoint is not None:
+        state = job.checkpoint
+        done = [name for name, _ in stages].index(job.stage) + 1
+        logger.info(f"Job {job.id}: resuming after {job.stage} (attempt {job.attempts})")
+    else:
+        state = {
+            # Decisions are stored under the job's (application) id
+            "application_id": job.id,
+            "user_input": job.payload["user_input"],
+            "document_refs": job.payload["documents"],
+        }
+        done = 0
+
+    for name, stage in stages[done:]:
+        state = stage(state)
+        if not queue.checkpoint(job, name, state):
+            raise LeaseLost(job.id)
+
+    return job_result(state)
+
+
+def process_job(queue: JobQueue, job: Job, stages: list):
+    from app.observability.tracing import start_trace
+
+    if job.attempts > job.max_attempts:
+        # Its worker died holding the final attempt
+        queue.fail(job, "Lease expired on the final attempt")
+        return
+
+    with start_trace("job", job_id=job.id, attempt=job.attempts, resume_after=job.stage):
+        try:
+            with Heartbeat(queue, job):
+                result = run_job(queue, job, stages)
+            if not queue.complete(job, result):
+                raise LeaseLost(job.id)
+            logger.info(f"Job {job.id}: done")
+        except LeaseLost:
+            logger.warning(f"Job {job.id}: lease lost, leaving it to its new owner")
+        except Exception as e:
+            logger.exception(f"Job {job.id}: attempt {job.attempts} failed")
+            queue.fail(job, f"{type(e).__name__}: {e}")
+
+
+# --------------------------------------------------
+# Worker loop / processes
+# --------------------------------------------------
+def work(queue: JobQueue, worker_id: str, stop: threading.Event, drain: bool = False,
+         poll_seconds: float = JOB_POLL_SECONDS, stages: list = None) -> int:
+    """
+    Claim and process jobs until `stop` is set (or, with drain, until no
+    job is claimable). Returns the number of jobs processed.
+    """
+    stages = stages if stages is not None else build_stages()
+    processed = 0
+
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            if drain:
+                break
+            stop.wait(poll_seconds)
+            continue
+
+        process_job(queue, job, stages)
+        processed += 1
+
+    return processed
+
+
+def worker_main(index: int, drain: bool, ingestion_workers: int = 1):
+    from app.agents.document_ingestion_agent import set_max_workers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    set_max_workers(ingestion_workers)
+
+    stop = threading.Event()
+    # Finish the current job, then exit
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    started = time.perf_counter()
+    processed = work(JobQueue(), worker_id, stop, drain)
+    logger.info(f"Worker {worker_id}: {processed} jobs in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process queued applications")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    # Each worker process has its own ingestion pool; keep the total bounded
+    parser.add_argument(
+        "--ingestion-workers", type=int, default=int(os.getenv("INGESTION_MAX_WORKERS", 1)),
+        help="Ingestion processes per worker (default: INGESTION_MAX_WORKERS if set, else 1)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers == 1:
+        worker_main(0, args.drain, args.ingestion_workers)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=worker_main, args=(i, args.drain, args.ingestion_workers), name=f"job-worker-{i}")
+        for i in range(args.workers)
+    ]
+    for p in processes:
+        p.start()
+
+    def forward(signum, _frame):
+        for p in processes:
+            if p.is_alive():
+                os.kill(p.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for p in processes:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
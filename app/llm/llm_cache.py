@@ -0,0 +1,199 @@
+"""
+Persistent, content-addressed cache for Ollama responses.
+
+Entries are keyed by a SHA-256 of (model, options, prompt) and stored in
+SQLite. Entries expire after min(LLM_CACHE_TTL_DAYS, DATA_RETENTION_DAYS)
+and the least recently used ones are evicted once the cache grows past
+LLM_CACHE_MAX_ENTRIES or LLM_CACHE_MAX_MB.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import (
+    DATA_RETENTION_DAYS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_DAYS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_MB,
+)
+
+logger = logging.getLogger("LLMCache")
+
+# Run eviction every N writes rather than on every put
+EVICT_EVERY = 100
+
+
+def cache_key(model: str, options: dict, prompt: str) -> str:
+    payload = json.dumps(
+        {"model": model, "options": options or {}, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        ttl_days: int = min(LLM_CACHE_TTL_DAYS, DATA_RETENTION_DAYS),
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key         TEXT PRIMARY KEY,
+                model       TEXT NOT NULL,
+                response    TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+
+    # --------------------------------------------------
+    # Lookup / store
+    # --------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    # --------------------------------------------------
+    # Eviction
+    # --------------------------------------------------
+    def evict(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now: float):
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        # Keep the most recently used entries within both limits
+        evicted = self._conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key,
+                           ROW_NUMBER() OVER (ORDER BY accessed_at DESC) AS n,
+                           SUM(size) OVER (ORDER BY accessed_at DESC) AS total
+                    FROM llm_cache
+                )
+                WHERE n > ? OR total > ?
+            )
+            """,
+            (self.max_entries, self.max_bytes),
+        ).rowcount
+
+        if expired or evicted:
+            logger.info(f"LLM cache evicted {expired} expired and {evicted} LRU entries")
+
+    # --------------------------------------------------
+    # Introspection
+    # --------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_failed = False
+
+
+def get_cache() -> Optional[LLMCache]:
+    """
+    Process-wide cache, or None when disabled or the file cannot be opened.
+    """
+    global _cache, _cache_failed
+
+    if not LLM_CACHE_ENABLED or _cache_failed:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = LLMCache()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"LLM cache disabled, cannot open {LLM_CACHE_PATH}: {e}")
+                    _cache_failed = True
+
+    return _cache
@@ -2,13 +2,272 @@ import requests
 import json
 import logging
 import re
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+from app.config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL_NAME,
+    LLM_JSON_NUM_CTX,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_READ_TIMEOUT,
+    OLLAMA_MAX_RETRIES,
+    OLLAMA_RETRY_BACKOFF,
+)
+from app.llm.llm_cache import cache_key, get_cache
+from app.llm.recorder import get_recorder
+from app.observability.llm_metrics import record_llm_call
+from app.observability.tracing import span
 
 logger = logging.getLogger("LLMClient")
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "llama3.1:8b"  # or 
 
+# --------------------------------------------------
+# Errors
+# --------------------------------------------------
+class LLMError(Exception):
+    """Base class for Ollama call failures."""
 
+
+class LLMTimeoutError(LLMError):
+    """The request did not complete within its timeout."""
+
+
+class LLMConnectionError(LLMError):
+    """Ollama could not be reached."""
+
+
+class LLMResponseError(LLMError):
+    """Ollama answered with an error status or an unusable body."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMJSONError(LLMResponseError, ValueError):
+    """
+    The model output did not contain a parseable JSON object.
+
+    The output is kept on .raw_text, not in the message: it holds applicant
+    data, and messages end up in traces and HTTP error responses.
+    """
+
+    def __init__(self, message, raw_text: str = ""):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+# --------------------------------------------------
+# Pooled HTTP client
+# --------------------------------------------------
+class OllamaClient:
+    """
+    Shared Ollama client with keep-alive connection pooling and
+    exponential-backoff retries on 5xx responses and connection errors.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        model: str = OLLAMA_MODEL_NAME,
+        pool_size: int = OLLAMA_POOL_SIZE,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        read_timeout: float = OLLAMA_READ_TIMEOUT,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        backoff: float = OLLAMA_RETRY_BACKOFF,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.generate_url = f"{self.base_url}/api/generate"
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, payload: dict, timeout: float = None, stream: bool = False):
+        """
+        POST to /api/generate with retries. Returns a successful response.
+        """
+        timeouts = (self.connect_timeout, timeout or self.read_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session.post(
+                    self.generate_url, json=payload, timeout=timeouts, stream=stream
+                )
+
+            except requests.ConnectTimeout as e:
+                error = LLMTimeoutError(f"Connecting to {self.base_url} timed out")
+                error.__cause__ = e
+
+            except requests.Timeout as e:
+                # Read timeouts are not retried: the model was already busy for the full budget
+                raise LLMTimeoutError(
+                    f"No response from {self.generate_url} within {timeouts[1]}s"
+                ) from e
+
+            except requests.ConnectionError as e:
+                error = LLMConnectionError(f"Cannot reach Ollama at {self.base_url}: {e}")
+                error.__cause__ = e
+
+            else:
+                if r.status_code < 400:
+                    return r
+
+                # Status only: the body can echo the prompt (applicant data)
+                r.close()
+
+                if r.status_code < 500:
+                    raise LLMResponseError(
+                        f"Ollama rejected the request ({r.status_code})",
+                        status_code=r.status_code,
+                    )
+
+                error = LLMResponseError(
+                    f"Ollama returned {r.status_code}",
+                    status_code=r.status_code,
+                )
+
+            if attempt < self.max_retries:
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"{error} (retry {attempt + 1}/{self.max_retries} in {delay:.1f}s)")
+                time.sleep(delay)
+
+        raise error
+
+    def generate(self, prompt: str, options: dict = None, timeout: float = None) -> dict:
+        """
+        Non-streaming /api/generate call. Returns the full Ollama response body.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": options or {},
+        }
+
+        started = time.perf_counter()
+        r = self._post(payload, timeout)
+        try:
+            body = r.json()
+        except ValueError as e:
+            raise LLMResponseError(
+                f"Ollama returned a non-JSON body ({len(r.content)} bytes)",
+                status_code=r.status_code,
+            ) from e
+
+        recorder = get_recorder()
+        if recorder:
+            recorder.record(
+                prompt, payload["options"], False, body.get("response", ""), body,
+                time.perf_counter() - started,
+            )
+
+        return body
+
+    def generate_stream(self, prompt: str, options: dict = None, timeout: float = None):
+        """
+        Streaming /api/generate call. Yields each NDJSON chunk as Ollama
+        produces it; the last chunk has done=True and the timing metadata.
+
+        Only connection setup is retried; a stream that breaks midway raises.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or {},
+        }
+
+        recorder = get_recorder()
+        started = time.perf_counter()
+        first_token, pieces = None, []
+
+        r = self._post(payload, timeout, stream=True)
+
+        with r:
+            try:
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError as e:
+                        raise LLMResponseError(
+                            f"Ollama sent a malformed stream chunk ({len(line)} bytes)",
+                            status_code=r.status_code,
+                        ) from e
+
+                    if chunk.get("error"):
+                        raise LLMResponseError(f"Ollama stream error: {chunk['error']}")
+
+                    if recorder:
+                        if first_token is None and chunk.get("response"):
+                            first_token = time.perf_counter() - started
+                        pieces.append(chunk.get("response", ""))
+                        if chunk.get("done"):
+                            recorder.record(
+                                prompt, payload["options"], True, "".join(pieces), chunk,
+                                time.perf_counter() - started, first_token,
+                            )
+
+                    yield chunk
+
+                    if chunk.get("done"):
+                        return
+
+            except requests.Timeout as e:
+                raise LLMTimeoutError(f"Stream from {self.generate_url} stalled") from e
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                # requests re-raises a read timeout mid-body as ConnectionError(ReadTimeoutError)
+                if any(isinstance(arg, ReadTimeoutError) for arg in e.args):
+                    raise LLMTimeoutError(f"Stream from {self.generate_url} stalled") from e
+                raise LLMConnectionError(f"Stream from {self.generate_url} was interrupted") from e
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """
+    Process-wide Ollama client, created on first use.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+
+    return _client
+
+
+def set_client(client: OllamaClient):
+    """
+    Replace the process-wide client, e.g. to target another Ollama
+    endpoint from benchmarks or load tests.
+    """
+    global _client
+
+    with _client_lock:
+        _client = client
+
+
+# --------------------------------------------------
+# JSON helpers
+# --------------------------------------------------
 def extract_json_block(text: str) -> str:
     """Extract the first JSON object from text."""
     match = re.search(r"\{.*\}", text, re.DOTALL)
@@ -26,58 +285,156 @@ def repair_json(text: str) -> str:
     text = re.sub(r",\s*]", "]", text)
     return text
 
-def call_llm_json(prompt: str) -> dict:
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0,
-            "num_ctx": 4096,
-        }
+
+# --------------------------------------------------
+# Telemetry
+# --------------------------------------------------
+def _generate(client: OllamaClient, prompt: str, options: dict, timeout: float, agent: str, s) -> dict:
+    """
+    client.generate, recording token counts and timings for `agent` (and on
+    the call's span).
+    """
+    try:
+        body = client.generate(prompt, options, timeout=timeout)
+    except LLMError:
+        record_llm_call(agent, client.model, error=True)
+        raise
+
+    s.set(**record_llm_call(agent, client.model, body))
+    return body
+
+
+# --------------------------------------------------
+# Public API
+# --------------------------------------------------
+def call_llm_json(prompt: str, timeout: float = None, use_cache: bool = True,
+                  agent: str = "unknown") -> dict:
+    """
+    Call Ollama for structured extraction and parse the JSON object it returns.
+
+    Responses are served from the LLM cache when possible; pass
+    use_cache=False to force a fresh call. `agent` tags the call's token
+    and timing telemetry. `timeout` overrides the client's read timeout
+    (OLLAMA_READ_TIMEOUT) for this call.
+
+    Raises:
+        LLMTimeoutError, LLMConnectionError, LLMResponseError: transport failures
+        LLMJSONError: the output held no parseable JSON (also a ValueError)
+    """
+    options = {
+        "temperature": 0,
+        "num_ctx": LLM_JSON_NUM_CTX,
     }
 
-    r = requests.post(OLLAMA_URL, json=payload, timeout=180)
-    r.raise_for_status()
+    client = get_client()
+    cache = get_cache() if use_cache else None
+    key = cache_key(client.model, options, prompt) if cache else None
 
-    raw_text = r.json().get("response", "")
+    with span("llm.generate_json", kind="llm", agent=agent, model=client.model,
+              prompt_chars=len(prompt)) as s:
+        raw_text = cache.get(key) if cache else None
+        from_cache = raw_text is not None
 
-    try:
-        json_text = extract_json_block(raw_text)
-        json_text = repair_json(json_text)
-        return json.loads(json_text)
-    except Exception as e:
-        raise ValueError(f"Invalid JSON from LLM: {raw_text}") from e
+        if from_cache:
+            record_llm_call(agent, client.model, cache_hit=True)
+        else:
+            raw_text = _generate(client, prompt, options, timeout, agent, s).get("response", "")
+        s.set(cache_hit=from_cache, response_chars=len(raw_text))
 
-        
-def call_llm(prompt: str, timeout: int = 300) -> str:
+        try:
+            json_text = extract_json_block(raw_text)
+            json_text = repair_json(json_text)
+            result = json.loads(json_text)
+        except Exception as e:
+            raise LLMJSONError(f"Invalid JSON from LLM ({len(raw_text)} chars)", raw_text) from e
+
+    # Only cache outputs that parsed
+    if cache and not from_cache:
+        cache.put(key, client.model, raw_text)
+
+    return result
+
+
+TEXT_OPTIONS = {
+    "temperature": 0.3,
+    "num_predict": 512
+}
+
+
+def call_llm(prompt: str, timeout: float = None, use_cache: bool = True,
+             agent: str = "unknown") -> str:
     """
     Call Ollama local LLM and return plain text response.
+
+    Raises:
+        LLMTimeoutError, LLMConnectionError, LLMResponseError
     """
+    client = get_client()
+    cache = get_cache() if use_cache else None
+    key = cache_key(client.model, TEXT_OPTIONS, prompt) if cache else None
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.3,
-            "num_predict": 512
-        }
-    }
+    with span("llm.generate", kind="llm", agent=agent, model=client.model,
+              prompt_chars=len(prompt)) as s:
+        text = cache.get(key) if cache else None
+        s.set(cache_hit=text is not None)
+        if text is not None:
+            record_llm_call(agent, client.model, cache_hit=True)
+            return text
 
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json=payload,
-            timeout=timeout
-        )
-        response.raise_for_status()
-
-        return response.json().get("response", "").strip()
-
-    except Exception as e:
-        logger.error(f"LLM text call failed: {e}")
-        return "Explanation unavailable due to LLM service issue."
+        text = _generate(client, prompt, TEXT_OPTIONS, timeout, agent, s).get("response", "").strip()
+        s.set(response_chars=len(text))
+
+    if cache and text:
+        cache.put(key, client.model, text)
+
+    return text
+
+
+def call_llm_stream(prompt: str, timeout: float = None, use_cache: bool = True,
+                    agent: str = "unknown"):
+    """
+    Streaming variant of call_llm: yields text fragments as they are generated.
+
+    Shares cache entries with call_llm; a cache hit is yielded as one piece.
+
+    Raises:
+        LLMTimeoutError, LLMConnectionError, LLMResponseError
+    """
+    client = get_client()
+    cache = get_cache() if use_cache else None
+    key = cache_key(client.model, TEXT_OPTIONS, prompt) if cache else None
+
+    # Not activated: the generator body runs in the consumer's context
+    with span("llm.generate_stream", kind="llm", activate=False, agent=agent,
+              model=client.model, prompt_chars=len(prompt)) as s:
+        text = cache.get(key) if cache else None
+        s.set(cache_hit=text is not None)
+        if text is not None:
+            record_llm_call(agent, client.model, cache_hit=True)
+            yield text
+            return
+
+        parts = []
+        try:
+            for chunk in client.generate_stream(prompt, TEXT_OPTIONS, timeout=timeout):
+                token = chunk.get("response", "")
+                if token:
+                    if not parts:
+                        s.set(first_token_ms=s.elapsed_ms())
+                    parts.append(token)
+                    yield token
+
+                # The final chunk carries the token counts and timings
+                if chunk.get("done"):
+                    s.set(**record_llm_call(agent, client.model, chunk))
+        except LLMError:
+            record_llm_call(agent, client.model, error=True)
+            raise
+
+        text = "".join(parts).strip()
+        s.set(response_chars=len(text))
+    if cache and text:
+        cache.put(key, client.model, text)
 
 
 # import json
@@ -0,0 +1,96 @@
+"""
+Record mode for the LLM client.
+
+With LLM_RECORD_PATH set, every completed Ollama call is appended to a
+JSONL file: a hash of (options, prompt), the response text, Ollama's
+token / timing metadata and the latency the client observed (and time
+to first token for streams). Prompts themselves are not stored.
+
+benchmarks.replay_ollama serves a recording back over HTTP, so load tests
+and client-side changes can be measured against the same workload
+without a model.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import LLM_RECORD_PATH
+
+logger = logging.getLogger("LLMRecorder")
+
+# Ollama metadata kept with each recording
+METADATA_FIELDS = (
+    "model", "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+)
+
+
+def prompt_key(options: Dict[str, Any], prompt: str) -> str:
+    """
+    Replay lookup key. Unlike the cache key it leaves out the model name,
+    so a recording can be replayed to a client configured for any model.
+    """
+    payload = json.dumps({"options": options or {}, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMRecorder:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(self, prompt: str, options: Dict[str, Any], stream: bool, response: str,
+               metadata: Dict[str, Any], latency: float, first_token: float = None):
+        entry = {
+            "key": prompt_key(options, prompt),
+            "options": options or {},
+            "stream": stream,
+            "prompt_chars": len(prompt),
+            "response": response,
+            "metadata": {k: metadata[k] for k in METADATA_FIELDS if k in metadata},
+            "latency": round(latency, 6),
+            "first_token": None if first_token is None else round(first_token, 6),
+            "recorded_at": time.time(),
+        }
+
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+                self.records += 1
+        except OSError as e:
+            logger.warning(f"Could not record LLM call to {self.path}: {e}")
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> Optional[LLMRecorder]:
+    """
+    Process-wide recorder, or None when record mode is off.
+    """
+    global _recorder
+
+    if not LLM_RECORD_PATH:
+        return None
+
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = LLMRecorder(LLM_RECORD_PATH)
+                logger.info(f"Recording LLM calls to {LLM_RECORD_PATH}")
+
+    return _recorder
+
+
+def load_recordings(path) -> list:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
@@ -0,0 +1,264 @@
+import json
+import logging
+import pickle
+import random
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.config import CONTEXT_IDF_PATH
+
+logger = logging.getLogger("ContextCompactor")
+
+# --------------------------------------------------
+# Vectorizer layout (MUST match the persisted IDF)
+# --------------------------------------------------
+N_FEATURES = 2 ** 18
+STOP_WORDS = "english"
+
+# Bump when the vectorizer layout or sentence rules change
+IDF_VERSION = "1"
+
+MIN_SENTENCE_CHARS = 10
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in text.splitlines() if len(s.strip()) > MIN_SENTENCE_CHARS]
+
+
+def make_vectorizer():
+    """
+    Stateless term counter: hashing needs no vocabulary, so only the IDF
+    weights have to be fit and persisted.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        n_features=N_FEATURES,
+        stop_words=STOP_WORDS,
+        alternate_sign=False,
+        norm=None,
+    )
+
+
+# --------------------------------------------------
+# Fitting (offline, on past applicant contexts)
+# --------------------------------------------------
+def smoothed_idf(df, n: int):
+    """
+    IDF as TfidfVectorizer computes it: ln((1 + n) / (1 + df)) + 1.
+    """
+    return np.log((1 + n) / (1 + np.asarray(df, dtype=np.float64))) + 1
+
+
+def idf_from_counts(counts) -> np.ndarray:
+    """
+    Smoothed IDF per hashed feature of a CSR count matrix (one row per
+    sentence, each feature at most once per row).
+    """
+    n = counts.shape[0]
+    features, df = np.unique(counts.indices, return_counts=True)
+    idf = np.full(N_FEATURES, smoothed_idf(0, n), dtype=np.float32)
+    idf[features] = smoothed_idf(df, n)
+    return idf
+
+
+def fit_idf(sentences: list) -> np.ndarray:
+    return idf_from_counts(make_vectorizer().transform(sentences))
+
+
+# --------------------------------------------------
+# Synthetic contexts (default IDF when none is fitted)
+# --------------------------------------------------
+STATEMENT_DESCRIPTIONS = [
+    "salary credit", "atm withdrawal", "pos purchase", "loan instalment",
+    "transfer to savings", "utility payment", "school fees", "credit card payment",
+    "rent payment", "mobile recharge", "insurance premium", "cash deposit",
+]
+
+CHAT_TEMPLATES = [
+    "My monthly salary is {amount} AED.",
+    "I am {status} with {years} years of experience.",
+    "We are a family of {family}, with {children} children.",
+    "I finished {education} and have worked on and off since then.",
+    "Total assets {amount}, total liabilities {amount2}.",
+    "We have a loan of {amount} AED for the car.",
+    "My husband lost his job last year and we look after our parents.",
+    "I am applying for financial support for my family.",
+    "Rent is {amount2} AED a month and school fees are due.",
+    "I have been unemployed for {years} months and have no savings.",
+]
+
+STATUSES = ["employed", "unemployed", "self-employed", "a student", "retired"]
+EDUCATION = ["high school", "a bachelor degree", "a masters degree", "a phd"]
+
+
+def synthetic_contexts(n_contexts: int = 2000, seed: int = 42) -> list:
+    """
+    Sentences shaped like applicant contexts (chat text plus bank statement
+    lines), seeded like the eligibility model's synthetic data.
+    """
+    rng = random.Random(seed)
+    sentences = []
+
+    for _ in range(n_contexts):
+        for template in rng.sample(CHAT_TEMPLATES, rng.randint(2, 5)):
+            sentences.append(template.format(
+                amount=rng.randint(500, 60000),
+                amount2=rng.randint(0, 200000),
+                status=rng.choice(STATUSES),
+                years=rng.randint(0, 35),
+                family=rng.randint(1, 8),
+                children=rng.randint(0, 5),
+                education=rng.choice(EDUCATION),
+            ))
+        for _ in range(rng.randint(0, 15)):
+            sentences.append(
+                f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024 "
+                f"{rng.choice(STATEMENT_DESCRIPTIONS)} aed {rng.randint(50, 9000)}.00"
+            )
+
+    return split_sentences("\n".join(sentences))
+
+
+def save_idf(idf: np.ndarray, n_sentences: int, path=CONTEXT_IDF_PATH):
+    artifact = {
+        "version": IDF_VERSION,
+        "n_features": N_FEATURES,
+        "stop_words": STOP_WORDS,
+        "n_sentences": n_sentences,
+        "idf": idf,
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(artifact, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+    logger.info(f"Saved context IDF v{IDF_VERSION} ({n_sentences} sentences) to {path}")
+
+
+def load_idf(path=CONTEXT_IDF_PATH) -> np.ndarray:
+    with open(path, "rb") as fh:
+        artifact = pickle.load(fh)
+
+    if artifact.get("version") != IDF_VERSION or artifact.get("n_features") != N_FEATURES:
+        raise ValueError(
+            f"Context IDF artifact {path} is version {artifact.get('version')} "
+            f"with {artifact.get('n_features')} features, expected {IDF_VERSION} "
+            f"with {N_FEATURES}. Refit with `python -m app.models.context_compactor`."
+        )
+
+    return artifact["idf"]
+
+
+# --------------------------------------------------
+# Compaction
+# --------------------------------------------------
+class ContextCompactor:
+    """
+    Ranks context lines by the sum of their L2-normalized TF-IDF weights,
+    using fixed IDF weights so rankings do not depend on the input's own
+    statistics. Built without weights, the IDF comes from the input's own
+    lines, as the per-request TfidfVectorizer computed it.
+    """
+
+    def __init__(self, idf: np.ndarray = None):
+        self.vectorizer = make_vectorizer()
+        self.idf = None if idf is None else idf.astype(np.float64)
+
+    def scores(self, sentences: list) -> np.ndarray:
+        X = self.vectorizer.transform(sentences).tocsr()
+        # Weights of the features present only: no N_FEATURES-long work per call
+        if self.idf is not None:
+            X.data = X.data * self.idf[X.indices]
+        else:
+            _, inverse, df = np.unique(X.indices, return_inverse=True, return_counts=True)
+            X.data = X.data * smoothed_idf(df, X.shape[0])[inverse]
+
+        # Row sum of the L2-normalized row: sum(w) / ||w||
+        sums = np.asarray(X.sum(axis=1)).ravel()
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        return np.divide(sums, norms, out=np.zeros_like(sums), where=norms > 0)
+
+    def compact(self, text: str, max_sentences: int = 10, max_chars: int = 800) -> str:
+        sentences = split_sentences(text)
+
+        if len(sentences) <= max_sentences:
+            return "\n".join(sentences)
+
+        scores = self.scores(sentences)
+        top_idx = np.argpartition(-scores, max_sentences - 1)[:max_sentences]
+
+        selected = [sentences[i] for i in np.sort(top_idx)]
+        return "\n".join(selected)[:max_chars]
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+
+def get_compactor() -> ContextCompactor:
+    """
+    Lazily build the compactor with the persisted IDF, fitting the synthetic
+    default only if no artifact exists.
+    """
+    global _compactor
+
+    if _compactor is not None:
+        return _compactor
+
+    with _compactor_lock:
+        if _compactor is None:
+            if CONTEXT_IDF_PATH.exists():
+                try:
+                    idf = load_idf()
+                    logger.info(f"Loaded context IDF from {CONTEXT_IDF_PATH}")
+                except Exception as e:
+                    logger.warning(f"Ignoring context IDF artifact, using the synthetic default: {e}")
+                    idf = fit_idf(synthetic_contexts())
+            else:
+                logger.warning(
+                    "No context IDF artifact found, fitting one on synthetic contexts. "
+                    "Fit one on real contexts with `python -m app.models.context_compactor CONTEXTS`."
+                )
+                corpus = synthetic_contexts()
+                idf = fit_idf(corpus)
+                try:
+                    save_idf(idf, len(corpus))
+                except OSError as e:
+                    logger.warning(f"Could not save context IDF: {e}")
+
+            _compactor = ContextCompactor(idf)
+
+    return _compactor
+
+
+def read_contexts(paths: list) -> list:
+    """
+    Sentences from past applicant contexts: .jsonl files with an
+    "llm_context" field per line, or plain text files.
+    """
+    sentences = []
+
+    for path in map(Path, paths):
+        if path.suffix == ".jsonl":
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        sentences.extend(split_sentences(json.loads(line).get("llm_context") or ""))
+        else:
+            sentences.extend(split_sentences(path.read_text(encoding="utf-8")))
+
+    return sentences
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Without context files: the synthetic default
+    corpus = read_contexts(sys.argv[1:]) if len(sys.argv) > 1 else synthetic_contexts()
+    save_idf(fit_idf(corpus), len(corpus))
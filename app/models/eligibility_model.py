@@ -1,5 +1,14 @@
+import hashlib
+import json
+import logging
+import pickle
+import threading
+
 import numpy as np
-import lightgbm as lgb
+
+from app.config import ELIGIBILITY_MODEL_PATH
+
+logger = logging.getLogger("EligibilityModel")
 
 # --------------------------------------------------
 # Feature order (MUST stay consistent)
@@ -17,6 +26,25 @@ FEATURES = [
 # -1 = decreasing, +1 = increasing
 MONOTONE = [-1, -1, +1, +1, +1, -1]
 
+# Probability cut-offs for the decision bands
+APPROVE_PROBABILITY = 0.75
+SOFT_DECLINE_PROBABILITY = 0.45
+
+# Bump when training data, params or labels change
+MODEL_VERSION = "1"
+
+
+def feature_hash(features=FEATURES, monotone=MONOTONE) -> str:
+    """
+    Fingerprint of the feature order the model was trained on.
+    """
+    payload = json.dumps({"features": list(features), "monotone": list(monotone)})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ModelArtifactError(RuntimeError):
+    """Persisted model does not match the current feature layout."""
+
 # --------------------------------------------------
 # Synthetic Training Data
 # --------------------------------------------------
@@ -55,13 +83,9 @@ def generate_synthetic_data(n_samples=12000, seed=42):
     return X, y
 
 # --------------------------------------------------
-# Train model
+# Training
 # --------------------------------------------------
-X_train, y_train = generate_synthetic_data()
-
-train_set = lgb.Dataset(X_train, label=y_train)
-
-params = {
+PARAMS = {
     "objective": "binary",
     "metric": "binary_logloss",
     "learning_rate": 0.05,
@@ -76,11 +100,97 @@ params = {
     "seed": 42,
 }
 
-model = lgb.train(
-    params,
-    train_set,
-    num_boost_round=300
-)
+NUM_BOOST_ROUND = 300
+
+
+def train_model():
+    import lightgbm as lgb
+
+    X_train, y_train = generate_synthetic_data()
+    train_set = lgb.Dataset(X_train, label=y_train)
+
+    return lgb.train(
+        params=PARAMS,
+        train_set=train_set,
+        num_boost_round=NUM_BOOST_ROUND
+    )
+
+
+# --------------------------------------------------
+# Model registry (persisted artifact)
+# --------------------------------------------------
+def save_model(model, path=ELIGIBILITY_MODEL_PATH):
+    """
+    Persist the booster with its version and feature fingerprint.
+    """
+    artifact = {
+        "version": MODEL_VERSION,
+        "feature_hash": feature_hash(),
+        "features": list(FEATURES),
+        "booster": model.model_to_string(),
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(artifact, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+    logger.info(f"Saved eligibility model v{MODEL_VERSION} to {path}")
+
+
+def load_model(path=ELIGIBILITY_MODEL_PATH):
+    """
+    Load a persisted booster, rejecting artifacts built for another feature order.
+    """
+    import lightgbm as lgb
+
+    with open(path, "rb") as fh:
+        artifact = pickle.load(fh)
+
+    if artifact.get("feature_hash") != feature_hash():
+        raise ModelArtifactError(
+            f"Model artifact {path} was trained on features "
+            f"{artifact.get('features')}, expected {FEATURES}. "
+            f"Retrain with `python -m app.models.eligibility_model`."
+        )
+
+    if artifact.get("version") != MODEL_VERSION:
+        raise ModelArtifactError(
+            f"Model artifact {path} is version {artifact.get('version')}, "
+            f"expected {MODEL_VERSION}. "
+            f"Retrain with `python -m app.models.eligibility_model`."
+        )
+
+    return lgb.Booster(model_str=artifact["booster"])
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Lazily load the eligibility model, training it only if no artifact exists.
+    """
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            if ELIGIBILITY_MODEL_PATH.exists():
+                _model = load_model()
+                logger.info(f"Loaded eligibility model from {ELIGIBILITY_MODEL_PATH}")
+            else:
+                logger.warning("No eligibility model artifact found, training one")
+                model = train_model()
+                save_model(model)
+                _model = model
+
+    return _model
+
 
 # --------------------------------------------------
 # Prediction API
@@ -107,7 +217,7 @@ def predict_eligibility(features: dict):
     log_income = np.log1p(income)
     income_per_capita = income / family_size
 
-    X = np.array([[ 
+    X = np.array([[
         log_income,
         income_per_capita,
         family_size,
@@ -116,13 +226,115 @@ def predict_eligibility(features: dict):
         net_worth
     ]])
 
-    prob = float(model.predict(X)[0])
+    prob = float(get_model().predict(X)[0])
 
-    if prob >= 0.75:
+    if prob >= APPROVE_PROBABILITY:
         decision = "APPROVE"
-    elif prob >= 0.45:
+    elif prob >= SOFT_DECLINE_PROBABILITY:
         decision = "SOFT_DECLINE"
     else:
         decision = "REJECT"
 
     return decision, prob
+
+
+# --------------------------------------------------
+# Batch Prediction API
+# --------------------------------------------------
+def _column(data, name: str, n: int) -> np.ndarray:
+    """
+    Numeric column as float64, with None / missing columns mapped to NaN.
+    """
+    if name not in data:
+        return np.full(n, np.nan)
+    return np.asarray(data[name], dtype=float).reshape(-1)
+
+
+def _default(values: np.ndarray, default: float) -> np.ndarray:
+    """
+    Vectorized `value or default`: NaN (None) and 0 fall back to default.
+    """
+    return np.where(np.isnan(values) | (values == 0), default, values)
+
+
+def predict_eligibility_batch(data):
+    """
+    Score many applicants with one model call.
+
+    Args:
+        data: pandas DataFrame or mapping of equal-length columns with the raw
+            fields income, family_size, employment_years, credit_score,
+            assets, liabilities and employment_status. Missing values may be
+            None or NaN.
+
+    Returns:
+        decisions (np.ndarray[str]): APPROVE | SOFT_DECLINE | REJECT
+        probabilities (np.ndarray[float])
+        rules (dict[str, np.ndarray[bool]]): the `eligibility_signals` rule flags
+    """
+    if hasattr(data, "index"):
+        n = len(data.index)
+    else:
+        n = len(next(iter(data.values()), ()))
+
+    raw_income = _column(data, "income", n)
+    raw_family_size = _column(data, "family_size", n)
+    raw_assets = _column(data, "assets", n)
+    raw_liabilities = _column(data, "liabilities", n)
+
+    # Safe extraction (same defaults as predict_eligibility)
+    income = np.where(raw_income > 0, raw_income, 0.0)
+    family_size = np.maximum(1.0, np.trunc(_default(raw_family_size, 1.0)))
+    employment_years = np.maximum(
+        0.0, np.trunc(_default(_column(data, "employment_years", n), 0.0))
+    )
+    credit_score = _default(_column(data, "credit_score", n), 650.0)
+    net_worth = _default(raw_assets, 0.0) - _default(raw_liabilities, 0.0)
+
+    X = np.column_stack([
+        np.log1p(income),
+        income / family_size,
+        family_size,
+        employment_years,
+        credit_score,
+        net_worth,
+    ])
+
+    probabilities = get_model().predict(X) if n else np.empty(0)
+
+    decisions = np.select(
+        [
+            probabilities >= APPROVE_PROBABILITY,
+            probabilities >= SOFT_DECLINE_PROBABILITY,
+        ],
+        ["APPROVE", "SOFT_DECLINE"],
+        default="REJECT",
+    ).astype(object)
+
+    # Rule flags use the raw fields, like eligibility_agent does
+    with np.errstate(divide="ignore", invalid="ignore"):
+        income_pc = np.where(
+            ~np.isnan(raw_income) & ~np.isnan(raw_family_size) & (raw_family_size != 0),
+            raw_income / raw_family_size,
+            np.nan,
+        )
+    raw_net_worth = raw_assets - raw_liabilities
+
+    if "employment_status" in data:
+        status = np.asarray(data["employment_status"], dtype=object).reshape(-1)
+        not_employed = status != "employed"
+    else:
+        not_employed = np.ones(n, dtype=bool)
+
+    rules = {
+        "rule_low_income_pc": income_pc < 12000,
+        "rule_unemployed_low_income": (income_pc < 18000) & not_employed,
+        "rule_negative_net_worth_unemployed": (raw_net_worth < 0) & not_employed,
+    }
+
+    return decisions, probabilities, rules
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    save_model(train_model())
@@ -0,0 +1,248 @@
+"""
+Token and timing telemetry for LLM calls.
+
+Ollama reports, with every completed generation, the prompt and output
+token counts and where the time went (model load, prompt prefill,
+generation; durations in nanoseconds). The LLM client records them here
+per call, tagged with the calling agent. Totals and histograms are
+cumulative; percentiles come from a rolling window of recent calls.
+
+    llm_stats()         per-agent summary, queryable in-process
+    prometheus_text()   the same series in Prometheus text format
+"""
+
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, Optional
+
+from app.config import LLM_METRICS_WINDOW, LLM_RELOAD_SECONDS
+
+# --------------------------------------------------
+# Series
+# --------------------------------------------------
+# Ollama metadata field -> series name
+TOKEN_FIELDS = {
+    "prompt_eval_count": "prompt_tokens",
+    "eval_count": "completion_tokens",
+}
+DURATION_FIELDS = {
+    "load_duration": "load_seconds",
+    "prompt_eval_duration": "prompt_eval_seconds",
+    "eval_duration": "eval_seconds",
+    "total_duration": "total_seconds",
+}
+
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HISTOGRAMS = {
+    **{name: TOKEN_BUCKETS for name in TOKEN_FIELDS.values()},
+    **{name: SECONDS_BUCKETS for name in DURATION_FIELDS.values()},
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            total += n
+            yield bound, total
+
+
+class AgentSeries:
+    """
+    Everything recorded for one (agent, model) pair.
+    """
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.reloads = 0
+        self.totals = {name: 0.0 for name in HISTOGRAMS}
+        self.histograms = {name: Histogram(b) for name, b in HISTOGRAMS.items()}
+        self.recent = deque(maxlen=window)
+
+
+def parse_usage(meta: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Token counts and durations (seconds) from an Ollama response body or
+    final stream chunk; fields Ollama did not send are left out.
+    """
+    usage = {}
+    if not meta:
+        return usage
+
+    for field, name in TOKEN_FIELDS.items():
+        if meta.get(field) is not None:
+            usage[name] = int(meta[field])
+    for field, name in DURATION_FIELDS.items():
+        if meta.get(field) is not None:
+            usage[name] = meta[field] / 1e9
+    return usage
+
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+class LLMMetrics:
+    def __init__(self, window: int = LLM_METRICS_WINDOW, reload_seconds: float = LLM_RELOAD_SECONDS):
+        self.window = window
+        self.reload_seconds = reload_seconds
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, agent: str, model: str) -> AgentSeries:
+        series = self._series.get((agent, model))
+        if series is None:
+            series = self._series[(agent, model)] = AgentSeries(self.window)
+        return series
+
+    def record(self, agent: str, model: str, meta: Dict[str, Any] = None,
+               cache_hit: bool = False, error: bool = False) -> Dict[str, float]:
+        """
+        Record one call. Cache hits and failed calls are counted but carry
+        no token or timing data. Returns the parsed usage.
+        """
+        usage = {} if cache_hit or error else parse_usage(meta)
+
+        with self._lock:
+            series = self._get(agent, model)
+            series.calls += 1
+            series.cache_hits += cache_hit
+            series.errors += error
+
+            if usage:
+                for name, value in usage.items():
+                    series.totals[name] += value
+                    series.histograms[name].observe(value)
+                if usage.get("load_seconds", 0) >= self.reload_seconds:
+                    series.reloads += 1
+                series.recent.append(usage)
+
+        return usage
+
+    def stats(self, agent: str = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per agent (summed over models): counts, token totals, and p50 / p95
+        of the recent window for each token and timing series.
+        """
+        with self._lock:
+            items = [
+                (a, m, s.calls, s.cache_hits, s.errors, s.reloads, dict(s.totals), list(s.recent))
+                for (a, m), s in self._series.items()
+                if agent is None or a == agent
+            ]
+
+        out = {}
+        for a, m, calls, hits, errors, reloads, totals, recent in items:
+            entry = out.setdefault(a, {
+                "models": [], "calls": 0, "cache_hits": 0, "errors": 0, "reloads": 0,
+                "totals": {name: 0.0 for name in HISTOGRAMS}, "_recent": [],
+            })
+            entry["models"].append(m)
+            entry["calls"] += calls
+            entry["cache_hits"] += hits
+            entry["errors"] += errors
+            entry["reloads"] += reloads
+            for name, value in totals.items():
+                entry["totals"][name] += value
+            entry["_recent"].extend(recent)
+
+        for entry in out.values():
+            recent = entry.pop("_recent")
+            entry["recent"] = {
+                name: summarize([u[name] for u in recent if name in u])
+                for name in HISTOGRAMS
+            }
+            eval_s = entry["totals"]["eval_seconds"]
+            entry["tokens_per_second"] = (
+                round(entry["totals"]["completion_tokens"] / eval_s, 2) if eval_s else None
+            )
+
+        return out
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            snapshot = [
+                (a, m, s.calls, s.cache_hits, s.errors, s.reloads,
+                 {name: (list(h.cumulative()), h.sum, h.count) for name, h in s.histograms.items()})
+                for (a, m), s in sorted(self._series.items())
+            ]
+
+        lines = []
+
+        counters = (
+            ("llm_calls_total", "LLM calls, including cache hits and errors", 2),
+            ("llm_cache_hits_total", "LLM calls served from the response cache", 3),
+            ("llm_errors_total", "LLM calls that failed", 4),
+            ("llm_model_reloads_total", "Calls whose model load took at least LLM_RELOAD_SECONDS", 5),
+        )
+        for metric, help_text, idx in counters:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for row in snapshot:
+                lines.append(f"{metric}{{{_labels(row[0], row[1])}}} {row[idx]}")
+
+        for name in HISTOGRAMS:
+            metric = f"llm_{name}"
+            lines += [f"# HELP {metric} Ollama {name.replace('_', ' ')} per call", f"# TYPE {metric} histogram"]
+            for a, m, *_, hists in snapshot:
+                buckets, total, count = hists[name]
+                labels = _labels(a, m)
+                for bound, n in buckets:
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {n}')
+                lines.append(f"{metric}_sum{{{labels}}} {total:g}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _labels(agent: str, model: str) -> str:
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"')
+    return f'agent="{esc(agent)}",model="{esc(model)}"'
+
+
+def summarize(values: list) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50": round(pick(0.5), 4), "p95": round(pick(0.95), 4), "max": round(values[-1], 4)}
+
+
+# --------------------------------------------------
+# Process-wide registry
+# --------------------------------------------------
+llm_metrics = LLMMetrics()
+
+
+def record_llm_call(agent: str, model: str, meta: Dict[str, Any] = None,
+                    cache_hit: bool = False, error: bool = False) -> Dict[str, float]:
+    return llm_metrics.record(agent, model, meta, cache_hit=cache_hit, error=error)
+
+
+def llm_stats(agent: str = None) -> Dict[str, Dict[str, Any]]:
+    return llm_metrics.stats(agent)
+
+
+def prometheus_text() -> str:
+    return llm_metrics.prometheus_text()
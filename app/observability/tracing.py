@@ -0,0 +1,398 @@
+"""
+Lightweight tracing for the application pipeline.
+
+Every agent and LLM call runs in a span (wall time, input/output sizes,
+cache hits, errors); all spans of one application share a trace id held
+in a context variable. Finished spans are queued and exported by a
+background thread in batches: to a local JSONL file, and to Langfuse's
+ingestion API when ENABLE_LANGFUSE is set. The hot path only appends to
+a queue.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import (
+    TRACING_ENABLED,
+    TRACE_EXPORT_PATH,
+    TRACE_BATCH_SIZE,
+    TRACE_FLUSH_SECONDS,
+    TRACE_QUEUE_SIZE,
+    ENABLE_LANGFUSE,
+    LANGFUSE_HOST,
+    LANGFUSE_PUBLIC_KEY,
+    LANGFUSE_SECRET_KEY,
+)
+
+logger = logging.getLogger("Tracing")
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+# Exported error messages are cut to this length, with long digit runs
+# (amounts, IDs, phone numbers) masked: spans leave the process
+ERROR_MESSAGE_CHARS = 200
+_DIGIT_RUN = re.compile(r"\d{4,}")
+
+
+# --------------------------------------------------
+# Spans
+# --------------------------------------------------
+def error_summary(error: BaseException) -> str:
+    """
+    Exception type plus a truncated, digit-masked message.
+    """
+    message = _DIGIT_RUN.sub("####", str(error)[:ERROR_MESSAGE_CHARS])
+    return f"{type(error).__name__}: {message}" if message else type(error).__name__
+
+
+def size_of(obj, depth: int = 3) -> int:
+    """
+    Approximate payload size: characters of strings / bytes, recursively
+    through dicts and lists (uploads count their .size).
+    """
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if depth == 0:
+        return 0
+    if isinstance(obj, dict):
+        return sum(size_of(v, depth - 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(size_of(v, depth - 1) for v in obj)
+    return getattr(obj, "size", 0) if isinstance(getattr(obj, "size", None), int) else 0
+
+
+class Span:
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind",
+        "start", "end", "attributes", "error", "_t0", "_token",
+    )
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], trace_id: str = None, **attributes):
+        self.trace_id = trace_id or (parent.trace_id if parent else uuid.uuid4().hex)
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end = None
+        self.attributes = dict(attributes)
+        self.error = None
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def finish(self, error: BaseException = None):
+        self.attributes["duration_ms"] = self.elapsed_ms()
+        self.end = self.start + self.attributes["duration_ms"] / 1000
+        if error is not None:
+            self.error = error_summary(error)
+        get_exporter().export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    trace_id = span_id = parent_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def elapsed_ms(self) -> float:
+        return 0.0
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class span:
+    """
+    Context manager for a span under the current one (or a new trace).
+
+    activate=False records the span without making it the parent of spans
+    opened inside it; use it in generators, whose body runs in the
+    consumer's context.
+    """
+
+    def __init__(self, name: str, kind: str = "internal", activate: bool = True,
+                 trace_id: str = None, **attributes):
+        self.name = name
+        self.kind = kind
+        self.activate = activate
+        self.trace_id = trace_id
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        if not TRACING_ENABLED:
+            return NOOP_SPAN
+
+        self.span = Span(self.name, self.kind, _current.get(), self.trace_id, **self.attributes)
+        if self.activate:
+            self.span._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+
+        if self.span._token is not None:
+            _current.reset(self.span._token)
+        self.span.finish(exc)
+        return False
+
+
+def start_trace(name: str = "application", trace_id: str = None, **attributes) -> span:
+    """
+    Root span of one application; every span opened inside shares its trace id.
+    """
+    return span(name, kind="trace", trace_id=trace_id or uuid.uuid4().hex, **attributes)
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace_id if s else None
+
+
+def annotate(**attributes):
+    """
+    Add attributes (e.g. cache hits) to the current span, if any.
+    """
+    s = _current.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def traced(name: str = None, kind: str = "agent"):
+    """
+    Decorator: run a pipeline agent (state -> state) in a span, recording
+    the state size before and after.
+    """
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            with span(span_name, kind=kind, input_size=size_of(state)) as s:
+                result = fn(state, *args, **kwargs)
+                s.set(output_size=size_of(result))
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def propagate(fn):
+    """
+    Bind fn to the caller's context, so spans it opens in a worker thread
+    join the caller's trace. Each call runs in its own copy of the context.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+# --------------------------------------------------
+# Export (batched, off the hot path)
+# --------------------------------------------------
+class SpanExporter:
+    """
+    Bounded queue drained by a daemon thread. Spans are written when
+    TRACE_BATCH_SIZE are pending or every TRACE_FLUSH_SECONDS; when the
+    queue is full new spans are dropped (and counted), never blocking.
+    """
+
+    def __init__(self, path=TRACE_EXPORT_PATH, batch_size: int = TRACE_BATCH_SIZE,
+                 flush_seconds: float = TRACE_FLUSH_SECONDS, max_queue: int = TRACE_QUEUE_SIZE,
+                 langfuse: bool = ENABLE_LANGFUSE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.langfuse = langfuse
+        self.dropped = 0
+        self.exported = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._session = None
+
+    def export(self, s: Span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="span-exporter", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._drain(timeout=self.flush_seconds)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, timeout: float = 0) -> list:
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(
+                    self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """
+        Export everything queued so far (used at exit and in tests).
+        """
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch: list):
+        records = [s.to_dict() for s in batch]
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(r, default=str) + "\n" for r in records)
+        except OSError as e:
+            logger.warning(f"Could not write spans to {self.path}: {e}")
+
+        if self.langfuse:
+            self._send_langfuse(records)
+
+        self.exported += len(records)
+
+    def _send_langfuse(self, records: list):
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.auth = (LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY)
+
+        try:
+            r = self._session.post(
+                f"{LANGFUSE_HOST.rstrip('/')}/api/public/ingestion",
+                json={"batch": [e for r in records for e in langfuse_events(r)]},
+                timeout=10,
+            )
+            if r.status_code >= 400:
+                logger.warning(f"Langfuse ingestion returned {r.status_code}: {r.text[:200]}")
+        except requests.RequestException as e:
+            logger.warning(f"Langfuse ingestion failed: {e}")
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def langfuse_events(record: Dict[str, Any]) -> list:
+    """
+    Langfuse ingestion events for one span: the root span becomes the
+    trace, LLM calls become generations, everything else a span.
+    """
+    events = []
+    attributes = record["attributes"]
+
+    if record["parent_id"] is None:
+        events.append({
+            "id": uuid.uuid4().hex,
+            "type": "trace-create",
+            "timestamp": _iso(record["start"]),
+            "body": {
+                "id": record["trace_id"],
+                "name": record["name"],
+                "timestamp": _iso(record["start"]),
+                "metadata": attributes,
+            },
+        })
+
+    body = {
+        "id": record["span_id"],
+        "traceId": record["trace_id"],
+        "parentObservationId": record["parent_id"],
+        "name": record["name"],
+        "startTime": _iso(record["start"]),
+        "endTime": _iso(record["end"]),
+        "metadata": attributes,
+    }
+    if record["error"]:
+        body.update(level="ERROR", statusMessage=record["error"])
+
+    kind = "span-create"
+    if record["kind"] == "llm":
+        kind = "generation-create"
+        body["model"] = attributes.get("model")
+
+    events.append({
+        "id": uuid.uuid4().hex,
+        "type": kind,
+        "timestamp": _iso(record["end"]),
+        "body": body,
+    })
+    return events
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = SpanExporter()
+                atexit.register(_exporter.flush)
+
+    return _exporter
@@ -1,62 +1,171 @@
+import threading
+import uuid
+from typing import Annotated
+
 from langgraph.graph import StateGraph, END
 
+from app.agents.document_ingestion_agent import document_ingestion_agent
+from app.agents.data_extraction_agent import data_extraction_agent
+from app.agents.data_validation_agent import data_validation_agent
+from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
 from app.agents.eligibility_agent import eligibility_agent
 from app.agents.enablement_agent import enablement_agent
-from app.agents.llm_reasoning_agent import llm_reasoning_agent
+from app.agents.llm_reasoning_agent import llm_reasoning_agent, llm_reasoning_stream
+from app.observability.tracing import traced
+from app.storage.applications import save_application, save_explanation
+
+
+# --------------------------------------------------
+# State merging for parallel branches
+# --------------------------------------------------
+def merge_state(current: dict, update: dict) -> dict:
+    """
+    Reducer for the graph state: branch outputs are merged key by key.
+    """
+    return {**current, **update}
+
+
+def branch(agent, *keys):
+    """
+    Run an agent on a private copy of the state and return only the keys
+    it owns, so parallel branches never write to the same dict.
+    """
+    def node(state):
+        result = agent(dict(state))
+        return {k: result.get(k) for k in keys}
+
+    node.__name__ = agent.__name__
+    return node
 
 
 # --------------------------------------------------
 # Master Orchestrator
 # --------------------------------------------------
-def build_master_agent():
+def build_master_agent(include_reasoning: bool = True):
     """
     Orchestrates the final decision-making pipeline:
     1. Eligibility decision (ML-based)
-    2. Economic enablement recommendation (policy-based)
-    3. Human-readable explanation (LLM)
+    2. In parallel, after eligibility:
+       - Economic enablement recommendation (policy-based)
+       - Human-readable explanation (LLM), unless include_reasoning is False
+         (the caller streams the explanation itself)
     """
 
-    g = StateGraph(dict)
+    g = StateGraph(Annotated[dict, merge_state])
 
     # -------------------------
     # Nodes
     # -------------------------
     g.add_node("eligibility", eligibility_agent)
-    g.add_node("enablement", enablement_agent)
-    g.add_node("reasoning", llm_reasoning_agent)
+    g.add_node("enablement", branch(enablement_agent, "enablement"))
+    if include_reasoning:
+        g.add_node("reasoning", branch(llm_reasoning_agent, "llm_explanation"))
 
     # -------------------------
     # Flow
     # -------------------------
     g.set_entry_point("eligibility")
     g.add_edge("eligibility", "enablement")
-    g.add_edge("enablement", "reasoning")
-    g.add_edge("reasoning", END)
+    g.add_edge("enablement", END)
+
+    if include_reasoning:
+        g.add_edge("eligibility", "reasoning")
+        g.add_edge("reasoning", END)
 
     return g.compile()
 
 
+_master_agents = {}
+_master_agent_lock = threading.Lock()
+
+
+def get_master_agent(include_reasoning: bool = True):
+    """
+    Compiled master graph, built once per process and variant.
+    """
+    agent = _master_agents.get(include_reasoning)
+
+    if agent is None:
+        with _master_agent_lock:
+            agent = _master_agents.get(include_reasoning)
+            if agent is None:
+                agent = build_master_agent(include_reasoning)
+                _master_agents[include_reasoning] = agent
+
+    return agent
+
+
 # --------------------------------------------------
 # Public API
 # --------------------------------------------------
+def run_intake(state):
+    """
+    Ingestion, extraction, validation and readiness: everything before the
+    decision graph. state needs "user_input" and "uploaded_files".
+    """
+    for agent in (
+        document_ingestion_agent,
+        data_extraction_agent,
+        data_validation_agent,
+        eligibility_readiness_agent,
+    ):
+        state = agent(state)
+    return state
+
+
+@traced("application_flow")
+def run_application_flow(state, stream_explanation: bool = False, persist: bool = True):
+    """
+    Run the decision graph.
 
-def run_application_flow(state):
-    agent = build_master_agent()
+    With stream_explanation=True the LLM step is left out of the graph and
+    the result carries "llm_explanation_stream", a generator of explanation
+    fragments for incremental rendering.
+
+    The decision is persisted (see app.storage.applications) under
+    state["application_id"], or a new id returned in the result, unless
+    persist is False (e.g. audit re-runs).
+    """
+    application_id = state.get("application_id") or uuid.uuid4().hex
+    agent = get_master_agent(include_reasoning=not stream_explanation)
     final_state = agent.invoke(state)
 
     eligibility = final_state.get("eligibility", {})
     enablement = final_state.get("enablement", {})
 
-    return {
+    result = {
         "chat_response": (
             f"### Eligibility Decision\n"
             f"**Status:** {eligibility.get('decision', 'MANUAL_REVIEW')}\n\n"
             f"**Reason:** {eligibility.get('reason', 'N/A')}"
         ),
+        "application_id": application_id,
+        "eligibility": eligibility,
         "enablement": enablement,
         "llm_explanation": final_state.get("llm_explanation"),
     }
 
+    # Saved now, so the decision is kept even if the explanation stream
+    # is never read to the end
+    row = save_application(application_id, final_state) if persist else None
+
+    if stream_explanation:
+        result["llm_explanation_stream"] = persist_after_stream(llm_reasoning_stream(final_state), row)
+
+    return result
+
+
+def persist_after_stream(stream, row):
+    """
+    Pass the explanation through and add it to the saved application once
+    it has been streamed in full.
+    """
+    pieces = []
+    for piece in stream:
+        pieces.append(piece)
+        yield piece
+    save_explanation(row, "".join(pieces))
+
 
 
 def run_application_flow_old(state):#validated_data, readiness):
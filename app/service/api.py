@@ -0,0 +1,341 @@
+"""
+HTTP scoring service (ASGI), independent of the Streamlit UI.
+
+    POST /v1/extract       multipart: user_input + files -> validated data, readiness
+    POST /v1/decide        JSON: validated_data (+ readiness) -> decision, enablement, explanation
+    POST /v1/applications  multipart: both in one call
+    GET  /healthz          liveness
+    GET  /readyz           readiness: model loaded, Ollama reachable, spare capacity
+    GET  /metrics          LLM token / timing metrics (Prometheus text)
+
+Handlers are async: uploads are read and responses written on the event
+loop, and each pipeline run goes to a bounded thread pool, where it waits
+on Ollama and on the ingestion process pool (which bounds CPU-bound
+parsing and OCR). Admission is capped at SERVICE_MAX_PENDING requests;
+past that the service answers 503 with Retry-After instead of queueing
+without limit. Each request has a SERVICE_REQUEST_TIMEOUT deadline.
+
+Run:
+    uvicorn app.service.api:app --host 0.0.0.0 --port 8000
+    python -m app.service.api --port 8000
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+from app.config import (
+    SERVICE_WORKERS,
+    SERVICE_MAX_PENDING,
+    SERVICE_REQUEST_TIMEOUT,
+    SERVICE_MAX_UPLOAD_MB,
+)
+from app.agents.document_ingestion_agent import BytesUpload
+from app.llm.llm_client import LLMError, get_client
+from app.observability.llm_metrics import prometheus_text
+from app.observability.tracing import propagate, start_trace
+
+logger = logging.getLogger("ScoringService")
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+# --------------------------------------------------
+# Pipeline steps (run in the worker pool)
+# --------------------------------------------------
+def jsonable(obj):
+    """
+    Pipeline output as plain JSON types (numpy scalars, dates, ...).
+    """
+    def default(o):
+        return o.item() if hasattr(o, "item") else str(o)
+
+    return json.loads(json.dumps(obj, default=default))
+
+
+def intake(user_input: str, uploads: list, application_id: str = None) -> Dict[str, Any]:
+    from app.orchestrator.master_agent import run_intake
+
+    state = run_intake({"application_id": application_id, "user_input": user_input, "uploaded_files": uploads})
+    return {
+        # Pass to /v1/decide so the decision is stored with the documents
+        "application_id": state["application_id"],
+        "documents": [
+            {
+                "file_name": d.get("file_name"),
+                "file_type": d.get("file_type"),
+                "chars": len(d.get("raw_text") or ""),
+                "error": d.get("error"),
+            }
+            for d in state.get("documents") or []
+        ],
+        "extracted_data": state["extracted_data"],
+        "validated_data": state["validated_data"],
+        "eligibility_readiness": state["eligibility_readiness"],
+        # Cleaned applicant text; the explanation draws on it
+        "llm_context": state.get("llm_context") or "",
+    }
+
+
+def decide(validated_data: dict, readiness: dict, llm_context: str = "",
+           application_id: str = None) -> Dict[str, Any]:
+    from app.orchestrator.master_agent import run_application_flow
+
+    result = run_application_flow({
+        "application_id": application_id,
+        "validated_data": validated_data,
+        "eligibility_readiness": readiness,
+        "llm_context": llm_context,
+    })
+    return {
+        "application_id": result["application_id"],
+        "eligibility": result["eligibility"],
+        "enablement": result["enablement"],
+        "chat_response": result["chat_response"],
+        "llm_explanation": result["llm_explanation"],
+    }
+
+
+def process(user_input: str, uploads: list, application_id: str = None) -> Dict[str, Any]:
+    response = intake(user_input, uploads, application_id)
+    ready = response["eligibility_readiness"]["status"] == "ready"
+    response["decision"] = (
+        decide(
+            response["validated_data"], response["eligibility_readiness"],
+            response["llm_context"], response["application_id"],
+        )
+        if ready else None
+    )
+    return response
+
+
+# --------------------------------------------------
+# Bounded execution
+# --------------------------------------------------
+class Overloaded(Exception):
+    pass
+
+
+class PipelineRunner:
+    """
+    Runs blocking pipeline calls on a thread pool with an admission cap
+    and a per-request deadline.
+
+    A request that times out gets 504, but its thread cannot be stopped;
+    it keeps its admission slot until it actually finishes, so timeouts
+    cannot push more work onto a saturated pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.executor = None
+
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline")
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def _release(self, _future):
+        # Runs on the event loop (see call_soon_threadsafe below)
+        self.pending -= 1
+        self.completed += 1
+
+    async def run(self, fn, *args):
+        if self.saturated:
+            raise Overloaded()
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        # Spans opened in the worker join this request's trace
+        future = self.executor.submit(propagate(fn), *args)
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "timed_out": self.timed_out,
+        }
+
+
+runner = PipelineRunner(SERVICE_WORKERS, SERVICE_MAX_PENDING, SERVICE_REQUEST_TIMEOUT)
+model_loaded = False
+
+
+def ollama_reachable() -> bool:
+    client = get_client()
+    try:
+        r = client.session.get(f"{client.base_url}/api/tags", timeout=2)
+        return r.status_code == 200
+    except Exception:
+        return False
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global model_loaded
+
+    from app.models.eligibility_model import get_model
+
+    runner.start()
+    # Load (or train) the model before taking traffic
+    await asyncio.get_running_loop().run_in_executor(runner.executor, get_model)
+    model_loaded = True
+    logger.info("Scoring service ready")
+
+    yield
+
+    runner.stop()
+
+
+app = FastAPI(title="Social Support Scoring Service", lifespan=lifespan)
+
+
+async def run_step(name: str, fn, *args, **attrs):
+    """
+    One pipeline call as one trace, with overload / timeout / LLM failures
+    mapped to HTTP errors.
+    """
+    with start_trace(name, **attrs):
+        try:
+            return jsonable(await runner.run(fn, *args))
+        except Overloaded:
+            raise HTTPException(503, "Service is at capacity, retry later", headers={"Retry-After": "5"})
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"Request exceeded {runner.timeout:.0f}s")
+        except LLMError as e:
+            # The type only: messages may describe applicant data
+            logger.warning(f"{name}: LLM backend error: {e}")
+            raise HTTPException(502, f"LLM backend error ({type(e).__name__})")
+
+
+async def read_uploads(files: List[UploadFile]) -> list:
+    """
+    Read uploads in chunks, refusing a file as soon as it passes
+    SERVICE_MAX_UPLOAD_MB, so an oversized upload is never held whole.
+    """
+    limit = SERVICE_MAX_UPLOAD_MB * 1024 * 1024
+    uploads = []
+
+    for f in files:
+        chunks, size = [], 0
+        while True:
+            chunk = await f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(413, f"{f.filename} exceeds {SERVICE_MAX_UPLOAD_MB} MB")
+            chunks.append(chunk)
+
+        uploads.append(BytesUpload(b"".join(chunks), f.filename or "upload", f.content_type or ""))
+
+    return uploads
+
+
+# --------------------------------------------------
+# Endpoints
+# --------------------------------------------------
+class DecisionRequest(BaseModel):
+    validated_data: Dict[str, Any]
+    eligibility_readiness: Optional[Dict[str, Any]] = None
+    llm_context: str = ""
+    # Stored decisions are keyed by it; generated when absent
+    application_id: Optional[str] = None
+
+
+@app.post("/v1/extract")
+async def extract_endpoint(
+    user_input: str = Form(""),
+    files: List[UploadFile] = File(default=[]),
+    application_id: Optional[str] = Form(None),
+):
+    uploads = await read_uploads(files)
+    return await run_step("extract", intake, user_input, uploads, application_id, files=len(uploads))
+
+
+@app.post("/v1/decide")
+async def decide_endpoint(request: DecisionRequest):
+    readiness = request.eligibility_readiness or {"status": "ready", "missing_fields": []}
+    return await run_step(
+        "decide", decide, request.validated_data, readiness, request.llm_context, request.application_id
+    )
+
+
+@app.post("/v1/applications")
+async def application_endpoint(
+    user_input: str = Form(""),
+    files: List[UploadFile] = File(default=[]),
+    application_id: Optional[str] = Form(None),
+):
+    uploads = await read_uploads(files)
+    return await run_step("application", process, user_input, uploads, application_id, files=len(uploads))
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    checks = {
+        "model_loaded": model_loaded,
+        "capacity": not runner.saturated,
+        # Off the event loop: the probe may wait up to its timeout
+        "ollama": await asyncio.to_thread(ollama_reachable),
+    }
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks, "pool": runner.stats()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return prometheus_text()
+
+
+def main(argv=None):
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
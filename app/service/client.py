@@ -0,0 +1,72 @@
+"""
+Client for the scoring service, used by the Streamlit UI when
+SCORING_SERVICE_URL is set.
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+import requests
+
+from app.config import SCORING_SERVICE_URL, SERVICE_REQUEST_TIMEOUT
+
+logger = logging.getLogger("ScoringServiceClient")
+
+
+class ScoringServiceError(RuntimeError):
+    """
+    The service could not be reached or did not return a result.
+    """
+
+
+class ScoringServiceClient:
+    def __init__(self, base_url: str = SCORING_SERVICE_URL, timeout: float = SERVICE_REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def process(self, user_input: str, uploaded_files, application_id: str = None) -> Dict[str, Any]:
+        """
+        Full pipeline in one call: validated data, readiness and, when
+        ready, the decision ("decision" is None otherwise).
+        """
+        files = [
+            ("files", (f.name, f.getvalue(), f.type or "application/octet-stream"))
+            for f in uploaded_files or []
+        ]
+
+        try:
+            r = self.session.post(
+                f"{self.base_url}/v1/applications",
+                data={"user_input": user_input, **({"application_id": application_id} if application_id else {})},
+                files=files,
+                # Connect fast; allow a little over the service's own deadline
+                timeout=(5, self.timeout + 10),
+            )
+        except requests.RequestException as e:
+            raise ScoringServiceError(f"Scoring service unreachable: {e}") from e
+
+        if r.status_code != 200:
+            try:
+                detail = r.json().get("detail")
+            except ValueError:
+                detail = r.text[:200]
+            raise ScoringServiceError(f"Scoring service returned {r.status_code}: {detail}")
+
+        return r.json()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_service_client() -> ScoringServiceClient:
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ScoringServiceClient()
+
+    return _client
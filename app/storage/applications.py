@@ -0,0 +1,485 @@
+"""
+Persistence for applications and their decisions.
+
+One row per application: validated data, eligibility decision and
+signals, enablement and the LLM explanation. The repository writes
+through a write-behind buffer - save() only enqueues, and a background
+thread writes rows in batches of STORE_BATCH_SIZE or every
+STORE_FLUSH_SECONDS with one bulk statement - so persisting a decision
+adds no database round trip to the request.
+
+Backends (APPLICATION_STORE):
+    sqlite    local file (APPLICATION_DB_PATH), works offline
+    postgres  POSTGRES_URI, needs psycopg2
+    off       nothing is persisted
+
+Both keep a small connection pool (STORE_POOL_SIZE) and index lookups by
+application id and by decision and date.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    APPLICATION_STORE,
+    APPLICATION_DB_PATH,
+    POSTGRES_URI,
+    STORE_POOL_SIZE,
+    STORE_BATCH_SIZE,
+    STORE_FLUSH_SECONDS,
+    STORE_QUEUE_SIZE,
+)
+
+logger = logging.getLogger("ApplicationStore")
+
+COLUMNS = (
+    "application_id",
+    "decision",
+    "probability",
+    "created_at",
+    "decided_at",
+    "validated_data",
+    "eligibility",
+    "eligibility_signals",
+    "enablement",
+    "llm_explanation",
+)
+JSON_COLUMNS = ("validated_data", "eligibility", "eligibility_signals", "enablement")
+
+WRITE_ATTEMPTS = 3
+
+
+def to_json(obj) -> str:
+    """
+    JSON for the document columns (numpy scalars, dates, ...).
+    """
+    return json.dumps(obj, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def application_row(application_id: str, state: Dict[str, Any], llm_explanation: Optional[str] = None) -> tuple:
+    """
+    Row for a decided application, from the decision graph's final state.
+    created_at only applies to the first insert; decided_at to every save.
+    """
+    eligibility = state.get("eligibility") or {}
+    probability = eligibility.get("probability")
+    now = utc_now()
+
+    return (
+        application_id,
+        eligibility.get("decision"),
+        None if probability is None else float(probability),
+        now,
+        now,
+        to_json(state.get("validated_data")),
+        to_json(eligibility),
+        to_json(state.get("eligibility_signals")),
+        to_json(state.get("enablement")),
+        llm_explanation if llm_explanation is not None else state.get("llm_explanation"),
+    )
+
+
+def _upsert_sql(values: str) -> str:
+    # A re-decision keeps the first created_at, so date lookups stay put
+    updates = ", ".join(
+        f"{c} = excluded.{c}" for c in COLUMNS if c not in ("application_id", "created_at")
+    )
+    return (
+        f"INSERT INTO applications ({', '.join(COLUMNS)}) VALUES {values} "
+        f"ON CONFLICT (application_id) DO UPDATE SET {updates}"
+    )
+
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+class SQLiteBackend:
+    """
+    Local stand-in for Postgres: WAL mode, so readers do not block the
+    writer thread.
+    """
+
+    param = "?"
+
+    def __init__(self, path: Path = APPLICATION_DB_PATH, pool_size: int = STORE_POOL_SIZE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS applications (
+                    application_id      TEXT PRIMARY KEY,
+                    decision            TEXT,
+                    probability         REAL,
+                    created_at          TEXT NOT NULL,
+                    decided_at          TEXT,
+                    validated_data      TEXT,
+                    eligibility         TEXT,
+                    eligibility_signals TEXT,
+                    enablement          TEXT,
+                    llm_explanation     TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_applications_decision_created
+                    ON applications (decision, created_at);
+                CREATE INDEX IF NOT EXISTS idx_applications_created
+                    ON applications (created_at);
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(applications)")}
+            if "decided_at" not in columns:
+                conn.execute("ALTER TABLE applications ADD COLUMN decided_at TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._pool.get()
+
+        try:
+            with conn:  # commit, or roll back on error
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def write_many(self, rows: List[tuple]):
+        sql = _upsert_sql("(" + ", ".join("?" * len(COLUMNS)) + ")")
+        with self.connection() as conn:
+            conn.executemany(sql, rows)
+
+    def query(self, sql: str, params: tuple) -> List[tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PostgresBackend:
+    """
+    Postgres via a psycopg2 thread-safe pool; batches go out as one
+    multi-row INSERT (execute_values) instead of a statement per row.
+    """
+
+    param = "%s"
+
+    def __init__(self, uri: str = POSTGRES_URI, pool_size: int = STORE_POOL_SIZE):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self._pool = ThreadedConnectionPool(1, pool_size, uri)
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS applications (
+                    application_id      TEXT PRIMARY KEY,
+                    decision            TEXT,
+                    probability         DOUBLE PRECISION,
+                    created_at          TIMESTAMPTZ NOT NULL,
+                    decided_at          TIMESTAMPTZ,
+                    validated_data      JSONB,
+                    eligibility         JSONB,
+                    eligibility_signals JSONB,
+                    enablement          JSONB,
+                    llm_explanation     TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_applications_decision_created
+                    ON applications (decision, created_at);
+                CREATE INDEX IF NOT EXISTS idx_applications_created
+                    ON applications (created_at);
+                ALTER TABLE applications ADD COLUMN IF NOT EXISTS decided_at TIMESTAMPTZ;
+                """
+            )
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.getconn()
+        try:
+            with conn:  # commit, or roll back on error
+                yield conn
+        finally:
+            self._pool.putconn(conn)
+
+    def write_many(self, rows: List[tuple]):
+        from psycopg2.extras import execute_values
+
+        with self.connection() as conn, conn.cursor() as cur:
+            execute_values(cur, _upsert_sql("%s"), rows, page_size=len(rows))
+
+    def query(self, sql: str, params: tuple) -> List[tuple]:
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def close(self):
+        self._pool.closeall()
+
+
+def make_backend(kind: str = APPLICATION_STORE):
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "postgres":
+        return PostgresBackend()
+    raise ValueError(f"Unknown APPLICATION_STORE {kind!r} (expected sqlite, postgres or off)")
+
+
+# --------------------------------------------------
+# Write-behind buffer
+# --------------------------------------------------
+class WriteBehindBuffer:
+    """
+    Bounded queue drained by a daemon thread into backend.write_many.
+    put() blocks only when STORE_QUEUE_SIZE rows are waiting, i.e. when the
+    database has fallen that far behind.
+    """
+
+    def __init__(self, backend, batch_size: int = STORE_BATCH_SIZE,
+                 flush_seconds: float = STORE_FLUSH_SECONDS, max_queue: int = STORE_QUEUE_SIZE):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, row: tuple):
+        self._ensure_thread()
+        self._queue.put(row)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="application-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _drain(self) -> list:
+        # Block for the first row, then collect until the batch is full or
+        # flush_seconds have passed
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        # Last write wins within a batch (one INSERT cannot touch a row twice)
+        rows = list({row[0]: row for row in batch}.values())
+
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self.backend.write_many(rows)
+                self.written += len(rows)
+                self.batches += 1
+                return
+            except Exception as e:
+                if attempt == WRITE_ATTEMPTS:
+                    self.failed += len(rows)
+                    logger.error(f"Dropping {len(rows)} application rows after {attempt} attempts: {e}")
+                    return
+                logger.warning(f"Application write failed (attempt {attempt}): {e}")
+                time.sleep(0.5 * 2 ** (attempt - 1))
+
+    def flush(self):
+        """
+        Wait until every row queued so far is written (at exit and in tests).
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+# --------------------------------------------------
+# Repository
+# --------------------------------------------------
+class ApplicationRepository:
+    def __init__(self, backend, **buffer_options):
+        self.backend = backend
+        self.buffer = WriteBehindBuffer(backend, **buffer_options)
+
+    def save(self, row: tuple):
+        """
+        Queue a row (see application_row); written in the background.
+        """
+        self.buffer.put(row)
+
+    def save_many(self, rows: List[tuple]):
+        """
+        Write rows now, in one bulk statement (for batch jobs).
+        """
+        if rows:
+            self.backend.write_many(rows)
+
+    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        p = self.backend.param
+        rows = self.backend.query(
+            f"SELECT {', '.join(COLUMNS)} FROM applications WHERE application_id = {p}",
+            (application_id,),
+        )
+        return self._decode(rows[0]) if rows else None
+
+    def find(self, decision: str = None, since=None, until=None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Newest first, optionally filtered by decision and by created_at
+        (ISO strings or datetimes, since inclusive, until exclusive).
+        """
+        p = self.backend.param
+        where, params = [], []
+        if decision is not None:
+            where.append(f"decision = {p}")
+            params.append(decision)
+        if since is not None:
+            where.append(f"created_at >= {p}")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            where.append(f"created_at < {p}")
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM applications"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY created_at DESC LIMIT {p}"
+        params.append(limit)
+
+        return [self._decode(r) for r in self.backend.query(sql, tuple(params))]
+
+    @staticmethod
+    def _decode(row: tuple) -> Dict[str, Any]:
+        record = dict(zip(COLUMNS, row))
+        for column in JSON_COLUMNS:
+            # SQLite returns JSON text, psycopg2 already-decoded JSONB
+            if isinstance(record[column], str):
+                record[column] = json.loads(record[column])
+        for column in ("created_at", "decided_at"):
+            if isinstance(record[column], datetime):
+                record[column] = record[column].isoformat()
+        return record
+
+    def flush(self):
+        self.buffer.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return self.buffer.stats()
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+
+
+_repository = None
+_repository_error = None
+_repository_lock = threading.Lock()
+
+
+def get_application_repository() -> Optional[ApplicationRepository]:
+    """
+    Process-wide repository, or None when APPLICATION_STORE is "off" or the
+    backend could not be opened (logged once).
+    """
+    global _repository, _repository_error
+
+    if _repository is None and _repository_error is None and APPLICATION_STORE != "off":
+        with _repository_lock:
+            if _repository is None and _repository_error is None:
+                try:
+                    _repository = ApplicationRepository(make_backend())
+                    # Rows still buffered at exit are written, not lost
+                    atexit.register(_repository.flush)
+                except Exception as e:
+                    _repository_error = e
+                    logger.error(f"Application store unavailable, decisions are not persisted: {e}")
+
+    return _repository
+
+
+def save_application(application_id: str, state: Dict[str, Any],
+                     llm_explanation: Optional[str] = None) -> Optional[tuple]:
+    """
+    Persist a decided application in the background; never raises.
+    Returns the queued row (None when nothing is stored).
+    """
+    repository = get_application_repository()
+    if repository is None:
+        return None
+
+    try:
+        row = application_row(application_id, state, llm_explanation)
+        repository.save(row)
+        return row
+    except Exception as e:
+        logger.warning(f"Could not queue application {application_id} for storage: {e}")
+        return None
+
+
+def save_explanation(row: tuple, llm_explanation: str):
+    """
+    Upsert the explanation onto a row saved earlier by save_application,
+    keeping its decision timestamps.
+    """
+    repository = get_application_repository()
+    if repository is None or row is None:
+        return
+
+    try:
+        repository.save(row[:-1] + (llm_explanation,))
+    except Exception as e:
+        logger.warning(f"Could not queue the explanation of application {row[0]}: {e}")
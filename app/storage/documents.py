@@ -0,0 +1,596 @@
+"""
+Content-addressed store for uploaded documents and their parsed output.
+
+Each upload's bytes are stored once, keyed by their SHA-256; the parsed
+result (text, tables, per-page info) is stored alongside, zlib-compressed
+JSON, keyed like the in-memory ingestion cache by (sha256, MIME type,
+extension), with the fingerprint of the parser that produced it (version and
+parsing settings). Ingestion looks here before parsing, so a document seen by
+any process or earlier run is only run through PyMuPDF / Tesseract again
+after the parser or its settings change.
+Applications keep an ordered list of their documents and the applicant's
+chat text, so re-processing or auditing an application reads the stored
+inputs. Nothing is kept for applications without documents, and everything
+expires after DATA_RETENTION_DAYS: application links when they are that old,
+bytes and parses once no application still within retention uses them.
+
+Backends (DOCUMENT_STORE):
+    local  blobs as files under DOCUMENT_STORE_DIR, index in SQLite
+    mongo  GridFS for bytes, collections for parses and links (MONGODB_URI)
+    off    nothing is stored
+
+Usage:
+    python -m app.storage.documents show <application_id>
+    python -m app.storage.documents reprocess <application_id> [--user-input TEXT]
+    python -m app.storage.documents stats
+    python -m app.storage.documents purge
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    DATA_RETENTION_DAYS,
+    DOCUMENT_STORE,
+    DOCUMENT_STORE_DIR,
+    DOCUMENT_COMPRESSION_LEVEL,
+    MONGODB_URI,
+    MONGODB_DB_NAME,
+)
+
+logger = logging.getLogger("DocumentStore")
+
+# Parsed-document keys kept in the store (the rest describes the upload)
+PARSED_KEYS = ("raw_text", "tables", "structured", "pages")
+
+# Purge expired data every N application links (and when a store opens)
+PURGE_EVERY = 100
+
+
+def compress(parsed: Dict[str, Any], level: int = DOCUMENT_COMPRESSION_LEVEL) -> bytes:
+    payload = {k: parsed[k] for k in PARSED_KEYS if k in parsed}
+    text = json.dumps(payload, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+    return zlib.compress(text.encode("utf-8"), level)
+
+
+def decompress(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+class LocalDocumentStore:
+    """
+    Blobs at <dir>/blobs/<sha[:2]>/<sha>, written atomically and never
+    rewritten; parses and application links in <dir>/index.sqlite3.
+    """
+
+    def __init__(self, root: Path = DOCUMENT_STORE_DIR, retention_days: int = DATA_RETENTION_DAYS):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.retention_seconds = retention_days * 86400
+        self._links = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256     TEXT PRIMARY KEY,
+                size       INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS parses (
+                sha256      TEXT NOT NULL,
+                mime_type   TEXT NOT NULL,
+                ext         TEXT NOT NULL,
+                parsed      BLOB NOT NULL,
+                parsed_size INTEGER NOT NULL,
+                parser      TEXT NOT NULL DEFAULT '',
+                created_at  REAL NOT NULL,
+                PRIMARY KEY (sha256, mime_type, ext)
+            );
+            CREATE TABLE IF NOT EXISTS application_documents (
+                application_id TEXT NOT NULL,
+                position       INTEGER NOT NULL,
+                sha256         TEXT NOT NULL,
+                mime_type      TEXT NOT NULL,
+                ext            TEXT NOT NULL,
+                file_name      TEXT NOT NULL,
+                created_at     REAL NOT NULL,
+                PRIMARY KEY (application_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_application_documents_sha
+                ON application_documents (sha256);
+            CREATE INDEX IF NOT EXISTS idx_application_documents_created
+                ON application_documents (created_at);
+            CREATE TABLE IF NOT EXISTS application_inputs (
+                application_id TEXT PRIMARY KEY,
+                user_input     BLOB NOT NULL,
+                created_at     REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_application_inputs_created
+                ON application_inputs (created_at);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(parses)")}
+        if "parser" not in columns:
+            self._conn.execute("ALTER TABLE parses ADD COLUMN parser TEXT NOT NULL DEFAULT ''")
+        self.purge()
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.blob_dir / sha[:2] / sha
+
+    def put_bytes(self, sha: str, data: bytes):
+        path = self._blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f"{sha}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, size, created_at) VALUES (?, ?, ?)",
+                (sha, len(data), time.time()),
+            )
+            self._conn.commit()
+
+    def get_bytes(self, sha: str) -> Optional[bytes]:
+        path = self._blob_path(sha)
+        return path.read_bytes() if path.exists() else None
+
+    def put_parsed(self, key: tuple, blob: bytes, parser: str):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO parses (sha256, mime_type, ext, parsed, parsed_size, parser, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (*key, blob, len(blob), parser, time.time()),
+            )
+            self._conn.commit()
+
+    def get_parsed(self, key: tuple, parser: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parsed FROM parses WHERE sha256 = ? AND mime_type = ? AND ext = ? AND parser = ?",
+                (*key, parser),
+            ).fetchone()
+        return row[0] if row else None
+
+    def link(self, application_id: str, refs: List[Dict[str, Any]], user_input: str = ""):
+        now = time.time()
+        with self._lock:
+            # Replace the whole list: a resubmission may drop documents
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM application_inputs WHERE application_id = ?", (application_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM application_documents WHERE application_id = ?", (application_id,)
+                )
+                if not refs:
+                    return
+                self._conn.execute(
+                    "INSERT INTO application_inputs (application_id, user_input, created_at) VALUES (?, ?, ?)",
+                    (application_id, zlib.compress(user_input.encode("utf-8")), now),
+                )
+                self._conn.executemany(
+                    """
+                    INSERT INTO application_documents
+                        (application_id, position, sha256, mime_type, ext, file_name, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (application_id, i, r["sha256"], r["mime_type"], r["ext"], r["file_name"], now)
+                        for i, r in enumerate(refs)
+                    ],
+                )
+
+        self._links += 1
+        if self._links % PURGE_EVERY == 0:
+            self.purge()
+
+    def refs(self, application_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT sha256, mime_type, ext, file_name FROM application_documents
+                WHERE application_id = ? ORDER BY position
+                """,
+                (application_id,),
+            ).fetchall()
+        return [dict(zip(("sha256", "mime_type", "ext", "file_name"), r)) for r in rows]
+
+    def user_input(self, application_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_input FROM application_inputs WHERE application_id = ?", (application_id,)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def purge(self, now: float = None) -> Dict[str, int]:
+        """
+        Drop application links older than the retention period, then the
+        blobs and parses that are as old and no longer linked.
+        """
+        cutoff = (now or time.time()) - self.retention_seconds
+        with self._lock:
+            with self._conn:
+                applications = self._conn.execute(
+                    "DELETE FROM application_inputs WHERE created_at < ?", (cutoff,)
+                ).rowcount
+                self._conn.execute("DELETE FROM application_documents WHERE created_at < ?", (cutoff,))
+                expired = [
+                    row[0] for row in self._conn.execute(
+                        """
+                        SELECT sha256 FROM blobs WHERE created_at < ?
+                        AND sha256 NOT IN (SELECT sha256 FROM application_documents)
+                        """,
+                        (cutoff,),
+                    )
+                ]
+                self._conn.executemany("DELETE FROM blobs WHERE sha256 = ?", [(sha,) for sha in expired])
+                self._conn.executemany("DELETE FROM parses WHERE sha256 = ?", [(sha,) for sha in expired])
+
+        for sha in expired:
+            self._blob_path(sha).unlink(missing_ok=True)
+
+        if applications or expired:
+            logger.info(f"Document store purged {applications} applications and {len(expired)} documents")
+        return {"applications": applications, "documents": len(expired)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            blobs, blob_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+            parses, parsed_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(parsed_size), 0) FROM parses"
+            ).fetchone()
+            applications = self._conn.execute(
+                "SELECT COUNT(*) FROM application_inputs"
+            ).fetchone()[0]
+        return {
+            "blobs": blobs,
+            "blob_mb": round(blob_bytes / 1024 / 1024, 2),
+            "parses": parses,
+            "parsed_mb": round(parsed_bytes / 1024 / 1024, 2),
+            "applications": applications,
+        }
+
+
+class MongoDocumentStore:
+    """
+    Same layout on MongoDB: bytes in GridFS (file id = sha256), parses and
+    application links in collections.
+    """
+
+    def __init__(self, uri: str = MONGODB_URI, db_name: str = MONGODB_DB_NAME,
+                 retention_days: int = DATA_RETENTION_DAYS):
+        import gridfs
+        from pymongo import MongoClient
+
+        self.db = MongoClient(uri)[db_name]
+        self.fs = gridfs.GridFS(self.db, collection="blobs")
+        self.parses = self.db["parses"]
+        self.links = self.db["application_documents"]
+        self.links.create_index("application_id", unique=True)
+        self.links.create_index("created_at")
+        self.retention_seconds = retention_days * 86400
+        self._links = 0
+        self.purge()
+
+    @staticmethod
+    def _parse_id(key: tuple) -> str:
+        return "|".join(key)
+
+    def put_bytes(self, sha: str, data: bytes):
+        from gridfs.errors import FileExists
+
+        if not self.fs.exists(sha):
+            try:
+                self.fs.put(data, _id=sha)
+            except FileExists:
+                pass
+
+    def get_bytes(self, sha: str) -> Optional[bytes]:
+        return self.fs.get(sha).read() if self.fs.exists(sha) else None
+
+    def put_parsed(self, key: tuple, blob: bytes, parser: str):
+        self.parses.replace_one(
+            {"_id": self._parse_id(key)},
+            {
+                "_id": self._parse_id(key),
+                "sha256": key[0],
+                "parsed": blob,
+                "parsed_size": len(blob),
+                "parser": parser,
+                "created_at": time.time(),
+            },
+            upsert=True,
+        )
+
+    def get_parsed(self, key: tuple, parser: str) -> Optional[bytes]:
+        doc = self.parses.find_one({"_id": self._parse_id(key), "parser": parser}, {"parsed": 1})
+        return bytes(doc["parsed"]) if doc else None
+
+    def link(self, application_id: str, refs: List[Dict[str, Any]], user_input: str = ""):
+        if not refs:
+            self.links.delete_one({"application_id": application_id})
+            return
+
+        self.links.replace_one(
+            {"application_id": application_id},
+            {
+                "application_id": application_id,
+                "documents": refs,
+                "user_input": user_input,
+                "created_at": time.time(),
+            },
+            upsert=True,
+        )
+
+        self._links += 1
+        if self._links % PURGE_EVERY == 0:
+            self.purge()
+
+    def refs(self, application_id: str) -> List[Dict[str, Any]]:
+        doc = self.links.find_one({"application_id": application_id})
+        return doc["documents"] if doc else []
+
+    def user_input(self, application_id: str) -> Optional[str]:
+        doc = self.links.find_one({"application_id": application_id}, {"user_input": 1})
+        return doc.get("user_input") if doc else None
+
+    def purge(self, now: float = None) -> Dict[str, int]:
+        cutoff = (now or time.time()) - self.retention_seconds
+        applications = self.links.delete_many({"created_at": {"$lt": cutoff}}).deleted_count
+
+        linked = self.links.distinct("documents.sha256")
+        expired = [
+            doc["_id"] for doc in self.db["blobs.files"].find(
+                {"uploadDate": {"$lt": datetime.fromtimestamp(cutoff, timezone.utc)}, "_id": {"$nin": linked}},
+                {"_id": 1},
+            )
+        ]
+        for sha in expired:
+            self.fs.delete(sha)
+        self.parses.delete_many({"created_at": {"$lt": cutoff}, "sha256": {"$nin": linked}})
+
+        if applications or expired:
+            logger.info(f"Document store purged {applications} applications and {len(expired)} documents")
+        return {"applications": applications, "documents": len(expired)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blobs": self.db["blobs.files"].estimated_document_count(),
+            "parses": self.parses.estimated_document_count(),
+            "applications": self.links.estimated_document_count(),
+        }
+
+
+def make_store(kind: str = DOCUMENT_STORE):
+    if kind == "local":
+        return LocalDocumentStore()
+    if kind == "mongo":
+        return MongoDocumentStore()
+    raise ValueError(f"Unknown DOCUMENT_STORE {kind!r} (expected local, mongo or off)")
+
+
+_store = None
+_store_error = None
+_store_lock = threading.Lock()
+
+
+def get_document_store():
+    """
+    Process-wide store, or None when DOCUMENT_STORE is "off" or the backend
+    could not be opened (logged once).
+    """
+    global _store, _store_error
+
+    if _store is None and _store_error is None and DOCUMENT_STORE != "off":
+        with _store_lock:
+            if _store is None and _store_error is None:
+                try:
+                    _store = make_store()
+                except Exception as e:
+                    _store_error = e
+                    logger.error(f"Document store unavailable, documents are not kept: {e}")
+
+    return _store
+
+
+# --------------------------------------------------
+# Ingestion hooks (never raise: the store is an optimization)
+# --------------------------------------------------
+def lookup_parsed(key: tuple, parser: str) -> Optional[Dict[str, Any]]:
+    """
+    Stored parse for an ingestion cache key (sha256, mime_type, ext), if it
+    was produced by this parser fingerprint.
+    """
+    store = get_document_store()
+    if store is None:
+        return None
+
+    try:
+        blob = store.get_parsed(key, parser)
+        return decompress(blob) if blob is not None else None
+    except Exception as e:
+        logger.warning(f"Document store lookup failed for {key[0][:12]}: {e}")
+        return None
+
+
+def store_document(key: tuple, data: bytes, parsed: Dict[str, Any], parser: str):
+    store = get_document_store()
+    if store is None:
+        return
+
+    try:
+        store.put_bytes(key[0], data)
+        store.put_parsed(key, compress(parsed), parser)
+    except Exception as e:
+        logger.warning(f"Could not store document {key[0][:12]}: {e}")
+
+
+def link_application(application_id: str, refs: List[Dict[str, Any]], user_input: str = ""):
+    store = get_document_store()
+    if store is None:
+        return
+
+    try:
+        store.link(application_id, refs, user_input)
+    except Exception as e:
+        logger.warning(f"Could not link documents to application {application_id}: {e}")
+
+
+# --------------------------------------------------
+# Read path: audit / re-processing
+# --------------------------------------------------
+def load_application_documents(application_id: str) -> List[Dict[str, Any]]:
+    """
+    An application's documents as ingestion produced them (state["documents"]),
+    read from the store. Only documents stored by another parser version or
+    with other parsing settings are parsed again, from their stored bytes.
+    """
+    from app.agents.document_ingestion_agent import PARSER_FINGERPRINT, infer_document_type, ingest_bytes
+
+    store = get_document_store()
+    if store is None:
+        raise RuntimeError("DOCUMENT_STORE is off")
+
+    documents = []
+    for ref in store.refs(application_id):
+        key = (ref["sha256"], ref["mime_type"], ref["ext"])
+        blob = store.get_parsed(key, PARSER_FINGERPRINT)
+        doc = {
+            "file_name": ref["file_name"],
+            "file_type": infer_document_type(ref["file_name"]),
+            "mime_type": ref["mime_type"],
+            "sha256": ref["sha256"],
+        }
+        data = store.get_bytes(ref["sha256"]) if blob is None else None
+        if blob is not None:
+            doc.update(decompress(blob))
+        elif data is not None:
+            parsed = ingest_bytes(data, ref["mime_type"], ref["file_name"])
+            store.put_parsed(key, compress(parsed), PARSER_FINGERPRINT)
+            doc.update(parsed)
+        else:
+            doc.update(file_type="error", raw_text=None, tables=None, error="Document not stored")
+        documents.append(doc)
+
+    return documents
+
+
+def load_application_input(application_id: str) -> Optional[str]:
+    """
+    The applicant's chat text as submitted with the documents.
+    """
+    store = get_document_store()
+    if store is None:
+        raise RuntimeError("DOCUMENT_STORE is off")
+    return store.user_input(application_id)
+
+
+def reprocess(application_id: str, user_input: str = None, save: bool = False) -> Dict[str, Any]:
+    """
+    Re-run extraction onwards on the stored documents and chat text (e.g.
+    after a model or policy change) without re-running PyMuPDF / Tesseract,
+    unless the parser changed since the documents were stored.
+
+    user_input overrides the stored chat text. The re-run decision is only
+    saved - replacing the stored one - with save=True; an audit leaves the
+    original decision in place.
+    """
+    from app.agents.data_extraction_agent import data_extraction_agent
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+    from app.orchestrator.master_agent import run_application_flow
+
+    if user_input is None:
+        user_input = load_application_input(application_id)
+        if user_input is None:
+            logger.warning(f"No chat text stored for {application_id}; using the documents alone")
+            user_input = ""
+
+    state = {
+        "application_id": application_id,
+        "user_input": user_input,
+        "documents": load_application_documents(application_id),
+    }
+    for agent in (data_extraction_agent, data_validation_agent, eligibility_readiness_agent):
+        state = agent(state)
+
+    state["decision"] = None
+    if state["eligibility_readiness"]["status"] == "ready":
+        state["decision"] = run_application_flow(state, persist=save)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the document store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Print an application's stored documents")
+    show.add_argument("application_id")
+    show.add_argument("--chars", type=int, default=500, help="Text characters to print per document")
+    rerun = sub.add_parser("reprocess", help="Re-run extraction and the decision on stored text")
+    rerun.add_argument("application_id")
+    rerun.add_argument("--user-input", help="Chat text to use instead of the stored one")
+    rerun.add_argument("--save", action="store_true", help="Replace the stored decision with the re-run")
+    sub.add_parser("stats")
+    sub.add_parser("purge", help="Drop data older than DATA_RETENTION_DAYS now")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    if args.command == "stats":
+        print(json.dumps(get_document_store().stats(), indent=2))
+        return
+
+    if args.command == "purge":
+        print(json.dumps(get_document_store().purge(), indent=2))
+        return
+
+    if args.command == "show":
+        print(f"== chat text\n{(load_application_input(args.application_id) or '')[:args.chars]}")
+        for doc in load_application_documents(args.application_id):
+            print(f"== {doc['file_name']} ({doc['mime_type']}, sha256 {doc['sha256'][:12]})")
+            print((doc.get("raw_text") or json.dumps(doc.get("tables"), default=str) or "")[:args.chars])
+        return
+
+    from app.storage.applications import get_application_repository
+
+    repository = get_application_repository()
+    stored = repository.get(args.application_id) if repository else None
+
+    state = reprocess(args.application_id, args.user_input, save=args.save)
+    decision = state["decision"]
+    print(json.dumps({
+        "validated_data": state["validated_data"],
+        "eligibility_readiness": state["eligibility_readiness"],
+        "eligibility": decision and decision["eligibility"],
+        "stored_eligibility": stored and stored["eligibility"],
+        "saved": bool(args.save and decision),
+    }, indent=2, default=str))
+    if repository:
+        repository.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Per-stage pipeline benchmarks, offline.
+
+Runs every agent (ingestion, extraction, validation, readiness, eligibility
+model, enablement, LLM reasoning) and run_application_flow end to end on
+synthetic PDFs, images, workbooks and chat inputs of several sizes. LLM
+calls go to an in-process fake Ollama (benchmarks.fake_ollama) unless
+--ollama-url points at a real one. Reports p50 / p95 latency and
+throughput per stage.
+
+Usage:
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json --tolerance 0.25
+
+With --baseline the exit code is 1 when any stage's p50 regressed by more
+than the tolerance (and by more than --min-delta-ms, to ignore noise on
+sub-millisecond stages), or when an agent's median prompt (tokens, from
+Ollama's response metadata) grew by more than the tolerance.
+"""
+
+import os
+
+# Repeated prompts must reach the (fake) model, not the response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+# ... and every document must be parsed, not read back from the document
+# store; nothing a synthetic run produces is stored or traced
+os.environ.setdefault("DOCUMENT_STORE", "off")
+os.environ.setdefault("APPLICATION_STORE", "off")
+os.environ.setdefault("TRACING_ENABLED", "false")
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.fake_ollama import FakeOllama
+
+
+# --------------------------------------------------
+# Cases
+# --------------------------------------------------
+def ingestion_case(data: bytes, name: str, mime_type: str):
+    from app.agents.document_ingestion_agent import (
+        document_ingestion_agent, ingestion_cache, ocr_page_cache,
+    )
+
+    def run():
+        # Cold: measure parsing, not the ingestion caches
+        ingestion_cache.clear()
+        ocr_page_cache.clear()
+        document_ingestion_agent({"uploaded_files": [fixtures.upload(data, name, mime_type)]})
+
+    return run
+
+
+def extraction_state(user_input: str = "", files=()) -> dict:
+    from app.agents.document_ingestion_agent import document_ingestion_agent
+
+    state = {"user_input": user_input, "uploaded_files": list(files)}
+    return document_ingestion_agent(state)
+
+
+def extraction_case(user_input: str = "", files=()):
+    from app.agents.data_extraction_agent import data_extraction_agent
+
+    base = extraction_state(user_input, files)
+    return lambda: data_extraction_agent(dict(base))
+
+
+def ready_state() -> dict:
+    """
+    State after validation and readiness, for the decision stages.
+    """
+    from app.agents.data_extraction_agent import data_extraction_agent
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+
+    state = extraction_state(fixtures.CHAT_SHORT)
+    for agent in (data_extraction_agent, data_validation_agent, eligibility_readiness_agent):
+        state = agent(state)
+    return state
+
+
+def decision_state() -> dict:
+    from app.agents.eligibility_agent import eligibility_agent
+
+    return eligibility_agent(ready_state())
+
+
+def full_pipeline_case(user_input: str, files):
+    from app.agents.document_ingestion_agent import (
+        document_ingestion_agent, ingestion_cache, ocr_page_cache,
+    )
+    from app.agents.data_extraction_agent import data_extraction_agent
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+    from app.orchestrator.master_agent import run_application_flow
+
+    def run():
+        ingestion_cache.clear()
+        ocr_page_cache.clear()
+        state = {
+            "user_input": user_input,
+            "uploaded_files": [fixtures.upload(*f) for f in files],
+        }
+        for agent in (
+            document_ingestion_agent,
+            data_extraction_agent,
+            data_validation_agent,
+            eligibility_readiness_agent,
+        ):
+            state = agent(state)
+        if state["eligibility_readiness"]["status"] == "ready":
+            run_application_flow(state)
+
+    return run
+
+
+def build_cases(include_ocr: bool) -> list:
+    """
+    (stage, case, setup, items per call, iteration weight)
+    """
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+    from app.agents.enablement_agent import enablement_agent
+    from app.agents.llm_reasoning_agent import llm_reasoning_agent
+    from app.models.eligibility_model import (
+        get_model, predict_eligibility, predict_eligibility_batch,
+    )
+    from app.orchestrator.master_agent import run_application_flow
+
+    pdf = {p: fixtures.make_pdf(p) for p in (1, 10, 50)}
+    xlsx = {r: fixtures.make_xlsx(r) for r in (1000, 20000)}
+    applicants = fixtures.applicants(10000)
+    columns = {k: [a[k] for a in applicants] for k in applicants[0]}
+
+    get_model()  # load outside the timings
+
+    cases = [
+        ("ingestion", "pdf_1p", lambda: ingestion_case(pdf[1], "bank_1p.pdf", fixtures.PDF_MIME), 1, 1),
+        ("ingestion", "pdf_10p", lambda: ingestion_case(pdf[10], "bank_10p.pdf", fixtures.PDF_MIME), 1, 0.5),
+        ("ingestion", "pdf_50p", lambda: ingestion_case(pdf[50], "bank_50p.pdf", fixtures.PDF_MIME), 1, 0.25),
+        ("ingestion", "xlsx_1k", lambda: ingestion_case(xlsx[1000], "bank_1k.xlsx", fixtures.XLSX_MIME), 1, 0.5),
+        ("ingestion", "xlsx_20k", lambda: ingestion_case(xlsx[20000], "bank_20k.xlsx", fixtures.XLSX_MIME), 1, 0.1),
+    ]
+
+    if include_ocr:
+        image = fixtures.make_image()
+        cases.append(
+            ("ingestion", "png_ocr", lambda: ingestion_case(image, "id_scan.png", fixtures.PNG_MIME), 1, 0.25)
+        )
+
+    cases += [
+        ("extraction", name, (lambda text=text: extraction_case(text)), 1, 0.5)
+        for name, text in fixtures.CHAT_INPUTS.items()
+    ]
+    cases += [
+        ("extraction", "pdf_10p",
+         lambda: extraction_case(files=[fixtures.upload(pdf[10], "bank_10p.pdf", fixtures.PDF_MIME)]), 1, 0.5),
+        ("extraction", "xlsx_1k",
+         lambda: extraction_case(files=[fixtures.upload(xlsx[1000], "bank_1k.xlsx", fixtures.XLSX_MIME)]), 1, 0.5),
+
+        ("validation", "single", lambda: (lambda s=ready_state(): data_validation_agent(dict(s))), 1, 1),
+        ("readiness", "single", lambda: (lambda s=ready_state(): eligibility_readiness_agent(dict(s))), 1, 1),
+        ("eligibility_model", "single", lambda: (lambda a=applicants[0]: predict_eligibility(a)), 1, 1),
+        ("eligibility_model", "batch_10k", lambda: (lambda: predict_eligibility_batch(columns)),
+         len(applicants), 0.25),
+        ("enablement", "single", lambda: (lambda s=decision_state(): enablement_agent(dict(s))), 1, 1),
+        ("llm_reasoning", "single", lambda: (lambda s=decision_state(): llm_reasoning_agent(dict(s))), 1, 0.5),
+        ("application_flow", "graph", lambda: (lambda s=ready_state(): run_application_flow(dict(s))), 1, 0.5),
+        ("end_to_end", "chat_pdf_10p", lambda: full_pipeline_case(
+            fixtures.CHAT_SHORT, [(pdf[10], "bank_10p.pdf", fixtures.PDF_MIME)]
+        ), 1, 0.25),
+        ("end_to_end", "chat_xlsx_1k", lambda: full_pipeline_case(
+            fixtures.CHAT_VAGUE, [(xlsx[1000], "bank_1k.xlsx", fixtures.XLSX_MIME)]
+        ), 1, 0.25),
+    ]
+
+    return cases
+
+
+# --------------------------------------------------
+# Runner
+# --------------------------------------------------
+def measure(fn, iterations: int, warmup: int = 1) -> list:
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings: list, items: int) -> dict:
+    t = np.asarray(timings)
+    return {
+        "iterations": len(timings),
+        "p50_ms": round(float(np.percentile(t, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(t, 95)) * 1000, 3),
+        "mean_ms": round(float(t.mean()) * 1000, 3),
+        "throughput_per_s": round(items * len(t) / float(t.sum()), 2),
+    }
+
+
+def run_cases(cases: list, iterations: int, only: list = None) -> dict:
+    results = {}
+
+    for stage, case, setup, items, weight in cases:
+        key = f"{stage}/{case}"
+        if only and not any(key.startswith(o) for o in only):
+            continue
+
+        fn = setup()
+        n = max(3, round(iterations * weight))
+        results[key] = summarize(measure(fn, n), items)
+
+        r = results[key]
+        print(
+            f"{key:<32} p50 {r['p50_ms']:>10.2f} ms  p95 {r['p95_ms']:>10.2f} ms  "
+            f"{r['throughput_per_s']:>12.2f}/s  (n={n})",
+            flush=True,
+        )
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Stages whose p50 exceeds the baseline by more than the tolerance.
+    """
+    regressions = []
+
+    print(f"\n{'stage':<32} {'baseline p50':>13} {'current p50':>12} {'change':>8}")
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32} {'-':>13} {r['p50_ms']:>12.2f}      new")
+            continue
+
+        change = r["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        regressed = (
+            change > tolerance and r["p50_ms"] - base["p50_ms"] > min_delta_ms
+        )
+        print(
+            f"{key:<32} {base['p50_ms']:>13.2f} {r['p50_ms']:>12.2f} {change:>+8.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(key)
+
+    return regressions
+
+
+def llm_usage() -> dict:
+    """
+    Per-agent LLM calls and median prompt / completion tokens over the run.
+    """
+    from app.observability.llm_metrics import llm_stats
+
+    usage = {}
+    for agent, st in llm_stats().items():
+        recent = st["recent"]
+        usage[agent] = {
+            "calls": st["calls"],
+            "prompt_tokens_p50": (recent["prompt_tokens"] or {}).get("p50"),
+            "completion_tokens_p50": (recent["completion_tokens"] or {}).get("p50"),
+        }
+        print(
+            f"llm/{agent:<28} prompt p50 {usage[agent]['prompt_tokens_p50']} tok  "
+            f"completion p50 {usage[agent]['completion_tokens_p50']} tok  (calls={st['calls']})"
+        )
+    return usage
+
+
+def compare_prompts(usage: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Agents whose median prompt grew by more than the tolerance (someone
+    made a prompt longer).
+    """
+    grown = []
+    for agent, u in usage.items():
+        base = (baseline.get(agent) or {}).get("prompt_tokens_p50")
+        if base and u["prompt_tokens_p50"] and u["prompt_tokens_p50"] / base - 1 > tolerance:
+            print(f"llm/{agent}: prompt p50 {base} -> {u['prompt_tokens_p50']} tokens  REGRESSION")
+            grown.append(f"llm/{agent}")
+    return grown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmarks")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations for the lightest stages")
+    parser.add_argument("--only", nargs="*", help="Run only stage/case keys with these prefixes")
+    parser.add_argument("--ollama-url", help="Benchmark against this Ollama instead of the fake")
+    parser.add_argument("--replay", help="Serve LLM calls from this recording (see benchmarks.replay_ollama)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Replay latency multiplier")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake Ollama seconds per call")
+    parser.add_argument("--llm-parallel", type=int, default=4, help="Fake Ollama concurrent calls")
+    parser.add_argument("--no-ocr", action="store_true", help="Skip image OCR cases")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slow-down (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    from app.llm.llm_client import OllamaClient, set_client
+
+    server = None
+    if args.ollama_url:
+        set_client(OllamaClient(base_url=args.ollama_url))
+    elif args.replay:
+        from app.llm.recorder import load_recordings
+        from benchmarks.replay_ollama import ReplayOllama
+
+        server = ReplayOllama(
+            load_recordings(args.replay), latency_scale=args.latency_scale, parallel=args.llm_parallel
+        ).start()
+        set_client(OllamaClient(base_url=server.url))
+    else:
+        server = FakeOllama(latency=args.llm_latency, parallel=args.llm_parallel).start()
+        set_client(OllamaClient(base_url=server.url))
+
+    include_ocr = not args.no_ocr and shutil.which("tesseract") is not None
+    if not args.no_ocr and not include_ocr:
+        print("tesseract not found, skipping OCR cases", file=sys.stderr)
+
+    try:
+        results = run_cases(build_cases(include_ocr), args.iterations, args.only)
+        usage = llm_usage()
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "llm": args.ollama_url or (
+                f"replay {args.replay} (scale {args.latency_scale}, parallel {args.llm_parallel})" if args.replay
+                else f"fake (latency {args.llm_latency}s, parallel {args.llm_parallel})"
+            ),
+        },
+        "results": results,
+        "llm_usage": usage,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        regressions += compare_prompts(usage, baseline.get("llm_usage", {}), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark for extraction text processing.
+
+Reports per-MB throughput of preprocess_text and compress_to_signal on a
+synthetic multi-page OCR bank statement, next to the original
+(pass-per-rule) implementation, and checks both produce identical output.
+
+Usage:
+    python -m benchmarks.bench_text_processing --mb 5 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.agents.data_extraction_agent import (
+    KEYWORDS,
+    preprocess_text,
+    compress_to_signal,
+)
+
+
+# --------------------------------------------------
+# Reference implementation (one re.sub per rule, per-line keyword scan)
+# --------------------------------------------------
+def reference_preprocess_text(text: str) -> str:
+    text = text.replace("\x00", " ")
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r"[|_]{2,}", " ", text)
+    text = re.sub(r"[^\x20-\x7E\n]", " ", text)
+    text = re.sub(r"Page \d+ of \d+", "", text, flags=re.I)
+    text = re.sub(r"Confidential.*", "", text, flags=re.I)
+    text = re.sub(r"\b\d{10,}\b", "[LONG_NUMBER]", text)
+    return text.strip()
+
+
+def reference_compress_to_signal(text: str, max_lines: int = 40) -> str:
+    lines = [l.strip() for l in text.splitlines() if len(l.strip()) > 5]
+
+    scored = []
+    for l in lines:
+        score = sum(1 for k in KEYWORDS if k in l.lower())
+        if score > 0:
+            scored.append((score, l))
+
+    scored.sort(reverse=True)
+    selected = [l for _, l in scored[:max_lines]]
+
+    if not selected:
+        selected = lines[:max_lines]
+
+    return "\n".join(selected)
+
+
+# --------------------------------------------------
+# Synthetic OCR statement
+# --------------------------------------------------
+def synthetic_statement(target_mb: float, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    descriptions = [
+        "SALARY CREDIT ACME TRADING LLC", "ATM WITHDRAWAL", "POS PURCHASE CARREFOUR",
+        "LOAN INSTALMENT", "TRANSFER TO SAVINGS", "DEWA UTILITY PAYMENT",
+        "SCHOOL FEES - EDUCATION", "FAMILY ALLOWANCE", "CREDIT CARD PAYMENT",
+    ]
+
+    pages, size, page = [], 0, 0
+    while size < target_mb * 1024 * 1024:
+        page += 1
+        lines = [
+            "ACME BANK  –  Statement of Account",
+            f"Account No: {rng.randrange(10**13, 10**14)}    Page {page} of 50",
+            "Date        Description                         Debit        Credit       Balance",
+            "____________________________________________________________________________",
+        ]
+        for _ in range(40):
+            lines.append(
+                f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024  "
+                f"{rng.choice(descriptions):<36}  "
+                f"{rng.randint(0, 9999):>8,}.00   AED {rng.randint(0, 99999):>8,}.00 | "
+                f"{rng.randint(0, 250000):,}.00"
+            )
+        lines.append("Confidential – for the account holder only\x0c\n\n\n")
+
+        text = "\n".join(lines)
+        pages.append(text)
+        size += len(text)
+
+    return "\n".join(pages)
+
+
+def throughput(fn, arg, mb: float, repeat: int) -> float:
+    fn(arg)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return mb * repeat / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--mb", type=float, default=2.0, help="Size of the synthetic text")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    text = synthetic_statement(args.mb)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    clean = preprocess_text(text)
+
+    assert clean == reference_preprocess_text(text), "preprocess_text output differs"
+    assert compress_to_signal(clean) == reference_compress_to_signal(clean), \
+        "compress_to_signal output differs"
+
+    rows = [
+        ("preprocess_text", preprocess_text, reference_preprocess_text, text),
+        ("compress_to_signal", compress_to_signal, reference_compress_to_signal, clean),
+    ]
+
+    print(f"Input: {mb:.2f} MB, {text.count(chr(10)) + 1} lines, {args.repeat} runs")
+    print(f"{'stage':<20} {'current MB/s':>14} {'reference MB/s':>16} {'speed-up':>10}")
+    for name, fn, ref, arg in rows:
+        current = throughput(fn, arg, mb, args.repeat)
+        reference = throughput(ref, arg, mb, args.repeat)
+        print(f"{name:<20} {current:>14.1f} {reference:>16.1f} {current / reference:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
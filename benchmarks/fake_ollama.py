@@ -0,0 +1,270 @@
+"""
+In-process stand-in for Ollama's /api/generate, for offline benchmarks.
+
+Answers extraction prompts with a canned JSON object and every other
+prompt with a canned explanation, after a configurable latency. Responses
+carry Ollama's timing metadata (prompt_eval_count, eval_count, durations),
+and "stream": true is answered with NDJSON chunks.
+
+Usage (standalone):
+    python -m benchmarks.fake_ollama --port 11434 --latency 0.5
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 streamlit run main.py
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_EXTRACTION = {
+    "income": 4500,
+    "family_size": 3,
+    "employment_years": 6,
+    "employment_status": "employed",
+    "education_level": "bachelor",
+    "age": 38,
+    "assets": 20000,
+    "liabilities": 8000,
+}
+
+CANNED_EXPLANATION = (
+    "Decision Summary:\n- The application is approved for economic support.\n\n"
+    "Key Signals:\n- Income per capita is below the policy threshold.\n\n"
+    "Decision Logic:\n- rule_low_income_pc was triggered.\n\n"
+    "Enablement Support:\n- Not required for this decision.\n\n"
+    "Next Steps:\n- You will be contacted with the payment schedule."
+)
+
+# Marker of the extraction prompt (see build_extraction_prompt)
+JSON_PROMPT_MARKER = "Return EXACTLY one valid JSON object"
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class Reply:
+    """
+    What the server answers one request with: the full text, how long the
+    call takes (and until the first streamed token), and Ollama's metadata.
+    """
+
+    __slots__ = ("text", "latency", "metadata", "first_token")
+
+    def __init__(self, text: str, latency: float, metadata: dict, first_token: float = None):
+        self.text = text
+        self.latency = latency
+        self.metadata = metadata
+        self.first_token = first_token
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; with Nagle on, every
+        # call on a kept-alive connection stalls ~40 ms on delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = request.get("prompt", "")
+
+        self.server.count(prompt)
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._send_json(500, {"error": "injected failure"})
+            return
+
+        reply = self.server.respond(request)
+        if reply is None:
+            self._send_json(404, {"error": "no response for this prompt"})
+            return
+
+        with self.server.slots:
+            if request.get("stream"):
+                self._stream(reply)
+            else:
+                time.sleep(reply.latency)
+                self._send_json(200, {**reply.metadata, "done": True, "response": reply.text})
+
+    def _stream(self, reply: Reply):
+        words = reply.text.split(" ")
+        pieces = [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+        # First piece after the time to first token, the rest spread evenly
+        first = reply.latency / max(1, len(pieces)) if reply.first_token is None else reply.first_token
+        first = min(first, reply.latency)
+        delay = (reply.latency - first) / max(1, len(pieces) - 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(body: dict):
+            data = json.dumps(body).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        for i, piece in enumerate(pieces):
+            time.sleep(first if i == 0 else delay)
+            chunk({"model": reply.metadata.get("model"), "response": piece, "done": False})
+
+        chunk({**reply.metadata, "done": True, "response": ""})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    Threaded fake Ollama server.
+
+    Args:
+        latency: seconds per call (mean)
+        jitter: uniform +/- seconds added to each call
+        parallel: calls served at once (Ollama's OLLAMA_NUM_PARALLEL);
+            further calls queue. 0 = unlimited
+        error_rate: share of calls answered with HTTP 500
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        parallel: int = 0,
+        error_rate: float = 0.0,
+        model: str = "fake-llm",
+        extraction: dict = None,
+        explanation: str = CANNED_EXPLANATION,
+        handler=FakeOllamaHandler,
+    ):
+        super().__init__((host, port), handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.model = model
+        self.extraction = extraction or CANNED_EXTRACTION
+        self.explanation = explanation
+        self.slots = threading.BoundedSemaphore(parallel) if parallel else _NoLimit()
+        self.calls = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, prompt: str):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+
+    def draw_latency(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def respond(self, request: dict) -> "Reply":
+        """
+        Canned answer for a /api/generate request. Subclasses override this
+        to serve other responses (None answers 404).
+        """
+        prompt = request.get("prompt", "")
+        text = (
+            json.dumps(self.extraction)
+            if JSON_PROMPT_MARKER in prompt else self.explanation
+        )
+        latency = self.draw_latency()
+        return Reply(text, latency, self.metadata(prompt, text, latency))
+
+    def metadata(self, prompt: str, text: str, latency: float) -> dict:
+        prompt_tokens, eval_tokens = approx_tokens(prompt), approx_tokens(text)
+        total_ns = int(latency * 1e9)
+        prefill_ns = total_ns * prompt_tokens // (prompt_tokens + eval_tokens)
+        return {
+            "model": self.model,
+            "done": True,
+            "total_duration": total_ns,
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": prefill_ns,
+            "eval_count": eval_tokens,
+            "eval_duration": total_ns - prefill_ns,
+        }
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NoLimit:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = FakeOllama(
+        args.host, args.port, args.latency, args.jitter, args.parallel, args.error_rate
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic application inputs for benchmarks and load tests.
+
+Everything is generated in memory and seeded, so runs are comparable.
+"""
+
+import datetime as dt
+import io
+import random
+
+from app.agents.document_ingestion_agent import BytesUpload
+
+PDF_MIME = "application/pdf"
+PNG_MIME = "image/png"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+DESCRIPTIONS = [
+    "SALARY CREDIT ACME TRADING LLC", "ATM WITHDRAWAL", "POS PURCHASE CARREFOUR",
+    "LOAN INSTALMENT", "TRANSFER TO SAVINGS", "DEWA UTILITY PAYMENT",
+    "SCHOOL FEES", "CREDIT CARD PAYMENT",
+]
+
+
+def statement_lines(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n):
+        credit = rng.random() < 0.2
+        lines.append(
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024  "
+            f"{DESCRIPTIONS[0] if credit else rng.choice(DESCRIPTIONS[1:])}  "
+            f"{'CR' if credit else 'DR'}  AED {rng.randint(50, 9000):,}.00"
+        )
+    return lines
+
+
+# --------------------------------------------------
+# Documents
+# --------------------------------------------------
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """
+    Digital bank statement (text layer on every page).
+    """
+    import fitz
+
+    pdf = fitz.open()
+    lines = statement_lines(pages * lines_per_page, seed)
+
+    for p in range(pages):
+        page = pdf.new_page()
+        text = "\n".join(
+            [f"ACME BANK - Statement of Account - Page {p + 1} of {pages}"]
+            + lines[p * lines_per_page:(p + 1) * lines_per_page]
+        )
+        page.insert_text((36, 48), text, fontsize=8)
+
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+
+def make_image(lines: int = 12, seed: int = 0) -> bytes:
+    """
+    Scanned-document style PNG (black text on white) for OCR.
+    """
+    from PIL import Image, ImageDraw
+
+    text = statement_lines(lines, seed)
+    image = Image.new("L", (1200, 40 + 28 * len(text)), color=255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(text):
+        draw.text((30, 20 + 28 * i), line, fill=0)
+
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def make_xlsx(rows: int, seed: int = 0) -> bytes:
+    """
+    Bank-statement workbook (Date / Description / Debit / Credit / Balance).
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Statement")
+    ws.append(["Date", "Description", "Debit", "Credit", "Balance"])
+
+    start, balance = dt.date(2024, 1, 1), 10000.0
+    for i in range(rows):
+        credit = rng.random() < 0.2
+        amount = float(rng.randint(50, 9000))
+        balance += amount if credit else -amount
+        ws.append([
+            start + dt.timedelta(days=i % 365),
+            DESCRIPTIONS[0] if credit else rng.choice(DESCRIPTIONS[1:]),
+            None if credit else amount,
+            amount if credit else None,
+            round(balance, 2),
+        ])
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def upload(data: bytes, name: str, mime_type: str) -> BytesUpload:
+    return BytesUpload(data, name, mime_type)
+
+
+# --------------------------------------------------
+# Chat inputs
+# --------------------------------------------------
+CHAT_SHORT = "I earn 4500 a month, I am employed, 3 dependents, bachelor degree, 6 years of experience."
+
+CHAT_VAGUE = (
+    "Hello, I need help with my application. My husband lost his job last year and "
+    "we look after our parents and the kids. I finished university a while ago and "
+    "have worked on and off since then. We have a small loan for the car."
+)
+
+
+def chat_long(paragraphs: int = 20, seed: int = 0) -> str:
+    """
+    Long free-text message: the vague message padded with statement lines.
+    """
+    body = statement_lines(paragraphs * 5, seed)
+    return CHAT_VAGUE + "\n\n" + "\n".join(body)
+
+
+CHAT_INPUTS = {
+    "chat_short": CHAT_SHORT,
+    "chat_vague": CHAT_VAGUE,
+    "chat_long": chat_long(),
+}
+
+
+# --------------------------------------------------
+# Applicants (same distributions as the model's training data)
+# --------------------------------------------------
+EMPLOYMENT = ["employed", "unemployed", "self-employed", "student", "retired"]
+EDUCATION = ["high_school", "bachelor", "masters", "phd", "unknown"]
+
+
+def applicants(n: int, seed: int = 42) -> list:
+    """
+    Validated-data dicts drawn like generate_synthetic_data draws features.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+
+    income = np.clip(np.exp(rng.normal(np.log(6000), 1.5, n)), 500, 1e9)
+    family_size = rng.integers(1, 7, n)
+    employment_years = rng.integers(0, 35, n)
+    assets = rng.normal(50000, 150000, n).clip(0, 5e7)
+    liabilities = rng.normal(20000, 100000, n).clip(0, 5e7)
+    status = rng.choice(EMPLOYMENT, n, p=[0.55, 0.2, 0.15, 0.05, 0.05])
+    education = rng.choice(EDUCATION, n)
+
+    return [
+        {
+            "income": round(float(income[i]), 2),
+            "family_size": int(family_size[i]),
+            "employment_years": int(employment_years[i]),
+            "employment_status": str(status[i]),
+            "education_level": str(education[i]),
+            "assets": round(float(assets[i]), 2),
+            "liabilities": round(float(liabilities[i]), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def applicant_message(a: dict) -> str:
+    """
+    Chat message stating an applicant's fields, as a user would type them.
+    """
+    return (
+        f"My monthly salary is {a['income']:.0f} AED. I am {a['employment_status']} "
+        f"with {a['employment_years']} years of experience and {a['family_size']} dependents. "
+        f"Education: {a['education_level'].replace('_', ' ')}. "
+        f"Total assets {a['assets']:.0f}, total liabilities {a['liabilities']:.0f}."
+    )
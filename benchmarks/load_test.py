@@ -0,0 +1,346 @@
+"""
+Concurrent load test of the full application pipeline.
+
+Each synthetic application (applicant fields drawn like the model's
+training data, typed as a chat message, optionally with its own bank
+statement PDF) goes through document_ingestion_agent ... run_application_flow,
+exactly as main.py runs it. Applications arrive open-loop at --rate per
+second (Poisson) or, with --rate 0, closed-loop (every worker starts the
+next one as soon as it finishes); at most --concurrency are processed at
+once, the rest queue.
+
+The report has throughput, end-to-end and per-stage latency percentiles,
+queue wait, and error / timeout counts. --sweep runs several concurrency
+levels and reports where throughput stops scaling (the saturation point).
+
+Usage:
+    python -m benchmarks.load_test --concurrency 8 --applications 200
+    python -m benchmarks.load_test --rate 5 --concurrency 16 --duration 60
+    python -m benchmarks.load_test --sweep 1,2,4,8,16,32 --llm-parallel 4
+    python -m benchmarks.load_test --ollama-url http://localhost:11434 --sweep 1,2,4
+    python -m benchmarks.load_test --replay .cache/llm_recording.jsonl --sweep 1,4,16
+"""
+
+import os
+
+# Every application must reach the (fake) model, not the response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+# ... and every document must be parsed, not read back from the document
+# store; nothing a synthetic run produces is stored or traced
+os.environ.setdefault("DOCUMENT_STORE", "off")
+os.environ.setdefault("APPLICATION_STORE", "off")
+os.environ.setdefault("TRACING_ENABLED", "false")
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.fake_ollama import FakeOllama
+
+STAGES = ("ingestion", "extraction", "validation", "readiness", "decision")
+
+
+# --------------------------------------------------
+# Workload
+# --------------------------------------------------
+def build_applications(n: int, docs_fraction: float, pdf_pages: int, seed: int) -> list:
+    """
+    (chat message, [(data, name, mime)]) per application. Every document is
+    distinct, so the ingestion cache does not flatter the results.
+    """
+    rng = random.Random(seed)
+    applications = []
+
+    for i, a in enumerate(fixtures.applicants(n, seed=seed)):
+        files = []
+        if rng.random() < docs_fraction:
+            files.append((
+                fixtures.make_pdf(pdf_pages, seed=seed * 1_000_003 + i),
+                f"statement_{i}.pdf",
+                fixtures.PDF_MIME,
+            ))
+        applications.append((fixtures.applicant_message(a), files))
+
+    return applications
+
+
+def run_application(application) -> dict:
+    """
+    One application through every stage; returns per-stage seconds.
+    """
+    from app.agents.document_ingestion_agent import document_ingestion_agent
+    from app.agents.data_extraction_agent import data_extraction_agent
+    from app.agents.data_validation_agent import data_validation_agent
+    from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
+    from app.orchestrator.master_agent import run_application_flow
+
+    message, files = application
+    state = {
+        "user_input": message,
+        "uploaded_files": [fixtures.upload(*f) for f in files],
+    }
+
+    stages = {}
+    for name, agent in (
+        ("ingestion", document_ingestion_agent),
+        ("extraction", data_extraction_agent),
+        ("validation", data_validation_agent),
+        ("readiness", eligibility_readiness_agent),
+    ):
+        start = time.perf_counter()
+        state = agent(state)
+        stages[name] = time.perf_counter() - start
+
+    ready = state["eligibility_readiness"]["status"] == "ready"
+    if ready:
+        start = time.perf_counter()
+        run_application_flow(state)
+        stages["decision"] = time.perf_counter() - start
+
+    return {"stages": stages, "ready": ready}
+
+
+# --------------------------------------------------
+# Driver
+# --------------------------------------------------
+def run_load(applications: list, concurrency: int, rate: float = 0.0, seed: int = 0) -> tuple:
+    """
+    Process applications with at most `concurrency` in flight.
+
+    rate > 0: open loop, Poisson arrivals at `rate` per second; latency
+    includes the wait for a free worker. rate == 0: closed loop, latency
+    counts from when a worker picks the application up.
+
+    Returns (records, wall seconds).
+    """
+    from app.agents.document_ingestion_agent import ingestion_cache, ocr_page_cache
+
+    # Runs (sweep levels) reuse the documents: parse them cold every time
+    ingestion_cache.clear()
+    ocr_page_cache.clear()
+
+    rng = random.Random(seed)
+    records = [None] * len(applications)
+
+    def work(i: int, arrival: float = None):
+        start = time.perf_counter()
+        record = {"arrival": start if arrival is None else arrival, "start": start}
+        try:
+            record.update(run_application(applications[i]))
+        except Exception as e:
+            record["error"] = type(e).__name__
+        record["end"] = time.perf_counter()
+        records[i] = record
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="applicant") as pool:
+        if rate <= 0:
+            for i in range(len(applications)):
+                pool.submit(work, i)
+        else:
+            due = t0
+            for i in range(len(applications)):
+                due += rng.expovariate(rate)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(work, i, due)
+
+    return records, time.perf_counter() - t0
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return None
+    v = np.asarray(values) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(v, 50)), 2),
+        "p95_ms": round(float(np.percentile(v, 95)), 2),
+        "p99_ms": round(float(np.percentile(v, 99)), 2),
+        "max_ms": round(float(v.max()), 2),
+    }
+
+
+def summarize(records: list, wall: float, timeout: float, open_loop: bool) -> dict:
+    """
+    An application counts as timed out when it took longer than `timeout`
+    (end to end, queueing included), or an LLM call in it timed out.
+    """
+    ok = [r for r in records if "error" not in r]
+    errors = Counter(r["error"] for r in records if "error" in r)
+    latency = [r["end"] - r["arrival"] for r in ok]
+
+    slow = sum(1 for l in latency if timeout and l > timeout)
+
+    return {
+        "applications": len(records),
+        "completed": len(ok),
+        "decided": sum(1 for r in ok if r["ready"]),
+        "errors": dict(errors),
+        "timeouts": slow + errors.get("LLMTimeoutError", 0),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(ok) / wall, 3) if wall else None,
+        "latency": percentiles(latency),
+        "queue_wait": percentiles([r["start"] - r["arrival"] for r in ok]) if open_loop else None,
+        "stages": {
+            stage: percentiles([r["stages"][stage] for r in ok if stage in r["stages"]])
+            for stage in STAGES
+        },
+    }
+
+
+def find_saturation(points: list, min_gain: float) -> dict:
+    """
+    First concurrency level whose extra workers bought less than `min_gain`
+    relative throughput: beyond it requests only queue (Ollama slots or
+    the GIL are the bottleneck). None if throughput still scales.
+    """
+    for prev, cur in zip(points, points[1:]):
+        gain = cur["throughput_per_s"] / prev["throughput_per_s"] - 1 if prev["throughput_per_s"] else 0
+        if gain < min_gain:
+            return {
+                "concurrency": prev["concurrency"],
+                "throughput_per_s": prev["throughput_per_s"],
+                "p95_ms": prev["latency"]["p95_ms"] if prev["latency"] else None,
+            }
+    return None
+
+
+# --------------------------------------------------
+# Report
+# --------------------------------------------------
+def print_summary(label: str, s: dict):
+    lat = s["latency"] or {}
+    print(
+        f"\n[{label}] {s['completed']}/{s['applications']} completed ({s['decided']} decided) "
+        f"in {s['wall_s']:.1f}s -> {s['throughput_per_s']}/s, "
+        f"errors {sum(s['errors'].values())} {s['errors'] or ''}, timeouts {s['timeouts']}"
+    )
+    print(f"  {'':<12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    rows = [("end_to_end", lat)]
+    if s["queue_wait"]:
+        rows.append(("queue_wait", s["queue_wait"]))
+    rows += [(stage, s["stages"][stage]) for stage in STAGES]
+    for name, p in rows:
+        if p:
+            print(f"  {name:<12} {p['p50_ms']:>10.1f} {p['p95_ms']:>10.1f} {p['p99_ms']:>10.1f} {p['max_ms']:>10.1f}")
+
+
+def print_sweep(points: list, saturation: dict):
+    print(f"\n{'concurrency':>11} {'throughput/s':>13} {'p50 ms':>10} {'p95 ms':>10} {'errors':>7} {'timeouts':>9}")
+    for p in points:
+        lat = p["latency"] or {"p50_ms": float("nan"), "p95_ms": float("nan")}
+        print(
+            f"{p['concurrency']:>11} {p['throughput_per_s']:>13.3f} {lat['p50_ms']:>10.1f} "
+            f"{lat['p95_ms']:>10.1f} {sum(p['errors'].values()):>7} {p['timeouts']:>9}"
+        )
+    if saturation:
+        print(
+            f"\nSaturation at concurrency {saturation['concurrency']}: "
+            f"{saturation['throughput_per_s']}/s, p95 {saturation['p95_ms']} ms"
+        )
+    else:
+        print("\nThroughput still scaling at the highest level tested")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the application pipeline")
+    parser.add_argument("--applications", type=int, default=100, help="Applications per run (per sweep level)")
+    parser.add_argument("--duration", type=float, help="With --rate: run for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=4, help="Applications processed at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="Arrivals per second (0 = closed loop)")
+    parser.add_argument("--sweep", help="Comma-separated concurrency levels, e.g. 1,2,4,8,16")
+    parser.add_argument("--saturation-gain", type=float, default=0.1,
+                        help="Throughput gain below which a sweep level counts as saturated")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds after which an application counts as timed out")
+    parser.add_argument("--docs-fraction", type=float, default=0.5, help="Share of applications with a PDF")
+    parser.add_argument("--pdf-pages", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ollama-url", help="Load a real Ollama instead of the fake")
+    parser.add_argument("--replay", help="Serve LLM calls from this recording (see benchmarks.replay_ollama)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Replay latency multiplier")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake Ollama seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-parallel", type=int, default=4, help="Fake/replay Ollama concurrent calls")
+    parser.add_argument("--report", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    from app.llm.llm_client import OllamaClient, set_client
+    from app.models.eligibility_model import get_model
+
+    server = None
+    if args.ollama_url:
+        set_client(OllamaClient(base_url=args.ollama_url))
+        llm = args.ollama_url
+    elif args.replay:
+        from app.llm.recorder import load_recordings
+        from benchmarks.replay_ollama import ReplayOllama
+
+        server = ReplayOllama(
+            load_recordings(args.replay), latency_scale=args.latency_scale, parallel=args.llm_parallel
+        ).start()
+        llm = f"replay {args.replay} (scale {args.latency_scale}, parallel {args.llm_parallel})"
+    else:
+        server = FakeOllama(
+            latency=args.llm_latency, jitter=args.llm_jitter, parallel=args.llm_parallel
+        ).start()
+        llm = f"fake (latency {args.llm_latency}s +/- {args.llm_jitter}s, parallel {args.llm_parallel})"
+    if server is not None:
+        set_client(OllamaClient(base_url=server.url))
+
+    n = args.applications
+    if args.duration and args.rate > 0:
+        n = max(1, int(args.duration * args.rate))
+
+    print(f"Generating {n} applications ...", flush=True)
+    applications = build_applications(n, args.docs_fraction, args.pdf_pages, args.seed)
+    get_model()  # load outside the timings
+    run_application(applications[0])  # warm up pools and imports
+
+    levels = [int(c) for c in args.sweep.split(",")] if args.sweep else [args.concurrency]
+    points = []
+    try:
+        for concurrency in levels:
+            records, wall = run_load(applications, concurrency, args.rate, args.seed)
+            summary = summarize(records, wall, args.timeout, open_loop=args.rate > 0)
+            summary["concurrency"] = concurrency
+            points.append(summary)
+            print_summary(f"concurrency {concurrency}" + (f", rate {args.rate}/s" if args.rate > 0 else ""), summary)
+    finally:
+        if server is not None:
+            server.stop()
+
+    saturation = find_saturation(points, args.saturation_gain) if len(points) > 1 else None
+    if len(points) > 1:
+        print_sweep(points, saturation)
+
+    if args.report:
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "cpu_count": os.cpu_count(),
+                "llm": llm,
+                "applications": n,
+                "rate": args.rate,
+                "docs_fraction": args.docs_fraction,
+            },
+            "runs": points,
+            "saturation": saturation,
+        }
+        with open(args.report, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nSaved report to {args.report}")
+
+    return 1 if any(p["completed"] == 0 for p in points) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
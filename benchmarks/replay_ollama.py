@@ -0,0 +1,155 @@
+"""
+Ollama stand-in that replays recorded responses, for load tests.
+
+Serves a recording made with LLM_RECORD_PATH (see app.llm.recorder):
+a prompt seen during recording gets its recorded response after its
+recorded latency (times --latency-scale); repeated prompts cycle through
+their recordings. Unseen prompts (e.g. synthetic applicants) get a
+response sampled from recordings with the same options - the same call
+type - so timing still follows the recorded distribution; --miss error
+answers them with 404 instead.
+
+Usage:
+    LLM_RECORD_PATH=.cache/llm_recording.jsonl streamlit run main.py   # record
+    python -m benchmarks.replay_ollama .cache/llm_recording.jsonl --port 11434 --latency-scale 1.0
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 python -m benchmarks.load_test ...
+"""
+
+import argparse
+import json
+import random
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from app.llm.recorder import load_recordings, prompt_key
+from benchmarks.fake_ollama import FakeOllama, Reply
+
+DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+
+
+def _options_key(options: dict) -> str:
+    return json.dumps(options or {}, sort_keys=True)
+
+
+class ReplayOllama(FakeOllama):
+    """
+    Args:
+        recordings: records from app.llm.recorder.load_recordings
+        latency_scale: multiplier on recorded latencies (0 = instant)
+        miss: "sample" or "error" for prompts that were not recorded
+        seed: seeds the sampling of misses, so runs are repeatable
+    """
+
+    def __init__(
+        self,
+        recordings: list,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_scale: float = 1.0,
+        miss: str = "sample",
+        parallel: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        model: str = None,
+    ):
+        if not recordings:
+            raise ValueError("No recordings to replay")
+        if miss not in ("sample", "error"):
+            raise ValueError(f"miss must be 'sample' or 'error', not {miss!r}")
+
+        super().__init__(
+            host, port, latency=0.0, parallel=parallel, error_rate=error_rate,
+            model=model or recordings[0]["metadata"].get("model", "replay"),
+        )
+        self.latency_scale = latency_scale
+        self.miss = miss
+        self.hits = 0
+        self.misses = 0
+
+        self.by_key = defaultdict(list)
+        self.by_options = defaultdict(list)
+        for r in recordings:
+            self.by_key[r["key"]].append(r)
+            self.by_options[_options_key(r["options"])].append(r)
+
+        self._next = defaultdict(int)
+        self._rng = random.Random(seed)
+        self._replay_lock = threading.Lock()
+
+    def respond(self, request: dict):
+        options = request.get("options") or {}
+        key = prompt_key(options, request.get("prompt", ""))
+
+        with self._replay_lock:
+            recorded = self.by_key.get(key)
+            if recorded:
+                self.hits += 1
+                record = recorded[self._next[key] % len(recorded)]
+                self._next[key] += 1
+            else:
+                self.misses += 1
+                pool = self.by_options.get(_options_key(options))
+                if self.miss == "error" or not pool:
+                    return None
+                record = self._rng.choice(pool)
+
+        return self.replay(record)
+
+    def replay(self, record: dict) -> Reply:
+        scale = self.latency_scale
+        metadata = dict(record["metadata"], model=self.model)
+        for field in DURATION_FIELDS:
+            if field in metadata:
+                metadata[field] = int(metadata[field] * scale)
+
+        first_token = record.get("first_token")
+        return Reply(
+            record["response"],
+            record["latency"] * scale,
+            metadata,
+            None if first_token is None else first_token * scale,
+        )
+
+    def stats(self) -> dict:
+        with self._replay_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def describe(recordings: list) -> str:
+    latencies = np.array([r["latency"] for r in recordings])
+    return (
+        f"{len(recordings)} recordings, {len({r['key'] for r in recordings})} distinct prompts, "
+        f"latency p50 {np.percentile(latencies, 50):.3f}s p95 {np.percentile(latencies, 95):.3f}s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Ollama responses over HTTP")
+    parser.add_argument("recording", help="JSONL written in record mode (LLM_RECORD_PATH)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--miss", choices=("sample", "error"), default="sample")
+    parser.add_argument("--parallel", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    recordings = load_recordings(args.recording)
+    server = ReplayOllama(
+        recordings, args.host, args.port, args.latency_scale, args.miss,
+        args.parallel, args.error_rate, args.seed,
+    )
+    print(describe(recordings))
+    print(f"Replaying on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        print(f"Served: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import streamlit as st
+import itertools
 import uuid
 
-from app.agents.document_ingestion_agent import document_ingestion_agent
-from app.agents.data_extraction_agent import data_extraction_agent
-from app.agents.data_validation_agent import data_validation_agent
-from app.agents.eligibility_readiness_agent import eligibility_readiness_agent
-from app.orchestrator.master_agent import run_application_flow
+from app.config import SCORING_SERVICE_URL
+from app.orchestrator.master_agent import run_intake, run_application_flow
+from app.service.client import ScoringServiceError, get_service_client
+from app.observability.tracing import start_trace
 
 st.set_page_config(
     page_title="AI Social Support Assessment",
@@ -26,6 +26,8 @@ def init():
         "validated_data": None,
         "readiness": None,
         "uploader_key": uuid.uuid4().hex,
+        # Documents and the decision are stored under this id
+        "application_id": uuid.uuid4().hex,
         "assessment_started": False,
         "processing_done": False,  # NEW: prevents re-running agents
     }
@@ -115,59 +117,90 @@ if st.session_state.phase == "COLLECT" and not st.session_state.processing_done:
         "content": "We're reviewing the information you provided. This usually takes a few seconds."
     })
     
-    # Run agents
-    state = {
-        "user_input": "\n".join(st.session_state.text_buffer),
-        "uploaded_files": uploaded_files,
-    }
-
-    state = document_ingestion_agent(state)
-    state = data_extraction_agent(state)
-    state = data_validation_agent(state)
-    state = eligibility_readiness_agent(state)
-
-    st.session_state.validated_data = state["validated_data"]
-    st.session_state.readiness = state["eligibility_readiness"]
-
-    if state["eligibility_readiness"]["status"] == "ready":
-        # Ready for decision - run it automatically
-        result = run_application_flow(state) 
-        #     validated_data=st.session_state.validated_data,
-        #     readiness=st.session_state.readiness
-        # )
-
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": "We have sufficient information to evaluate your application."
-        })
-        
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": result["chat_response"]
-        })
-
-        if result.get("llm_explanation"):
+    # One trace per processed input: every agent and LLM call below is a span in it
+    with start_trace("application", files=len(uploaded_files or [])):
+        # Run agents
+        state = {
+            "application_id": st.session_state.application_id,
+            "user_input": "\n".join(st.session_state.text_buffer),
+            "uploaded_files": uploaded_files,
+        }
+
+        response = None
+        if SCORING_SERVICE_URL:
+            # The scoring service runs the whole pipeline in one call
+            try:
+                response = get_service_client().process(
+                    state["user_input"], uploaded_files, st.session_state.application_id
+                )
+            except ScoringServiceError as e:
+                st.error(f"Could not process the application: {e}")
+                st.stop()
+            state.update(
+                validated_data=response["validated_data"],
+                eligibility_readiness=response["eligibility_readiness"],
+            )
+        else:
+            state = run_intake(state)
+
+        st.session_state.validated_data = state["validated_data"]
+        st.session_state.readiness = state["eligibility_readiness"]
+
+        if state["eligibility_readiness"]["status"] == "ready":
+            # Ready for decision - run it automatically
+            if response is not None:
+                # The explanation arrives whole; render it as a one-piece stream
+                result = dict(
+                    response["decision"],
+                    llm_explanation_stream=iter([response["decision"]["llm_explanation"] or ""]),
+                )
+            else:
+                result = run_application_flow(state, stream_explanation=True)
+            #     validated_data=st.session_state.validated_data,
+            #     readiness=st.session_state.readiness
+            # )
+
+            # Render right away (not only after rerun) so the decision is
+            # visible while the explanation streams in below it
+            for content in (
+                "We have sufficient information to evaluate your application.",
+                result["chat_response"],
+            ):
+                with st.chat_message("assistant"):
+                    st.markdown(content)
+                st.session_state.chat_history.append({
+                    "role": "assistant",
+                    "content": content
+                })
+
+            explanation_header = "### 🧠 Decision Explanation\n\n"
+            with st.chat_message("assistant"):
+                explanation = st.write_stream(
+                    itertools.chain([explanation_header], result["llm_explanation_stream"])
+                )
+
+            if explanation and explanation.strip() != explanation_header.strip():
+                st.session_state.chat_history.append({
+                    "role": "assistant",
+                    "content": explanation
+                })
+
+            st.session_state.phase = "DONE"
+            st.session_state.processing_done = True
+
+        else:
+            # Need more info
+            missing = state["eligibility_readiness"]["missing_fields"]
             st.session_state.chat_history.append({
                 "role": "assistant",
-                "content": "### 🧠 Decision Explanation\n\n" + result["llm_explanation"]
+                "content": (
+                    "We need a bit more information to continue.\n\n"
+                    "Please provide the following:\n"
+                    + "\n".join(f"• {m.replace('_',' ').title()}" for m in missing)
+                    + "\n\nYou can type it or upload another document."
+                )
             })
-
-        st.session_state.phase = "DONE"
-        st.session_state.processing_done = True
-
-    else:
-        # Need more info
-        missing = state["eligibility_readiness"]["missing_fields"]
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": (
-                "We need a bit more information to continue.\n\n"
-                "Please provide the following:\n"
-                + "\n".join(f"• {m.replace('_',' ').title()}" for m in missing)
-                + "\n\nYou can type it or upload another document."
-            )
-        })
-        st.session_state.processing_done = True
-        # Stay in COLLECT phase for next input
+            st.session_state.processing_done = True
+            # Stay in COLLECT phase for next input
     
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# Before app.config is imported: no trace files or stores written by tests
+os.environ.setdefault("TRACING_ENABLED", "false")
+os.environ.setdefault("APPLICATION_STORE", "off")
+os.environ.setdefault("DOCUMENT_STORE", "off")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,47 @@
+import time
+
+from app.storage.applications import ApplicationRepository, SQLiteBackend, application_row
+
+
+def decided(decision, explanation=None):
+    return {
+        "validated_data": {"income": 6000},
+        "eligibility": {"decision": decision, "probability": 0.8},
+        "eligibility_signals": {"income_per_capita": 2000},
+        "enablement": {},
+        "llm_explanation": explanation,
+    }
+
+
+def test_redecision_keeps_created_at(tmp_path):
+    repo = ApplicationRepository(SQLiteBackend(tmp_path / "apps.sqlite3"), flush_seconds=0.01)
+
+    repo.save(application_row("a", decided("APPROVE")))
+    repo.flush()
+    first = repo.get("a")
+
+    time.sleep(0.01)
+    repo.save(application_row("a", decided("SOFT_DECLINE")))
+    repo.flush()
+    second = repo.get("a")
+
+    assert second["decision"] == "SOFT_DECLINE"
+    assert second["created_at"] == first["created_at"]
+    assert second["decided_at"] > first["decided_at"]
+    assert [r["application_id"] for r in repo.find(since=first["created_at"])] == ["a"]
+
+
+def test_explanation_upsert_keeps_decision_timestamps(tmp_path):
+    repo = ApplicationRepository(SQLiteBackend(tmp_path / "apps.sqlite3"), flush_seconds=0.01)
+
+    row = application_row("a", decided("APPROVE"))
+    repo.save(row)
+    repo.flush()
+    assert repo.get("a")["llm_explanation"] is None
+
+    repo.save(row[:-1] + ("Approved because ...",))
+    repo.flush()
+    record = repo.get("a")
+    assert record["llm_explanation"] == "Approved because ..."
+    assert record["decided_at"] == row[4]
+    assert record["eligibility_signals"] == {"income_per_capita": 2000}
@@ -0,0 +1,29 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.models.context_compactor import ContextCompactor, fit_idf, split_sentences, synthetic_contexts
+
+CONTEXT = """
+My monthly salary is 4500 AED and I am employed.
+We are a family of 5, with 3 children.
+03/04/2024 salary credit aed 4500.00
+05/04/2024 atm withdrawal aed 200.00
+Rent is 3000 AED a month and school fees are due.
+"""
+
+
+def test_without_idf_scores_match_tfidf_vectorizer():
+    sentences = split_sentences(CONTEXT)
+    expected = np.asarray(TfidfVectorizer(stop_words="english").fit_transform(sentences).sum(axis=1)).ravel()
+
+    assert np.allclose(ContextCompactor().scores(sentences), expected)
+
+
+def test_fixed_idf_scores_do_not_depend_on_other_lines():
+    compactor = ContextCompactor(fit_idf(synthetic_contexts(200)))
+    sentences = split_sentences(CONTEXT)
+
+    alone = compactor.scores(sentences[:2])
+    with_more = compactor.scores(sentences)
+
+    assert np.allclose(alone, with_more[:2])
@@ -0,0 +1,81 @@
+import hashlib
+import sqlite3
+
+from app.storage.documents import LocalDocumentStore
+
+
+def test_link_keeps_chat_text_with_documents(tmp_path):
+    store = LocalDocumentStore(tmp_path)
+    ref = {"sha256": "ab" * 32, "mime_type": "application/pdf", "ext": "pdf", "file_name": "payslip.pdf"}
+
+    store.link("a", [ref], "I earn 6000 AED a month, family of 3")
+    store.link("b", [], "no documents")
+
+    assert store.refs("a") == [ref]
+    assert store.user_input("a") == "I earn 6000 AED a month, family of 3"
+    assert store.user_input("b") is None
+    assert store.stats()["applications"] == 1
+
+    # A resubmission without documents drops the list and the chat text
+    store.link("a", [], "updated")
+    assert store.refs("a") == []
+    assert store.user_input("a") is None
+
+
+def test_purge_drops_expired_links_and_unlinked_documents(tmp_path):
+    store = LocalDocumentStore(tmp_path, retention_days=1)
+    shared, old = b"shared statement", b"old payslip"
+    refs = {}
+    for data in (shared, old):
+        sha = hashlib.sha256(data).hexdigest()
+        store.put_bytes(sha, data)
+        store.put_parsed((sha, "application/pdf", "pdf"), b"parsed", "parser-1")
+        refs[data] = {"sha256": sha, "mime_type": "application/pdf", "ext": "pdf", "file_name": "f.pdf"}
+
+    store.link("expired", [refs[shared], refs[old]], "old chat text")
+    store.link("recent", [refs[shared]], "new chat text")
+    store._conn.execute("UPDATE application_inputs SET created_at = 0 WHERE application_id = 'expired'")
+    store._conn.execute("UPDATE application_documents SET created_at = 0 WHERE application_id = 'expired'")
+    store._conn.execute("UPDATE blobs SET created_at = 0")
+    store._conn.commit()
+
+    assert store.purge() == {"applications": 1, "documents": 1}
+
+    assert store.user_input("expired") is None and store.refs("expired") == []
+    assert store.user_input("recent") == "new chat text"
+    # Still used by a recent application
+    assert store.get_bytes(refs[shared]["sha256"]) == shared
+    assert store.get_bytes(refs[old]["sha256"]) is None
+    assert store.get_parsed((refs[old]["sha256"], "application/pdf", "pdf"), "parser-1") is None
+
+
+def test_parse_from_another_parser_is_not_reused(tmp_path):
+    store = LocalDocumentStore(tmp_path)
+    key = ("cd" * 32, "application/pdf", "pdf")
+
+    store.put_parsed(key, b"old", "parser-1")
+    assert store.get_parsed(key, "parser-1") == b"old"
+    assert store.get_parsed(key, "parser-2") is None
+
+    store.put_parsed(key, b"new", "parser-2")
+    assert store.get_parsed(key, "parser-2") == b"new"
+    assert store.get_parsed(key, "parser-1") is None
+
+
+def test_parses_stored_before_fingerprints_are_parsed_again(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "index.sqlite3"))
+    conn.execute(
+        """
+        CREATE TABLE parses (
+            sha256 TEXT NOT NULL, mime_type TEXT NOT NULL, ext TEXT NOT NULL,
+            parsed BLOB NOT NULL, parsed_size INTEGER NOT NULL, created_at REAL NOT NULL,
+            PRIMARY KEY (sha256, mime_type, ext)
+        )
+        """
+    )
+    conn.execute("INSERT INTO parses VALUES ('ef', 'image/png', 'png', x'00', 1, 0)")
+    conn.commit()
+    conn.close()
+
+    store = LocalDocumentStore(tmp_path)
+    assert store.get_parsed(("ef", "image/png", "png"), "parser-1") is None
@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+
+from app.jobs import worker
+from app.jobs.queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, QueueFull
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    def make(**options):
+        options.setdefault("retry_backoff", 0)
+        return JobQueue(tmp_path / "jobs.sqlite3", **options)
+
+    return make
+
+
+# --------------------------------------------------
+# Enqueue / backpressure
+# --------------------------------------------------
+def test_enqueue_and_claim(make_queue):
+    q = make_queue()
+    job_id = q.enqueue("salary 6000", job_id="a")
+
+    job = q.claim("w1")
+    assert job.id == job_id == "a"
+    assert job.attempts == 1
+    assert job.payload == {"user_input": "salary 6000", "documents": []}
+    assert q.get("a")["status"] == RUNNING
+    assert q.claim("w2") is None
+
+
+def test_duplicate_ids_are_not_counted(make_queue):
+    q = make_queue(max_pending=2)
+
+    assert q.enqueue_many([{"id": "a"}, {"id": "b"}, {"id": "a"}]) == ["a", "b"]
+    # Already queued: skipped, and no QueueFull although the queue is full
+    assert q.enqueue_many([{"id": "a"}, {"id": "b"}]) == []
+    assert q.enqueue("again", job_id="a") == "a"
+    assert q.stats()[QUEUED] == 2
+
+
+def test_queue_full_adds_nothing(make_queue):
+    q = make_queue(max_pending=2)
+    q.enqueue_many([{"id": "a"}])
+
+    with pytest.raises(QueueFull):
+        q.enqueue_many([{"id": "b"}, {"id": "c"}])
+    assert q.pending() == 1
+
+
+# --------------------------------------------------
+# Leases
+# --------------------------------------------------
+def test_expired_lease_is_reclaimed(make_queue):
+    q = make_queue(visibility_timeout=0.05)
+    q.enqueue(job_id="a")
+
+    stale = q.claim("w1")
+    time.sleep(0.1)
+    job = q.claim("w2")
+
+    assert job.id == "a" and job.attempts == 2 and job.worker == "w2"
+    # The previous owner can no longer touch the job
+    assert not q.heartbeat(stale)
+    assert not q.checkpoint(stale, "ingestion", {})
+    assert not q.complete(stale, {})
+    assert q.complete(job, {"ok": True})
+    assert q.get("a")["status"] == DONE
+
+
+def test_claims_in_due_order(make_queue):
+    q = make_queue(visibility_timeout=0.1)
+    q.enqueue(job_id="leased")
+    q.claim("w1")
+    for job_id in ("c", "b", "a"):
+        time.sleep(0.07)
+        q.enqueue(job_id=job_id)
+    time.sleep(0.1)
+
+    # The expired lease is due between c and b
+    assert [q.claim("w2").id for _ in range(4)] == ["c", "leased", "b", "a"]
+
+
+def test_heartbeat_extends_lease(make_queue):
+    q = make_queue(visibility_timeout=0.2)
+    q.enqueue(job_id="a")
+    job = q.claim("w1")
+
+    time.sleep(0.15)
+    assert q.heartbeat(job)
+    time.sleep(0.1)
+    assert q.claim("w2") is None
+
+
+# --------------------------------------------------
+# Retries
+# --------------------------------------------------
+def test_fail_retries_with_backoff_then_fails(make_queue):
+    q = make_queue(max_attempts=2, retry_backoff=0.1)
+    q.enqueue(job_id="a")
+
+    job = q.claim("w1")
+    assert q.fail(job, "boom")
+    assert q.get("a")["status"] == QUEUED
+    assert q.claim("w1") is None  # backing off
+
+    time.sleep(0.15)
+    job = q.claim("w1")
+    assert job.attempts == 2
+    assert q.fail(job, "boom again")
+    assert q.get("a")["status"] == FAILED
+    assert q.get("a")["error"] == "boom again"
+
+    assert q.retry_failed() == 1
+    assert q.claim("w1").attempts == 1
+
+
+def test_final_attempt_lost_with_worker_fails_job(make_queue):
+    q = make_queue(max_attempts=1, visibility_timeout=0.05)
+    q.enqueue(job_id="a")
+    q.claim("dead")
+    time.sleep(0.1)
+
+    worker.process_job(q, q.claim("w2"), stages=[])
+    assert q.get("a")["status"] == FAILED
+
+
+# --------------------------------------------------
+# Checkpoints / resume
+# --------------------------------------------------
+def counting_stages(calls, fail_at=None, failures=1):
+    def stage(name):
+        def run(state):
+            calls.append(name)
+            if name == fail_at and calls.count(name) <= failures:
+                raise RuntimeError(f"{name} crashed")
+            state[name] = True
+            return state
+        return run
+
+    return [(name, stage(name)) for name in ("ingestion", "extraction", "validation", "decision")]
+
+
+def test_retry_resumes_after_last_completed_stage(make_queue):
+    q = make_queue()
+    q.enqueue("text", job_id="a")
+    calls = []
+    stages = counting_stages(calls, fail_at="validation")
+
+    worker.process_job(q, q.claim("w1"), stages)
+    assert q.get("a")["status"] == QUEUED
+    assert q.get("a")["stage"] == "extraction"
+
+    job = q.claim("w1")
+    assert job.stage == "extraction"
+    assert job.checkpoint["extraction"] is True
+
+    worker.process_job(q, job, stages)
+    # Ingestion and extraction ran once; only the failed stage repeated
+    assert calls == ["ingestion", "extraction", "validation", "validation", "decision"]
+    assert q.get("a")["status"] == DONE
+
+
+def test_checkpoint_survives_reopen(make_queue):
+    q = make_queue(visibility_timeout=0.05)
+    q.enqueue(job_id="a")
+    job = q.claim("w1")
+    assert q.checkpoint(job, "ingestion", {"documents": [{"raw_text": "x"}]})
+
+    # The worker died; a new process picks the job up after the lease
+    time.sleep(0.1)
+    job = make_queue().claim("w2")
+    assert job.stage == "ingestion"
+    assert job.checkpoint == {"documents": [{"raw_text": "x"}]}
+
+
+def test_work_drains_queue(make_queue):
+    q = make_queue()
+    q.enqueue_many([{"id": str(i), "user_input": ""} for i in range(5)])
+    calls = []
+
+    processed = worker.work(q, "w1", threading.Event(), drain=True, stages=counting_stages(calls))
+    assert processed == 5
+    assert q.stats()[DONE] == 5
@@ -0,0 +1,22 @@
+import pytest
+
+from app.batch.rescore import rescore, save_checkpoint
+
+
+def test_resume_rejects_other_output_settings(tmp_path):
+    records = tmp_path / "applications.csv"
+    records.write_text("application_id,income\na,6000\n")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    save_checkpoint(out_dir, {
+        "input": str(records.resolve()), "chunk_size": 10, "format": "csv",
+        "explain": False, "completed_chunks": 1, "rows": 1,
+    })
+
+    with pytest.raises(ValueError, match="format csv"):
+        rescore(records, out_dir, chunk_size=10, fmt="jsonl")
+    with pytest.raises(ValueError, match="explain False"):
+        rescore(records, out_dir, chunk_size=10, explain=True)
+
+    # Same settings: nothing left to do
+    assert rescore(records, out_dir, chunk_size=10)["chunks"] == 1